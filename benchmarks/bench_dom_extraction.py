@@ -0,0 +1,171 @@
+"""
+Compare l'extraction carte par carte (find_element / .text / get_attribute)
+à l'extraction en un seul execute_script sur les pages de benchmarks/fixtures.
+
+    python -m benchmarks.bench_dom_extraction [--repeat 5] [--output result.json]
+
+Mesure pour chaque plateforme le temps moyen d'extraction d'une page et le
+nombre d'allers-retours WebDriver (commandes HTTP envoyées à chromedriver).
+Nécessite Chrome et chromedriver ; aucun résultat de référence n'est
+enregistré dans le dépôt : le gain dépend de la latence WebDriver de la
+machine et doit être mesuré là où le scraping tourne.
+"""
+import argparse
+import json
+import re
+import time
+
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+
+from benchmarks.make_fixtures import FIXTURES_DIR, main as make_fixtures
+from functions.scrapping.dom_extraction import collect_reviews
+from functions.scrapping.driver_pool import build_chrome_options
+from functions.scrapping.functions_trustpilot import TRUSTPILOT_CARDS_JS
+from functions.scrapping.functions_yelp import YELP_CARDS_JS
+from functions.scrapping.functions_amazon import AMAZON_CARDS_JS
+from functions.scrapping.functions_play_store import PLAY_STORE_CARDS_JS
+from functions.scrapping.functions_google_reviews import GOOGLE_CARDS_JS
+
+
+class RoundTripCounter:
+    """Compte les commandes envoyées par un webdriver"""
+
+    def __init__(self, driver):
+        self.count = 0
+        self._execute = driver.execute
+
+        def counting_execute(*args, **kwargs):
+            self.count += 1
+            return self._execute(*args, **kwargs)
+
+        driver.execute = counting_execute
+
+
+# ---------- Extraction historique (un appel WebDriver par champ) ----------
+
+def legacy_trustpilot(driver):
+    results = []
+    for review in driver.find_elements(By.XPATH, '//div[@class="styles_cardWrapper__g8amG styles_show__Z8n7u"]'):
+        content = review.find_element(By.XPATH, './/div[@class="styles_reviewContent__tuXiN"]')
+        text = content.find_elements(By.TAG_NAME, "p")[0].text.strip()
+        header = review.find_element(By.XPATH, './/div[@class="styles_reviewHeader__DzoAZ"]')
+        rating = float(header.get_attribute("data-service-review-rating"))
+        results.append({"rating": rating, "review": text})
+    return results
+
+
+def legacy_yelp(driver):
+    results = []
+    for review in driver.find_elements(By.XPATH, '//li[@class=" y-css-19cyavo-styles"]'):
+        text = review.find_element(By.CSS_SELECTOR, "span.raw__09f24__PkHSg").text.strip()
+        rating_el = review.find_element(
+            By.XPATH, ".//ancestor::div[contains(@class,'arrange-unit')]//div[@role='img']"
+        )
+        rating = float(rating_el.get_attribute("aria-label").split()[0])
+        results.append({"rating": rating, "review": text})
+    return results
+
+
+def legacy_amazon(driver):
+    results = []
+    for review in driver.find_elements(By.XPATH, '//li[@data-hook="review"]'):
+        text = review.find_element(By.XPATH, './/span[@data-hook="review-body"]//span').text.strip()
+        rating_text = review.find_element(
+            By.XPATH, './/i[@data-hook="review-star-rating"]//span[@class="a-icon-alt"]'
+        ).get_attribute("innerHTML")
+        results.append({"rating": float(rating_text.split()[0].replace(',', '.')), "review": text})
+    return results
+
+
+def legacy_play_store(driver):
+    results = []
+    for card in driver.find_elements(By.XPATH, "//div[contains(@class,'RHo1pe')]"):
+        aria_label = card.find_element(By.CSS_SELECTOR, "div[role='img'][aria-label]").get_attribute("aria-label")
+        rating = int(re.search(r"\d+", aria_label).group())
+        text = card.find_element(By.CLASS_NAME, "h3YV2d").text.strip()
+        results.append({"rating": rating, "review": text})
+    return results
+
+
+def legacy_google(driver):
+    results = []
+    for card in driver.find_elements(By.CSS_SELECTOR, "div[data-review-id]"):
+        el = card.find_element(By.CSS_SELECTOR, "span.wiI7pd")
+        txt = (el.text or "").strip()
+        aria = (el.get_attribute("aria-label") or "").strip()
+        if len(aria) > len(txt):
+            txt = aria
+        js_txt = (driver.execute_script("return arguments[0].textContent;", el) or "").strip()
+        if len(js_txt) > len(txt):
+            txt = js_txt
+        results.append(txt)
+    return results
+
+
+PLATFORMS = {
+    "trustpilot": (legacy_trustpilot, lambda d: collect_reviews(d, TRUSTPILOT_CARDS_JS)),
+    "yelp": (legacy_yelp, lambda d: collect_reviews(d, YELP_CARDS_JS)),
+    "amazon": (legacy_amazon, lambda d: collect_reviews(d, AMAZON_CARDS_JS)),
+    "play_store": (legacy_play_store, lambda d: collect_reviews(d, PLAY_STORE_CARDS_JS, rating_cast=int)),
+    "google": (legacy_google, lambda d: collect_reviews(d, GOOGLE_CARDS_JS, rating_cast=int)),
+}
+
+
+def measure(driver, counter, extract, repeat):
+    counter.count = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        reviews = extract(driver)
+    elapsed = (time.perf_counter() - start) / repeat
+    return {
+        "reviews": len(reviews),
+        "seconds_per_page": round(elapsed, 4),
+        "round_trips_per_page": counter.count / repeat,
+    }
+
+
+def run(repeat=5):
+    if not any(FIXTURES_DIR.glob("*.html")):
+        make_fixtures()
+
+    driver = webdriver.Chrome(options=build_chrome_options(headless=True))
+    counter = RoundTripCounter(driver)
+    report = {}
+    try:
+        for platform, (legacy, batched) in PLATFORMS.items():
+            driver.get((FIXTURES_DIR / f"{platform}.html").resolve().as_uri())
+            before = measure(driver, counter, legacy, repeat)
+            after = measure(driver, counter, batched, repeat)
+            report[platform] = {
+                "before": before,
+                "after": after,
+                "speedup": round(before["seconds_per_page"] / max(after["seconds_per_page"], 1e-9), 1),
+            }
+    finally:
+        driver.quit()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="Fichier JSON de résultats")
+    args = parser.parse_args()
+
+    report = run(args.repeat)
+
+    print(f"{'plateforme':<12} {'avant (s)':>10} {'après (s)':>10} {'A/R avant':>10} {'A/R après':>10} {'gain':>6}")
+    for platform, r in report.items():
+        print(
+            f"{platform:<12} {r['before']['seconds_per_page']:>10} {r['after']['seconds_per_page']:>10} "
+            f"{r['before']['round_trips_per_page']:>10} {r['after']['round_trips_per_page']:>10} {r['speedup']:>5}x"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+"""
+Exécute les extracteurs complets (navigateur headless) sur le serveur de fixtures.
+
+    python -m benchmarks.bench_extractors [--max-reviews 60] [--repeat 3] [--delay 0.05]
+                                          [--only yelp amazon] [--output run.json]
+                                          [--compare previous.json]
+
+Chaque extracteur parcourt un site local qui reproduit les sélecteurs de sa
+plateforme (cartes Trustpilot, listes Yelp y-css-*, data-hook="review"
+Amazon, cartes RHo1pe Play Store, data-review-id Google) : pagination par
+lien ou par URL, boutons à cliquer, scroll infini. Les URL des entreprises
+sont injectées dans un cache de résolution temporaire, la recherche sur le
+site n'est donc pas mesurée.
+
+Pour chaque extracteur (médiane des répétitions) : avis/s, délai avant le
+premier avis, allers-retours WebDriver et pic de mémoire (RSS du processus
+et de ses navigateurs). Le résultat est enregistré en JSON pour comparer
+deux versions du code (--compare).
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+from selenium import webdriver
+
+from benchmarks.fixture_server import serve_fixtures
+from benchmarks.make_fixtures import (
+    CARDS_PER_PAGE, SITE_PAGES, TRUSTPILOT_DOMAIN, main as make_fixtures, review,
+)
+from functions.scrapping import amazon_session, driver_pool, politeness, resolution_cache
+from functions.scrapping.functions_trustpilot import (
+    iter_reviews_from_trustpilot_http, iter_reviews_from_trustpilot_selenium,
+)
+from functions.scrapping.functions_yelp import iter_reviews_from_yelp
+from functions.scrapping.functions_amazon import iter_reviews_from_amazon
+from functions.scrapping.functions_play_store import iter_reviews_from_google_play_store
+from functions.scrapping.functions_google_reviews import iter_google_reviews_full_best_effort
+
+COMPANY = "example"
+
+
+# (clé du cache de résolution, page d'entrée, fonction (url, base_url, max_reviews) -> générateur)
+EXTRACTORS = {
+    "trustpilot_http": (
+        None, None,
+        lambda url, base_url, n: iter_reviews_from_trustpilot_http(COMPANY, n, base_url=base_url),
+    ),
+    "trustpilot_selenium": (
+        "trustpilot", f"/review/{TRUSTPILOT_DOMAIN}",
+        lambda url, base_url, n: iter_reviews_from_trustpilot_selenium(COMPANY, n),
+    ),
+    "yelp": ("yelp", "/yelp/page_1.html", lambda url, base_url, n: iter_reviews_from_yelp(COMPANY, n)),
+    "amazon": ("amazon", "/amazon/product.html", lambda url, base_url, n: iter_reviews_from_amazon(COMPANY, n)),
+    "play_store": (
+        "play_store", "/play_store/app.html",
+        lambda url, base_url, n: iter_reviews_from_google_play_store(COMPANY, n),
+    ),
+    "google": (
+        None, "/google/place.html",
+        lambda url, base_url, n: iter_google_reviews_full_best_effort(url, n),
+    ),
+}
+
+
+# ---------- Mesures ----------
+
+class RoundTripCounter:
+    """Compte les commandes WebDriver de tous les navigateurs lancés pendant le bloc `counting()`"""
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def add(self):
+        with self._lock:
+            self.count += 1
+
+    @contextmanager
+    def counting(self):
+        original = webdriver.Chrome
+        counter = self
+
+        class CountingChrome(original):
+            def execute(self, *args, **kwargs):
+                counter.add()
+                return super().execute(*args, **kwargs)
+
+        webdriver.Chrome = CountingChrome
+        try:
+            yield self
+        finally:
+            webdriver.Chrome = original
+
+
+def _process_table():
+    """{pid: (ppid, rss en octets)} lu dans /proc (Linux)"""
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    table = {}
+    for entry in os.scandir("/proc"):
+        if not entry.name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry.name}/stat", "rb") as f:
+                stat = f.read().decode(errors="replace")
+        except OSError:
+            continue
+        # le nom du processus (entre parenthèses) peut contenir des espaces
+        fields = stat[stat.rfind(")") + 2:].split()
+        table[int(entry.name)] = (int(fields[1]), int(fields[21]) * page_size)
+    return table
+
+
+def process_tree_rss(root_pid):
+    """RSS cumulée du processus et de ses descendants (chromedriver, Chrome) en octets"""
+    table = _process_table()
+    children = {}
+    for pid, (ppid, _) in table.items():
+        children.setdefault(ppid, []).append(pid)
+    total, stack = 0, [root_pid]
+    while stack:
+        pid = stack.pop()
+        total += table.get(pid, (0, 0))[1]
+        stack.extend(children.get(pid, ()))
+    return total
+
+
+class PeakMemory:
+    """Échantillonne la RSS de l'arbre de processus en tâche de fond et garde le pic"""
+
+    def __init__(self, interval=0.1):
+        self.interval = interval
+        self.supported = Path("/proc/self/stat").exists()
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        self.peak = max(self.peak, process_tree_rss(os.getpid()))
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        if self.supported:
+            self._sample()
+            self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._sample()
+
+    @property
+    def peak_mb(self):
+        return round(self.peak / (1024 * 1024), 1) if self.supported else None
+
+
+def run_once(make_iter, url, base_url, max_reviews, counter):
+    counter.count = 0
+    reviews = []
+    first = None
+    with PeakMemory() as memory:
+        start = time.perf_counter()
+        reviews_iter = make_iter(url, base_url, max_reviews)
+        try:
+            for item in reviews_iter:
+                if first is None:
+                    first = time.perf_counter() - start
+                reviews.append(item)
+        finally:
+            reviews_iter.close()
+        elapsed = time.perf_counter() - start
+    return {
+        "reviews": len(reviews),
+        "seconds": elapsed,
+        "first_review_seconds": first,
+        "round_trips": counter.count,
+        "peak_rss_mb": memory.peak_mb,
+    }, reviews
+
+
+def check_reviews(reviews, expected):
+    """Erreurs si les avis ne sont pas ceux des fixtures, dans l'ordre"""
+    errors = []
+    if len(reviews) != expected:
+        errors.append(f"{len(reviews)} avis extraits, {expected} attendus")
+    for i, item in enumerate(reviews):
+        if item["review"] != review(i)["text"]:
+            errors.append(f"avis n°{i} différent des fixtures: {item['review'][:60]!r}")
+            break
+    return errors
+
+
+def summarize(runs):
+    """Médiane des répétitions"""
+    def median(key):
+        values = [r[key] for r in runs if r[key] is not None]
+        return statistics.median(values) if values else None
+
+    seconds = median("seconds")
+    first = median("first_review_seconds")
+    reviews = runs[0]["reviews"]
+    return {
+        "reviews": reviews,
+        "seconds": round(seconds, 3),
+        "reviews_per_second": round(reviews / seconds, 1) if seconds else None,
+        "first_review_seconds": round(first, 3) if first is not None else None,
+        "round_trips": median("round_trips"),
+        "round_trips_per_review": round(median("round_trips") / reviews, 2) if reviews else None,
+        "peak_rss_mb": max((r["peak_rss_mb"] for r in runs if r["peak_rss_mb"] is not None), default=None),
+        "repeat": len(runs),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ---------- Exécution ----------
+
+def run(names, max_reviews, repeat, delay):
+    make_fixtures()
+    expected = min(max_reviews, CARDS_PER_PAGE * SITE_PAGES)
+    counter = RoundTripCounter()
+    results = {}
+
+    with ExitStack() as stack:
+        base_url = stack.enter_context(serve_fixtures(delay=delay))
+        tmp = Path(stack.enter_context(tempfile.TemporaryDirectory()))
+
+        # cache de résolution et profils Amazon temporaires : les données locales ne sont pas touchées
+        resolution_cache.configure_resolution_cache(path=tmp / "resolution_cache.sqlite3")
+        driver_pool.configure_driver_pool(headless=True)
+        # serveur local : pas de limite de débit (on mesure les extracteurs, pas la politesse)
+        politeness.configure_politeness(enabled=False)
+        amazon_session.configure_amazon_sessions(
+            profiles_dir=tmp / "chrome_profiles", legacy_cookies=None, headless=True,
+            home_url=f"{base_url}/amazon/home.html",
+        )
+        cache = resolution_cache.get_resolution_cache()
+        stack.enter_context(counter.counting())
+        stack.callback(amazon_session.shutdown_amazon_sessions)
+        stack.callback(driver_pool.shutdown_driver_pools)
+
+        # navigateurs lancés (et session Amazon vérifiée) avant les mesures
+        if any(name != "trustpilot_http" for name in names):
+            with driver_pool.get_driver_pool().checkout():
+                pass
+        if "amazon" in names:
+            with amazon_session.get_amazon_sessions().checkout():
+                pass
+
+        for name in names:
+            source, path, make_iter = EXTRACTORS[name]
+            url = f"{base_url}{path}" if path else None
+            if source:
+                cache.store(source, COMPANY, url)
+            runs, errors = [], []
+            for _ in range(repeat):
+                try:
+                    result, reviews = run_once(make_iter, url, base_url, max_reviews, counter)
+                except Exception as e:
+                    errors.append(f"{type(e).__name__}: {e}")
+                    break
+                runs.append(result)
+                errors = check_reviews(reviews, expected)
+                if errors:
+                    break
+            results[name] = {**(summarize(runs) if runs else {}), "errors": errors}
+            print(f"{name} terminé")
+
+    return {
+        "meta": {
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "max_reviews": max_reviews,
+            "repeat": repeat,
+            "delay": delay,
+        },
+        "results": results,
+    }
+
+
+def print_report(report, previous=None):
+    columns = f"{'extracteur':<20} {'avis':>5} {'avis/s':>8} {'1er avis (s)':>12} {'A/R':>6} {'RSS (Mo)':>9}"
+    if previous:
+        columns += f" {'avis/s préc.':>13}"
+    print(columns)
+    for name, r in report["results"].items():
+        if r["errors"]:
+            print(f"{name:<20} ERREUR : {r['errors'][0]}")
+            continue
+        line = (
+            f"{name:<20} {r['reviews']:>5} {r['reviews_per_second']:>8} {r['first_review_seconds']!s:>12} "
+            f"{r['round_trips']!s:>6} {r['peak_rss_mb']!s:>9}"
+        )
+        before = (previous or {}).get("results", {}).get(name, {})
+        if previous and before.get("reviews_per_second"):
+            ratio = r["reviews_per_second"] / before["reviews_per_second"]
+            line += f" {before['reviews_per_second']:>8} ({ratio:.2f}x)"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-reviews", type=int, default=CARDS_PER_PAGE * SITE_PAGES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--delay", type=float, default=0.0, help="latence simulée par requête (s)")
+    parser.add_argument("--only", nargs="+", choices=list(EXTRACTORS), help="extracteurs à mesurer")
+    parser.add_argument("--output", help="Fichier JSON de résultats")
+    parser.add_argument("--compare", help="Résultats JSON d'une exécution précédente")
+    args = parser.parse_args()
+
+    previous = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f)
+
+    report = run(args.only or list(EXTRACTORS), args.max_reviews, args.repeat, args.delay)
+    print_report(report, previous)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    sys.exit(1 if any(r["errors"] for r in report["results"].values()) else 0)
+
+
+if __name__ == "__main__":
+    main()
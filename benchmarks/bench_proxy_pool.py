@@ -0,0 +1,149 @@
+"""
+Vérifie le pool de proxies avec des proxies locaux de substitution.
+
+    python -m benchmarks.bench_proxy_pool [--max-reviews 60]
+
+Lance le serveur de fixtures et plusieurs proxies HTTP locaux : rapides,
+lents, bloqués (429) et hors service (port fermé). Le pool est chargé
+depuis un fichier CSV au format de liste_proxy.csv, vérifié, puis utilisé
+par le moteur HTTP Trustpilot. Le script échoue si les avis extraits ne
+correspondent pas aux fixtures, si un proxy hors service reste disponible
+ou si un proxy lent est mieux noté qu'un proxy rapide.
+"""
+import argparse
+import socket
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager, ExitStack
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from benchmarks.fixture_server import serve_fixtures
+from benchmarks.make_fixtures import CARDS_PER_PAGE, TRUSTPILOT_PAGES, main as make_fixtures, review
+from functions.scrapping import proxy_pool
+from functions.scrapping.functions_trustpilot import extract_reviews_from_trustpilot_http
+
+
+class StandInProxyHandler(BaseHTTPRequestHandler):
+    """Proxy HTTP minimal : relaie les requêtes GET à URL absolue"""
+
+    delay = 0.0
+    status = None  # code renvoyé à la place de la page (ex. 429 : proxy bloqué)
+
+    def do_GET(self):
+        if self.delay:
+            time.sleep(self.delay)
+        if self.status:
+            self.send_error(self.status)
+            return
+        with urllib.request.urlopen(self.path, timeout=10) as upstream:
+            body = upstream.read()
+            self.send_response(upstream.status)
+            self.send_header("Content-Type", upstream.headers.get("Content-Type", "text/html"))
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def serve_proxy(delay=0.0, status=None):
+    """Lance un proxy de substitution ; yield son adresse ip:port"""
+    handler = type("Handler", (StandInProxyHandler,), {"delay": delay, "status": status})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield f"127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def closed_port_address():
+    """Adresse d'un port local sans serveur (proxy hors service)"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return f"127.0.0.1:{s.getsockname()[1]}"
+
+
+def run(max_reviews):
+    make_fixtures()
+    expected = min(max_reviews, CARDS_PER_PAGE * TRUSTPILOT_PAGES)
+
+    with ExitStack() as stack:
+        base_url = stack.enter_context(serve_fixtures())
+        fast = [stack.enter_context(serve_proxy()) for _ in range(2)]
+        slow = stack.enter_context(serve_proxy(delay=0.4))
+        blocked = stack.enter_context(serve_proxy(status=429))
+        dead = closed_port_address()
+
+        tmp = Path(stack.enter_context(tempfile.TemporaryDirectory()))
+        csv_path = tmp / "liste_proxy.csv"
+        csv_path.write_text("proxy\n" + "\n".join([*fast, slow, blocked, dead]) + "\n")
+
+        proxy_pool.configure_proxy_pool(
+            enabled=True, files=(csv_path,), check_url=f"{base_url}/search", check_timeout=2,
+        )
+        pool = proxy_pool.get_proxy_pool()
+        # la vérification initiale tourne en tâche de fond : on en lance une complète
+        start = time.perf_counter()
+        healthy = pool.health_check()
+        check_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        reviews = extract_reviews_from_trustpilot_http("example", max_reviews, base_url=base_url)
+        elapsed = time.perf_counter() - start
+        stats = pool.stats()
+
+    scores = {p["address"]: p for p in stats["best"]}
+    errors = []
+    if len(reviews) != expected:
+        errors.append(f"{len(reviews)} avis extraits, {expected} attendus")
+    for i, item in enumerate(reviews):
+        ref = review(i)
+        if (item["review_id"], item["review"]) != (ref["id"], ref["text"]):
+            errors.append(f"avis n°{i} différent des fixtures: {item}")
+            break
+    for address in (dead, blocked):
+        if address in scores:
+            errors.append(f"proxy hors service encore disponible: {address}")
+    if slow in scores and any(a in scores and scores[a]["score"] < scores[slow]["score"] for a in fast):
+        errors.append("proxy lent mieux noté qu'un proxy rapide")
+
+    return {
+        "proxies": stats["total"],
+        "healthy": healthy,
+        "check_seconds": round(check_seconds, 3),
+        "reviews": len(reviews),
+        "seconds": round(elapsed, 3),
+        "stats": stats,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-reviews", type=int, default=CARDS_PER_PAGE * TRUSTPILOT_PAGES)
+    args = parser.parse_args()
+
+    result = run(args.max_reviews)
+    print(
+        f"{result['healthy']}/{result['proxies']} proxies fonctionnels "
+        f"(vérifiés en {result['check_seconds']} s)"
+    )
+    print(f"moteur HTTP via proxies : {result['reviews']} avis en {result['seconds']} s")
+    for proxy in result["stats"]["best"]:
+        print(f"  {proxy['address']:>21}  score={proxy['score']}  latence={proxy['latency']}  "
+              f"succès={proxy['successes']}  échecs={proxy['failures']}")
+    for error in result["errors"]:
+        print(f"ERREUR : {error}")
+    sys.exit(1 if result["errors"] else 0)
+
+
+if __name__ == "__main__":
+    main()
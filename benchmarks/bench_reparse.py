@@ -0,0 +1,90 @@
+"""
+Chronomètre la relecture hors ligne de l'archive HTML (sans navigateur).
+
+    python -m benchmarks.bench_reparse [--pages 2000] [--workers 4] [--compression gzip]
+
+Les pages de benchmarks/fixtures (une par plateforme) sont archivées
+`--pages` fois dans un répertoire temporaire, rendues uniques (l'archive
+ne stocke qu'une fois une page identique), puis relues par
+reparse_archive ; le script échoue si une page ne redonne pas ses 20 avis.
+"""
+import argparse
+import sys
+import tempfile
+import time
+
+from benchmarks.make_fixtures import CARDS_PER_PAGE, FIXTURES_DIR, main as make_fixtures
+from functions.scrapping.offline_parsing import reparse_archive
+from functions.storage.html_archive import ARCHIVE_CONFIG, HtmlArchive
+
+FIXTURE_PAGES = {
+    "trustpilot": "trustpilot.html",
+    "yelp": "yelp.html",
+    "amazon": "amazon.html",
+    "playstore": "play_store.html",
+    "google": "google.html",
+}
+
+
+def run(pages, workers, compression):
+    make_fixtures()
+    sources = {source: (FIXTURES_DIR / name).read_text(encoding="utf-8") for source, name in FIXTURE_PAGES.items()}
+
+    with tempfile.TemporaryDirectory() as directory:
+        archive = HtmlArchive(directory, compression)
+        start = time.perf_counter()
+        for i in range(pages):
+            source = list(sources)[i % len(sources)]
+            # une entreprise par page : chaque page doit redonner ses propres avis
+            archive.add(source, f"bench-{i}", sources[source].replace("</body>", f"<!-- {i} --></body>"))
+        archive_seconds = time.perf_counter() - start
+        stats = archive.stats()
+
+        start = time.perf_counter()
+        groups = reparse_archive(workers=workers, archive=archive)
+        reparse_seconds = time.perf_counter() - start
+        archive.close()
+
+    errors = [
+        f"{group['source']} {group['company']}: {len(group['reviews'])} avis, {CARDS_PER_PAGE} attendus"
+        for group in groups if len(group["reviews"]) != CARDS_PER_PAGE or group["errors"]
+    ]
+    if len(groups) != pages:
+        errors.append(f"{len(groups)} pages relues, {pages} attendues")
+
+    return {
+        "pages": pages,
+        "compression": compression,
+        "html_bytes": stats["html_bytes"],
+        "stored_bytes": stats["stored_bytes"],
+        "archive_seconds": round(archive_seconds, 3),
+        "reparse_seconds": round(reparse_seconds, 3),
+        "pages_per_second": round(pages / reparse_seconds, 1) if reparse_seconds else None,
+        "reviews": sum(len(group["reviews"]) for group in groups),
+        "errors": errors[:5],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=None, help="processus (défaut : nombre de CPU)")
+    parser.add_argument("--compression", default=ARCHIVE_CONFIG["compression"], choices=("zstd", "gzip"))
+    args = parser.parse_args()
+
+    result = run(args.pages, args.workers, args.compression)
+    print(
+        f"archivage : {result['pages']} pages en {result['archive_seconds']} s "
+        f"({result['html_bytes'] // 1024} Ko de HTML → {result['stored_bytes'] // 1024} Ko {result['compression']})"
+    )
+    print(
+        f"relecture : {result['reviews']} avis en {result['reparse_seconds']} s "
+        f"({result['pages_per_second']} pages/s)"
+    )
+    for error in result["errors"]:
+        print(f"ERREUR : {error}")
+    sys.exit(1 if result["errors"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Compare la détection de sentiment avis par avis à la détection groupée.
+
+    python -m benchmarks.bench_sentiment [--reviews 200] [--batch-sizes 8 16 32] [--threads 4]
+
+Les avis fictifs des fixtures sont répétés jusqu'à des longueurs variées
+(dont des avis de plus de 512 tokens, tronqués par le modèle). Le modèle
+nlptown est exécuté sur CPU ; le script échoue si les sentiments de la
+détection groupée diffèrent de ceux de la boucle avis par avis.
+"""
+import argparse
+import sys
+import time
+
+from benchmarks.make_fixtures import review
+from functions.generator.analysis_cache import configure_analysis_cache
+from functions.generator.response_generator import ResponseGenerator
+
+
+def sample_texts(count):
+    """Avis de 1 à ~60 phrases (les plus longs dépassent 512 tokens)"""
+    texts = []
+    for i in range(count):
+        sentences = 1 + (i * 13) % 60 if i % 10 == 0 else 1 + (i * 7) % 4
+        texts.append(" ".join(review(i + k)["text"] for k in range(sentences)))
+    return texts
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def run(count, batch_sizes, threads):
+    import torch  # importé ici : sample_texts est réutilisé sans torch (bench_sentiment_backends)
+
+    if threads:
+        torch.set_num_threads(threads)
+    # mesure du modèle seul : sans cache, la détection groupée ne relirait que des résultats connus
+    configure_analysis_cache(enabled=False)
+    generator = ResponseGenerator(use_ai=False)
+    texts = sample_texts(count)
+
+    # première inférence (chargement des poids en cache CPU) hors mesure
+    generator.detect_sentiment_batch(texts[:4])
+
+    reference, loop_seconds = timed(lambda: [generator.detect_sentiment(text) for text in texts])
+    results = {"loop": {"seconds": round(loop_seconds, 3), "reviews_per_second": round(count / loop_seconds, 1)}}
+    errors = []
+    for batch_size in batch_sizes:
+        sentiments, seconds = timed(lambda: generator.detect_sentiment_batch(texts, batch_size=batch_size))
+        results[f"batch_{batch_size}"] = {
+            "seconds": round(seconds, 3),
+            "reviews_per_second": round(count / seconds, 1),
+            "speedup": round(loop_seconds / seconds, 2),
+        }
+        different = sum(a != b for a, b in zip(sentiments, reference))
+        if different:
+            errors.append(f"batch_size={batch_size} : {different} sentiments différents de la boucle")
+
+    return {"reviews": count, "threads": torch.get_num_threads(), "results": results, "errors": errors}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reviews", type=int, default=200)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--threads", type=int, default=None, help="threads PyTorch (défaut : tous les CPU)")
+    args = parser.parse_args()
+
+    result = run(args.reviews, args.batch_sizes, args.threads)
+    print(f"{result['reviews']} avis, {result['threads']} threads CPU")
+    for name, r in result["results"].items():
+        speedup = f" (x{r['speedup']})" if "speedup" in r else ""
+        print(f"{name:<10} {r['seconds']:>8} s {r['reviews_per_second']:>8} avis/s{speedup}")
+    for error in result["errors"]:
+        print(f"ERREUR : {error}")
+    sys.exit(1 if result["errors"] else 0)
+
+
+if __name__ == "__main__":
+    main()
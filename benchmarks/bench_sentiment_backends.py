@@ -0,0 +1,162 @@
+"""
+Compare les moteurs du modèle de sentiment (PyTorch, ONNX, ONNX int8) sur CPU.
+
+    python -m benchmarks.bench_sentiment_backends [--backends pytorch onnx-int8] [--reviews 200]
+        [--batch-size 16] [--threads 4] [--min-agreement 0.95]
+
+Chaque moteur est mesuré dans un processus séparé (mémoire non partagée) :
+débit en passes groupées, latence p50/p99 d'un avis seul (cas de
+/generate-response), mémoire résidente après chargement et maximale, et
+concordance des labels avec le premier moteur de la liste (étoiles et
+sentiment). L'export ONNX, s'il n'existe pas encore, est fait au chargement
+et compte dans le temps de chargement. Le script échoue si la concordance
+des sentiments est inférieure à --min-agreement.
+"""
+import argparse
+import json
+import math
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_sentiment import sample_texts, timed
+from functions.generator.analysis_cache import configure_analysis_cache
+from functions.generator.response_generator import ResponseGenerator
+from functions.generator.sentiment_backends import SENTIMENT_BACKENDS, configure_sentiment_backend
+
+
+def rss_mb():
+    """Mémoire résidente actuelle (Linux)"""
+    try:
+        with open("/proc/self/status") as file:
+            for line in file:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        return None
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p * len(ordered)) - 1)]
+
+
+def measure(backend, count, batch_size, threads, latency_samples):
+    """Exécuté dans le processus du moteur : mesures et labels prédits"""
+    if threads:
+        configure_sentiment_backend(threads=threads)
+        if backend == "pytorch":
+            import torch
+            torch.set_num_threads(threads)
+    # mesure du modèle seul : sans cache, les avis répétés ne repasseraient pas par le modèle
+    configure_analysis_cache(enabled=False)
+    texts = sample_texts(count)
+
+    rss_start = rss_mb()
+    generator = ResponseGenerator(use_ai=False, sentiment_batch_size=batch_size, sentiment_backend=backend)
+    _, load_seconds = timed(lambda: generator.sentiment_model)
+    # première inférence (allocations, optimisation du graphe) hors mesure
+    generator.sentiment_scores_batch(texts[:4])
+    rss_loaded = rss_mb()
+
+    scores, seconds = timed(lambda: generator.sentiment_scores_batch(texts))
+    latencies = [timed(lambda: generator.sentiment_scores_batch([text]))[1] for text in texts[:latency_samples]]
+
+    return {
+        "backend": backend,
+        "load_seconds": round(load_seconds, 2),
+        "seconds": round(seconds, 3),
+        "reviews_per_second": round(count / seconds, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+        "rss_start_mb": rss_start,
+        "rss_loaded_mb": rss_loaded,
+        # ru_maxrss : Ko sous Linux
+        "rss_peak_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "labels": [max(s, key=s.get) for s in scores],
+    }
+
+
+def run_backend(backend, args):
+    """Lance la mesure d'un moteur dans un nouveau processus"""
+    with tempfile.TemporaryDirectory() as directory:
+        output = Path(directory) / "result.json"
+        command = [
+            sys.executable, "-m", "benchmarks.bench_sentiment_backends", "--worker", backend,
+            "--output", str(output), "--reviews", str(args.reviews), "--batch-size", str(args.batch_size),
+            "--latency-samples", str(args.latency_samples),
+        ]
+        if args.threads:
+            command += ["--threads", str(args.threads)]
+        completed = subprocess.run(command)
+        if completed.returncode != 0 or not output.exists():
+            return None
+        return json.loads(output.read_text(encoding="utf-8"))
+
+
+def agreement(labels, reference, mapping=lambda label: label):
+    same = sum(mapping(a) == mapping(b) for a, b in zip(labels, reference))
+    return round(same / len(reference), 4) if reference else None
+
+
+def run(args):
+    results, errors = [], []
+    for backend in args.backends:
+        result = run_backend(backend, args)
+        if result is None:
+            errors.append(f"{backend} : échec de la mesure")
+        else:
+            results.append(result)
+
+    reference = results[0] if results else None
+    for result in results:
+        result["star_agreement"] = agreement(result["labels"], reference["labels"])
+        result["sentiment_agreement"] = agreement(
+            result["labels"], reference["labels"], ResponseGenerator._sentiment_from_label,
+        )
+        if result["sentiment_agreement"] < args.min_agreement:
+            errors.append(
+                f"{result['backend']} : {result['sentiment_agreement']:.1%} des sentiments identiques "
+                f"à {reference['backend']} (minimum {args.min_agreement:.0%})"
+            )
+    return {"reviews": args.reviews, "reference": reference and reference["backend"],
+            "results": results, "errors": errors}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["pytorch", "onnx-int8"], choices=sorted(SENTIMENT_BACKENDS))
+    parser.add_argument("--reviews", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--threads", type=int, default=None, help="threads d'inférence (défaut : tous les CPU)")
+    parser.add_argument("--latency-samples", type=int, default=100, help="avis analysés un par un pour la latence")
+    parser.add_argument("--min-agreement", type=float, default=0.95)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        result = measure(args.worker, args.reviews, args.batch_size, args.threads, args.latency_samples)
+        Path(args.output).write_text(json.dumps(result), encoding="utf-8")
+        return
+
+    result = run(args)
+    print(f"{result['reviews']} avis, concordance mesurée par rapport à {result['reference']}")
+    print(f"{'moteur':<10} {'chargement':>10} {'avis/s':>8} {'p50':>8} {'p99':>8} {'RSS':>9} {'pic':>9} "
+          f"{'étoiles':>8} {'sentiment':>9}")
+    for r in result["results"]:
+        print(
+            f"{r['backend']:<10} {r['load_seconds']:>8} s {r['reviews_per_second']:>8} "
+            f"{r['p50_ms']:>5} ms {r['p99_ms']:>5} ms {r['rss_loaded_mb']:>6} Mo {r['rss_peak_mb']:>6} Mo "
+            f"{r['star_agreement']:>8.1%} {r['sentiment_agreement']:>9.1%}"
+        )
+    for error in result["errors"]:
+        print(f"ERREUR : {error}")
+    sys.exit(1 if result["errors"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Vérifie et chronomètre le moteur HTTP Trustpilot sur le serveur de fixtures.
+
+    python -m benchmarks.bench_trustpilot_http [--max-reviews 60] [--delay 0.1]
+
+Le moteur est exécuté contre benchmarks.fixture_server (recherche +
+pages /review/<domaine>?page=N avec JSON __NEXT_DATA__) ; le script échoue
+si les avis extraits ne correspondent pas aux fixtures.
+"""
+import argparse
+import sys
+import time
+
+from benchmarks.fixture_server import serve_fixtures
+from benchmarks.make_fixtures import (
+    CARDS_PER_PAGE, TRUSTPILOT_PAGES, main as make_fixtures, review,
+)
+from functions.scrapping.functions_trustpilot import extract_reviews_from_trustpilot_http
+
+
+def run(max_reviews, delay):
+    make_fixtures()
+    expected = min(max_reviews, CARDS_PER_PAGE * TRUSTPILOT_PAGES)
+
+    with serve_fixtures(delay=delay) as base_url:
+        start = time.perf_counter()
+        reviews = extract_reviews_from_trustpilot_http("example", max_reviews, base_url=base_url)
+        elapsed = time.perf_counter() - start
+
+    errors = []
+    if len(reviews) != expected:
+        errors.append(f"{len(reviews)} avis extraits, {expected} attendus")
+    for i, item in enumerate(reviews):
+        ref = review(i)
+        if (item["review_id"], item["review"], item["rating"]) != (ref["id"], ref["text"], float(ref["rating"])):
+            errors.append(f"avis n°{i} différent des fixtures: {item}")
+            break
+
+    return {
+        "reviews": len(reviews),
+        "seconds": round(elapsed, 3),
+        "reviews_per_second": round(len(reviews) / elapsed, 1) if elapsed else None,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-reviews", type=int, default=CARDS_PER_PAGE * TRUSTPILOT_PAGES)
+    parser.add_argument("--delay", type=float, default=0.0, help="latence simulée par requête (s)")
+    args = parser.parse_args()
+
+    result = run(args.max_reviews, args.delay)
+    print(
+        f"moteur HTTP : {result['reviews']} avis en {result['seconds']} s "
+        f"({result['reviews_per_second']} avis/s)"
+    )
+    for error in result["errors"]:
+        print(f"ERREUR : {error}")
+    sys.exit(1 if result["errors"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Serveur HTTP local qui sert les pages de benchmarks/fixtures.
+
+Reproduit les routes utilisées par les extracteurs :
+    /search?query=...           → fixtures/trustpilot/search.html
+                                  (search_empty.html si la requête ne contient pas "example")
+    /review/<domaine>?page=N    → fixtures/trustpilot/review/<domaine>/page_N.html
+    /amazon/product-reviews?pageNumber=N
+                                → fixtures/amazon/reviews/page_N.html
+                                  (la dernière page au-delà, comme Amazon)
+    /<fichier>                  → fixtures/<fichier>
+
+    python -m benchmarks.fixture_server [--port 8765] [--delay 0.2]
+"""
+import argparse
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from benchmarks.make_fixtures import FIXTURES_DIR, SITE_PAGES
+
+
+def resolve_fixture(path, query):
+    """Fichier de fixture correspondant à une URL (None si inconnue)"""
+    if path == "/search":
+        found = "example" in query.get("query", [""])[0].lower()
+        return FIXTURES_DIR / "trustpilot" / ("search.html" if found else "search_empty.html")
+
+    if path.startswith("/review/"):
+        domain = path[len("/review/"):].strip("/")
+        page = query.get("page", ["1"])[0]
+        return FIXTURES_DIR / "trustpilot" / "review" / domain / f"page_{page}.html"
+
+    if path == "/amazon/product-reviews":
+        page = min(int(query.get("pageNumber", ["1"])[0]), SITE_PAGES)
+        return FIXTURES_DIR / "amazon" / "reviews" / f"page_{page}.html"
+
+    candidate = (FIXTURES_DIR / path.lstrip("/")).resolve()
+    if FIXTURES_DIR.resolve() not in candidate.parents:
+        return None
+    return candidate
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    delay = 0.0  # latence réseau simulée (s)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        fixture = resolve_fixture(url.path, parse_qs(url.query))
+        if self.delay:
+            time.sleep(self.delay)
+
+        if fixture is None or not fixture.is_file():
+            self.send_error(404)
+            return
+
+        body = fixture.read_bytes()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def serve_fixtures(port=0, delay=0.0):
+    """
+    Lance le serveur de fixtures dans un thread
+
+    Args:
+        port: Port d'écoute (0 : port libre choisi par le système)
+        delay: Latence ajoutée à chaque réponse (s)
+
+    Yields:
+        URL de base du serveur (ex. http://127.0.0.1:54321)
+    """
+    handler = type("Handler", (FixtureHandler,), {"delay": delay})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.0)
+    args = parser.parse_args()
+
+    with serve_fixtures(args.port, args.delay) as base_url:
+        print(f"Fixtures servies sur {base_url} (Ctrl+C pour arrêter)")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+"""
+Génère les pages HTML de référence utilisées par les benchmarks.
+
+Les pages reprennent la structure (classes, attributs data-*) que les
+extracteurs ciblent sur chaque plateforme, avec des avis fictifs
+déterministes. Elles sont enregistrées dans benchmarks/fixtures/.
+
+    python -m benchmarks.make_fixtures
+"""
+import html
+import json
+from datetime import datetime, timedelta
+from pathlib import Path
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+CARDS_PER_PAGE = 20
+TRUSTPILOT_DOMAIN = "example.com"
+TRUSTPILOT_PAGES = 3
+SITE_PAGES = 3            # pages (ou lots chargés au scroll) des autres sites navigables
+SCROLL_LATENCY_MS = 150   # délai de chargement d'un lot d'avis au scroll
+
+SAMPLE_TEXTS = [
+    "Livraison rapide et produit conforme à la description, je recommande vivement.",
+    "Service client injoignable pendant deux semaines, très déçu de cette expérience.",
+    "Correct sans plus, le rapport qualité prix reste raisonnable pour ce type de service.",
+    "Great experience overall, the staff was friendly and the process was smooth.",
+    "Terrible support, my order arrived broken and nobody answered my emails.",
+    "Application pratique mais quelques bugs lors de la synchronisation des comptes.",
+    "Excellent accueil, personnel attentionné et locaux très propres, merci à toute l'équipe.",
+    "Average product, it does the job but I expected better quality for the price.",
+]
+
+
+LATEST_REVIEW_DATE = datetime(2025, 6, 30, 10, 0)
+
+
+def review(index):
+    """Avis fictif n°index (texte, note, auteur, date)"""
+    text = SAMPLE_TEXTS[index % len(SAMPLE_TEXTS)]
+    return {
+        "id": f"r{index:05d}",
+        "text": f"{text} (avis {index})",
+        "rating": (index * 7) % 5 + 1,
+        "author": f"Client {index}",
+        # avis du plus récent au plus ancien, comme sur les plateformes
+        "date": (LATEST_REVIEW_DATE - timedelta(hours=6 * index)).strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+    }
+
+
+def page(title, body):
+    return (
+        "<!DOCTYPE html>\n<html lang=\"fr\">\n<head><meta charset=\"utf-8\">"
+        f"<title>{html.escape(title)}</title></head>\n<body>\n{body}\n</body>\n</html>\n"
+    )
+
+
+def trustpilot_card(r):
+    return f"""
+<div class="styles_cardWrapper__g8amG styles_show__Z8n7u">
+  <article data-service-review-card-paper="true">
+    <span data-consumer-name-typography="true">{html.escape(r["author"])}</span>
+    <div class="styles_reviewHeader__DzoAZ" data-service-review-rating="{r["rating"]}">
+      <time datetime="{r["date"]}">{r["date"][:10]}</time>
+    </div>
+    <div class="styles_reviewContent__tuXiN">
+      <a href="/reviews/{r["id"]}"><h2>Avis {r["id"]}</h2></a>
+      <p>{html.escape(r["text"])}</p>
+    </div>
+  </article>
+</div>"""
+
+
+def yelp_card(r):
+    return f"""
+<li class=" y-css-19cyavo-styles">
+  <div class="user-passport"><a href="/user_details?userid={r["id"]}">{html.escape(r["author"])}</a></div>
+  <div class="arrange-unit__09f24__rqHTg"><div role="img" aria-label="{r["rating"]} étoiles"></div></div>
+  <p class="comment__09f24__D0cxf"><span class="raw__09f24__PkHSg" lang="fr">{html.escape(r["text"])}</span></p>
+</li>"""
+
+
+def amazon_card(r):
+    return f"""
+<li id="R{r["id"].upper()}" data-hook="review" class="review aok-relative">
+  <span class="a-profile-name">{html.escape(r["author"])}</span>
+  <i data-hook="review-star-rating" class="a-icon a-icon-star"><span class="a-icon-alt">{r["rating"]},0 sur 5 étoiles</span></i>
+  <span data-hook="review-date" class="review-date">Commenté en France le {r["date"][:10]}</span>
+  <span data-hook="review-body" class="review-text"><span>{html.escape(r["text"])}</span></span>
+</li>"""
+
+
+def play_store_card(r):
+    return f"""
+<div class="RHo1pe">
+  <header class="c1bOId" data-review-id="{r["id"]}">
+    <div class="X5PpBb">{html.escape(r["author"])}</div>
+    <div class="iXRFPc" role="img" aria-label="Note : {r["rating"]} étoiles sur cinq"></div>
+    <span class="bp9Aid">{r["date"][:10]}</span>
+  </header>
+  <div class="h3YV2d">{html.escape(r["text"])}</div>
+</div>"""
+
+
+def google_card(r):
+    return f"""
+<div class="jftiEf fontBodyMedium" data-review-id="{r["id"]}">
+  <div data-review-id="{r["id"]}">
+    <div class="d4r55">{html.escape(r["author"])}</div>
+    <span class="kvMYJc" role="img" aria-label="{r["rating"]} étoiles"></span>
+    <span class="rsqaWe">il y a {r["rating"]} mois</span>
+    <span class="wiI7pd">{html.escape(r["text"])}</span>
+  </div>
+</div>"""
+
+
+def trustpilot_next_data(start, count, current_page=1, total_pages=1):
+    """JSON __NEXT_DATA__ embarqué par Trustpilot dans ses pages d'avis"""
+    reviews = [review(i) for i in range(start, start + count)]
+    data = {
+        "props": {
+            "pageProps": {
+                "businessUnit": {"identifyingName": TRUSTPILOT_DOMAIN},
+                "reviews": [
+                    {
+                        "id": r["id"],
+                        "rating": r["rating"],
+                        "title": f"Avis {r['id']}",
+                        "text": r["text"],
+                        "dates": {"publishedDate": r["date"]},
+                        "consumer": {"displayName": r["author"]},
+                    }
+                    for r in reviews
+                ],
+                "filters": {"pagination": {"currentPage": current_page, "totalPages": total_pages}},
+            }
+        },
+        "page": "/review/[businessUnit]",
+    }
+    payload = json.dumps(data, ensure_ascii=False).replace("</", "<\\/")
+    return f'<script id="__NEXT_DATA__" type="application/json">{payload}</script>'
+
+
+def trustpilot_search_page(found=True):
+    """Page de résultats de la recherche Trustpilot (sans résultat si found est False)"""
+    card = (
+        f'<a name="business-unit-card" href="/review/{TRUSTPILOT_DOMAIN}">'
+        f"<p>Example</p><p>{TRUSTPILOT_DOMAIN}</p></a>"
+    ) if found else "<p>Aucun résultat</p>"
+    return page("Trustpilot - recherche", f"<main>{card}</main>")
+
+
+PLATFORMS = {
+    "trustpilot": lambda cards: page("Trustpilot", f"<main>{cards}</main>"),
+    "yelp": lambda cards: page("Yelp", f"<section id=\"reviews\"><ul>{cards}</ul></section>"),
+    "amazon": lambda cards: page("Amazon", f"<div id=\"cm_cr-review_list\"><ul>{cards}</ul></div>"),
+    "play_store": lambda cards: page(
+        "Play Store", f"<div jsname=\"bN97Pc\" style=\"height:600px;overflow-y:auto\">{cards}</div>"
+    ),
+    "google": lambda cards: page(
+        "Google Maps", f"<div class=\"m6QErb DxyBCb kA9KIf dS8AEf\" style=\"height:600px;overflow-y:auto\">{cards}</div>"
+    ),
+}
+
+CARD_BUILDERS = {
+    "trustpilot": trustpilot_card,
+    "yelp": yelp_card,
+    "amazon": amazon_card,
+    "play_store": play_store_card,
+    "google": google_card,
+}
+
+
+def build_page(platform, start=0, count=CARDS_PER_PAGE):
+    """HTML d'une page de `count` avis à partir de l'avis n°start"""
+    cards = "".join(CARD_BUILDERS[platform](review(i)) for i in range(start, start + count))
+    return PLATFORMS[platform](cards)
+
+
+def build_trustpilot_review_page(page_number, total_pages=TRUSTPILOT_PAGES):
+    """Page d'avis Trustpilot n°page_number : cartes HTML + JSON embarqué"""
+    start = (page_number - 1) * CARDS_PER_PAGE
+    cards = "".join(trustpilot_card(review(i)) for i in range(start, start + CARDS_PER_PAGE))
+    next_link = (
+        f'<a name="pagination-button-next" href="/review/{TRUSTPILOT_DOMAIN}?page={page_number + 1}">Suivant</a>'
+        if page_number < total_pages else ""
+    )
+    body = (
+        f"<main>{cards}{next_link}</main>"
+        + trustpilot_next_data(start, CARDS_PER_PAGE, page_number, total_pages)
+    )
+    return page("Trustpilot", body)
+
+
+def yelp_site_page(page_number, total_pages=SITE_PAGES):
+    """Page n°page_number d'une fiche Yelp, avec le lien vers la page suivante"""
+    start = (page_number - 1) * CARDS_PER_PAGE
+    cards = "".join(yelp_card(review(i)) for i in range(start, start + CARDS_PER_PAGE))
+    next_link = (
+        f'<a class="navigation-button__09f24__ next-link navigation-button-icon" '
+        f'href="page_{page_number + 1}.html">Suivant</a>'
+        if page_number < total_pages else ""
+    )
+    return page("Yelp", f"<section id=\"reviews\"><ul>{cards}</ul>{next_link}</section>")
+
+
+def amazon_home_page():
+    """Accueil Amazon d'un compte connecté (vérification de session)"""
+    return page("Amazon", '<span id="nav-link-accountList-nav-line-1">Bonjour, Client</span>')
+
+
+def amazon_product_page():
+    return page("Amazon", '<a class="a-link-emphasis" href="/amazon/product-reviews">Voir plus de commentaires</a>')
+
+
+def lazy_list(builder, batches):
+    """
+    Lots de cartes en <template> : le script `loadNext` en ajoute un au
+    conteneur après SCROLL_LATENCY_MS, comme un chargement réseau
+    """
+    templates = "".join(
+        f'<template class="batch">{"".join(builder(review(i)) for i in range(b * CARDS_PER_PAGE, (b + 1) * CARDS_PER_PAGE))}</template>'
+        for b in range(batches)
+    )
+    script = f"""
+<script>
+const batches = Array.from(document.querySelectorAll('template.batch'));
+let loaded = 0, pending = false;
+function loadNext(container) {{
+    if (pending || loaded >= batches.length) return;
+    pending = true;
+    setTimeout(() => {{
+        container.appendChild(batches[loaded].content.cloneNode(true));
+        loaded++;
+        pending = false;
+    }}, {SCROLL_LATENCY_MS});
+}}
+function loadOnScroll(container) {{
+    container.addEventListener('scroll', () => {{
+        if (container.scrollTop + container.clientHeight >= container.scrollHeight - 5) loadNext(container);
+    }});
+}}
+</script>"""
+    return templates + script
+
+
+def play_store_app_page(batches=SITE_PAGES):
+    """Fiche Play Store : bouton "Afficher tous les avis" puis fenêtre à scroll infini"""
+    body = f"""
+<button id="show-all"><span>Afficher tous les avis</span></button>
+<div role="dialog" id="dialog" style="display:none">
+  <div jsname="bN97Pc" style="height:600px;overflow-y:auto"></div>
+</div>
+{lazy_list(play_store_card, batches)}
+<script>
+const container = document.querySelector("div[jsname='bN97Pc']");
+loadOnScroll(container);
+document.getElementById('show-all').addEventListener('click', () => {{
+    document.getElementById('dialog').style.display = 'block';
+    loadNext(container);
+}});
+</script>"""
+    return page("Play Store", body)
+
+
+def google_place_page(batches=SITE_PAGES):
+    """Fiche Google Maps : bannière de consentement, onglet "Avis", panneau à scroll infini"""
+    body = f"""
+<div id="consent"><button><span>Tout accepter</span></button></div>
+<button aria-label="Avis sur Example" role="tab">Avis</button>
+<div class="m6QErb DxyBCb kA9KIf dS8AEf" style="height:600px;overflow-y:auto"></div>
+{lazy_list(google_card, batches)}
+<script>
+const panel = document.querySelector('div.m6QErb.DxyBCb.kA9KIf.dS8AEf');
+loadOnScroll(panel);
+document.querySelector('#consent button').addEventListener('click', () => {{
+    document.getElementById('consent').style.display = 'none';
+}});
+document.querySelector("button[aria-label^='Avis']").addEventListener('click', () => loadNext(panel));
+</script>"""
+    return page("Google Maps", body)
+
+
+def amazon_reviews_page(page_number):
+    start = (page_number - 1) * CARDS_PER_PAGE
+    return build_page("amazon", start)
+
+
+def write(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content, encoding="utf-8")
+    print(f"{path} écrit")
+
+
+def main():
+    FIXTURES_DIR.mkdir(parents=True, exist_ok=True)
+    for platform in PLATFORMS:
+        write(FIXTURES_DIR / f"{platform}.html", build_page(platform))
+
+    # Site Trustpilot navigable (recherche + pages /review/<domaine>?page=N)
+    write(FIXTURES_DIR / "trustpilot" / "search.html", trustpilot_search_page())
+    write(FIXTURES_DIR / "trustpilot" / "search_empty.html", trustpilot_search_page(found=False))
+    for n in range(1, TRUSTPILOT_PAGES + 1):
+        write(
+            FIXTURES_DIR / "trustpilot" / "review" / TRUSTPILOT_DOMAIN / f"page_{n}.html",
+            build_trustpilot_review_page(n),
+        )
+
+    # Sites navigables des autres plateformes (benchmarks des extracteurs complets)
+    for n in range(1, SITE_PAGES + 1):
+        write(FIXTURES_DIR / "yelp" / f"page_{n}.html", yelp_site_page(n))
+        write(FIXTURES_DIR / "amazon" / "reviews" / f"page_{n}.html", amazon_reviews_page(n))
+    write(FIXTURES_DIR / "amazon" / "home.html", amazon_home_page())
+    write(FIXTURES_DIR / "amazon" / "product.html", amazon_product_page())
+    write(FIXTURES_DIR / "play_store" / "app.html", play_store_app_page())
+    write(FIXTURES_DIR / "google" / "place.html", google_place_page())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""File de travaux de scraping exécutés en arrière-plan par un nombre borné de workers"""
+import contextvars
+import itertools
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+
+
+# Configuration par défaut (modifiable via configure_jobs)
+JOB_CONFIG = {
+    "workers": 4,              # travaux exécutés simultanément
+    "max_queue": 100,          # travaux en attente au-delà desquels les soumissions sont refusées
+    "retention": 3600,         # durée de conservation des travaux terminés (s)
+    "source_limits": {         # travaux simultanés par source (défaut : workers)
+        "trustpilot": 2,
+        "yelp": 2,
+        "google": 2,
+        "playstore": 2,
+        "amazon": 1,           # une seule session (cookies) à la fois
+    },
+}
+
+# Priorité par défaut : plus la valeur est petite, plus le travail passe tôt
+DEFAULT_PRIORITY = 5
+
+
+class QueueFullError(Exception):
+    """La file d'attente est pleine : le client doit réessayer plus tard"""
+
+
+class Job:
+    """Travail soumis : paramètres, état, progression et résultat"""
+
+    def __init__(self, kind, source, params, run, priority=DEFAULT_PRIORITY, sources=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.source = source
+        # sources réellement scrapées (plusieurs pour un travail multi-sources) : limites par source
+        self.sources = list(sources) if sources is not None else [source]
+        self.params = params
+        self.priority = priority
+        self.status = "queued"   # queued → running → done | failed
+        self.progress = {"stage": "queued"}
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.future = Future()   # résultat, attendu par les endpoints synchrones
+        self._run = run
+        # contexte de la requête qui soumet le travail (durées des étapes pour Server-Timing)
+        self._context = contextvars.copy_context()
+
+    def report(self, stage, done=None, total=None):
+        """Met à jour la progression (appelé par la fonction du travail)"""
+        progress = {"stage": stage}
+        if done is not None:
+            progress["done"] = done
+        if total is not None:
+            progress["total"] = total
+        self.progress = progress
+
+    def as_dict(self, with_result=True):
+        data = {
+            "id": self.id,
+            "kind": self.kind,
+            "source": self.source,
+            "params": self.params,
+            "priority": self.priority,
+            "status": self.status,
+            "progress": self.progress,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.status == "failed":
+            data["error"] = self.error
+        if with_result and self.status == "done":
+            data["result"] = self.future.result()
+        return data
+
+
+class JobManager:
+    """
+    Exécute les travaux dans `workers` threads, par ordre de priorité
+
+    Chaque source a sa propre limite de travaux simultanés : un travail dont
+    la source est saturée est mis de côté (sans bloquer de worker) et remis
+    dans la file dès qu'un travail de cette source se termine. Un travail
+    multi-sources occupe une place dans chacune de ses sources.
+    """
+
+    def __init__(self, workers=4, max_queue=100, retention=3600, source_limits=None):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.retention = retention
+        self.source_limits = dict(source_limits or {})
+        self._queue = queue.PriorityQueue()
+        self._seq = itertools.count()      # ordre d'arrivée à priorité égale
+        self._jobs = {}
+        self._running = {}                 # source → travaux en cours
+        self._active = 0                   # travaux en cours (un multi-sources compte une fois)
+        self._deferred = {}                # source → travaux en attente de la limite
+        self._lock = threading.Lock()
+        self._threads = []
+        self._closed = False
+        self._stats = {"submitted": 0, "rejected": 0, "done": 0, "failed": 0}
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _pending_count(self):
+        return self._queue.qsize() + sum(len(jobs) for jobs in self._deferred.values())
+
+    def submit(self, kind, source, params, run, priority=DEFAULT_PRIORITY, sources=None) -> Job:
+        """
+        Ajoute un travail à la file
+
+        Args:
+            kind: Type de travail ("reviews", "reviews_with_responses", ...)
+            source: Source scrapée (pour la limite par source)
+            params: Paramètres (renvoyés avec l'état du travail)
+            run: Fonction job -> résultat, exécutée par un worker
+            priority: Plus petit = plus prioritaire
+            sources: Sources scrapées par un travail multi-sources (défaut : [source])
+
+        Raises:
+            QueueFullError: si max_queue travaux sont déjà en attente
+        """
+        self.start()
+        job = Job(kind, source, params, run, priority, sources)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("La file de travaux est arrêtée")
+            self._purge()
+            if self._pending_count() >= self.max_queue:
+                self._stats["rejected"] += 1
+                raise QueueFullError(f"File pleine ({self.max_queue} travaux en attente)")
+            self._jobs[job.id] = job
+            self._stats["submitted"] += 1
+            self._queue.put((priority, next(self._seq), job))
+        return job
+
+    def retry(self, job) -> Job:
+        """
+        Soumet à nouveau un travail échoué (mêmes paramètres et priorité)
+
+        Les extracteurs reprennent à leur dernier point de reprise (voir
+        checkpoints.py) au lieu de repartir de la première page.
+        """
+        return self.submit(job.kind, job.source, job.params, job._run, job.priority, job.sources)
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _purge(self):
+        """Oublie les travaux terminés depuis plus de `retention` secondes"""
+        limit = time.time() - self.retention
+        for job_id in [j.id for j in self._jobs.values() if j.finished_at and j.finished_at < limit]:
+            del self._jobs[job_id]
+
+    def _take_slot(self, entry):
+        """Réserve une place dans chaque source du travail ; sinon le met de côté (aucune place prise)"""
+        job = entry[2]
+        with self._lock:
+            for source in job.sources:
+                if self._running.get(source, 0) >= self.source_limits.get(source, self.workers):
+                    self._deferred.setdefault(source, []).append(entry)
+                    return False
+            for source in job.sources:
+                self._running[source] = self._running.get(source, 0) + 1
+            self._active += 1
+            return True
+
+    def _release_slot(self, sources):
+        with self._lock:
+            self._active -= 1
+            for source in sources:
+                self._running[source] -= 1
+                deferred = self._deferred.get(source)
+                if deferred:
+                    # le plus prioritaire des travaux mis de côté retourne dans la file
+                    deferred.sort(key=lambda entry: entry[:2])
+                    self._queue.put(deferred.pop(0))
+
+    def _worker(self):
+        while True:
+            entry = self._queue.get()
+            job = entry[2]
+            if job is None:
+                return
+            if not self._take_slot(entry):
+                continue
+
+            job.status = "running"
+            job.started_at = time.time()
+            job.report("running")
+            try:
+                result = job._context.run(job._run, job)
+            except Exception as e:
+                job.error = f"{type(e).__name__}: {e}"
+                job.status = "failed"
+                job.future.set_exception(e)
+                self._count("failed")
+            else:
+                job.status = "done"
+                job.report("done")
+                job.future.set_result(result)
+                self._count("done")
+            finally:
+                job.finished_at = time.time()
+                self._release_slot(job.sources)
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "queued": self._pending_count(),
+                "running": self._active,
+                "running_by_source": {s: n for s, n in self._running.items() if n},
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+            }
+
+    def shutdown(self):
+        """Arrête les workers après les travaux en cours (les travaux en attente sont abandonnés)"""
+        with self._lock:
+            self._closed = True
+            threads = list(self._threads)
+        for _ in threads:
+            # priorité minimale possible : passe devant les travaux en attente
+            self._queue.put((float("-inf"), next(self._seq), None))
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def configure_jobs(**kwargs):
+    """Modifie la configuration utilisée pour la file créée ensuite"""
+    unknown = set(kwargs) - set(JOB_CONFIG)
+    if unknown:
+        raise ValueError(f"Paramètres inconnus: {', '.join(sorted(unknown))}")
+    JOB_CONFIG.update(kwargs)
+
+
+def get_job_manager() -> JobManager:
+    """File partagée (workers lancés au premier appel)"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager(**JOB_CONFIG)
+            _manager.start()
+        return _manager
+
+
+def shutdown_job_manager():
+    global _manager
+    with _manager_lock:
+        manager, _manager = _manager, None
+    if manager is not None:
+        manager.shutdown()
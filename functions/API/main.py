@@ -1,13 +1,61 @@
-from fastapi import FastAPI
+import time
+# début du démarrage (mesure du temps avant que l'API ne réponde)
+STARTED_AT = time.perf_counter()
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+import anyio
+import json
 from pydantic import BaseModel, Field
 from functions.scrapping.functions_trustpilot import extract_reviews_and_ratings_from_trustpilot
 from functions.scrapping.functions_yelp import extract_review_from_yelp, extract_reviews_and_ratings_from_yelp
 from functions.scrapping.functions_play_store import extract_review_from_gloogle_play_store, extract_reviews_and_ratings_from_google_play_store
 from functions.scrapping.functions_amazon import save_cookies, extract_review_from_amazon, extract_reviews_and_ratings_from_amazon
 from functions.scrapping.functions_google_reviews import extract_google_reviews_full_best_effort
+from functions.scrapping.driver_pool import get_driver_pool, driver_pool_stats, shutdown_driver_pools
+from functions.scrapping.proxy_pool import active_proxy_pool
+from functions.scrapping.politeness import politeness_stats
+from functions.scrapping.amazon_session import get_amazon_sessions, shutdown_amazon_sessions
+from functions.scrapping.fanout import (
+    INCREMENTAL_SOURCES, SOURCES, extract_reviews_from_all_sources, iter_source_reviews,
+)
+from functions.scrapping.resolution_cache import CompanyNotFoundError, get_resolution_cache
+from functions.API.result_cache import get_result_cache
+from functions.API.jobs import DEFAULT_PRIORITY, QueueFullError, get_job_manager, shutdown_job_manager
+from functions.scrapping.watermarks import extract_new_reviews, get_watermark_store
+from functions.scrapping.checkpoints import get_checkpoint_store
+from functions.storage.review_store import get_review_store
+from functions.storage.html_archive import ARCHIVE_CONFIG, get_html_archive
+from functions.metrics import HTTP_REQUEST_SECONDS, METRICS_CONFIG, REGISTRY, request_timings
 from functions.generator.response_generator import ResponseGenerator
+from functions.generator.analysis_cache import get_analysis_cache
+from contextlib import asynccontextmanager
+import asyncio
 from enum import Enum
 
+# Chargement des modèles (sentiment, GPT4All) en arrière-plan dès le démarrage ;
+# si False, ils sont chargés au premier avis analysé
+WARMUP_MODELS = True
+# Moteur du modèle de sentiment : "pytorch", "onnx" ou "onnx-int8" (plus rapide et
+# plus léger sur CPU, voir functions/generator/sentiment_backends.py)
+SENTIMENT_BACKEND = "pytorch"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pré-lancement des navigateurs en tâche de fond (ne bloque pas le démarrage)
+    get_driver_pool()
+    get_job_manager()
+    # Modèles chargés en arrière-plan : les endpoints de scraping répondent sans les attendre
+    if WARMUP_MODELS:
+        generator.start_warmup()
+    print(f"API démarrée en {time.perf_counter() - STARTED_AT:.2f} s (modèles : voir /readyz)")
+    yield
+    shutdown_job_manager()
+    shutdown_amazon_sessions()
+    shutdown_driver_pools()
+
+
 # app = FastAPI(title="Reviews Scraper API")
 app = FastAPI(
     title="Bot de réponse automatique aux avis clients",
@@ -29,11 +77,81 @@ app = FastAPI(
         "within seconds, ensuring a consistent and professional tone across all customer interactions.\n\n"
         "➡️ *Explore and test the endpoints via the interactive documentation (Swagger / OpenAPI).*"
     ),
+    lifespan=lifespan,
+)
+
+
+@app.middleware("http")
+async def timing_middleware(request: Request, call_next):
+    """
+    Durée de chaque requête (histogramme par route) et, si activé ou demandé
+    par l'en-tête X-Server-Timing, détail des étapes dans l'en-tête Server-Timing
+    """
+    with request_timings() as timings:
+        start = time.perf_counter()
+        response = await call_next(request)
+        elapsed = time.perf_counter() - start
+    route = request.scope.get("route")
+    HTTP_REQUEST_SECONDS.observe(
+        elapsed, method=request.method, route=route.path if route else "unmatched", status=response.status_code,
+    )
+    # réponses streamées : seules les étapes exécutées avant l'envoi des en-têtes sont comptées
+    if METRICS_CONFIG["server_timing"] or "x-server-timing" in request.headers:
+        response.headers["Server-Timing"] = timings.header(elapsed)
+    return response
+
+
+# Mesures lues au moment de l'export /metrics
+REGISTRY.gauge(
+    "reviews_api_driver_pool_browsers", "Navigateurs des pools (libres / prêtés)", ("pool", "state"),
+    lambda: {
+        (pool, state): stats[state]
+        for pool, stats in driver_pool_stats().items() for state in ("idle", "in_use")
+    },
 )
+REGISTRY.gauge(
+    "reviews_api_domain_slowdown", "Ralentissement appliqué à chaque domaine après des blocages", ("domain",),
+    lambda: {(domain,): stats["slowdown"] for domain, stats in politeness_stats().items()},
+)
+REGISTRY.gauge(
+    "reviews_api_jobs", "Travaux de scraping en attente / en cours", ("state",),
+    lambda: {(state,): get_job_manager().stats()[state] for state in ("queued", "running")},
+)
+
+
+@app.exception_handler(CompanyNotFoundError)
+async def company_not_found_handler(request: Request, exc: CompanyNotFoundError):
+    return JSONResponse(status_code=404, content={"detail": str(exc)})
+
+
+# Initialiser le générateur (modèles chargés plus tard, voir lifespan)
+generator = ResponseGenerator(use_ai=True, sentiment_backend=SENTIMENT_BACKEND)
+
 
+@app.get("/healthz")
+def healthz():
+    """
+    Le processus répond (sonde de vivacité)
+    """
+    return {"status": "ok", "uptime": round(time.perf_counter() - STARTED_AT, 1)}
+
+
+@app.get("/readyz")
+def readyz():
+    """
+    Modèles chargés (sonde de disponibilité) : 503 tant que le préchargement n'est pas terminé
+    """
+    status = generator.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
 
-# Initialiser le générateur
-generator = ResponseGenerator(use_ai=True)
+
+@app.post("/generator/warmup", status_code=202)
+def warmup_models():
+    """
+    Lance le chargement des modèles en arrière-plan (sans effet s'ils sont déjà chargés)
+    """
+    generator.start_warmup()
+    return generator.status()
 
 # Modèle pour la requête POST
 class ReviewRequest(BaseModel):
@@ -112,33 +230,520 @@ class ReviewSource(str, Enum):
     playstore = "playstore"
     amazon = "amazon"
 
+class ScrapingEngine(str, Enum):
+    auto = "auto"
+    http = "http"
+    selenium = "selenium"
+
+def iter_reviews(source: ReviewSource, search, max_reviews, engine: ScrapingEngine, since=None):
+    """
+    Générateur d'avis de la source (sans cache) ; `since` : watermark de reprise
+
+    Les avis sont enregistrés au passage dans le stockage local (voir GET /stored-reviews).
+    """
+    return get_review_store().ingest_stream(
+        source.value, search, iter_source_reviews(source.value, search, max_reviews, engine.value, since)
+    )
+
+
+def scrape_reviews(source: ReviewSource, search, max_reviews, engine: ScrapingEngine, since=None):
+    """Lance l'extracteur de la source (sans cache) ; `since` : watermark de reprise"""
+    return list(iter_reviews(source, search, max_reviews, engine, since))
+
+
+def new_reviews(source: ReviewSource, search, max_reviews, engine: ScrapingEngine):
+    """Avis publiés depuis la dernière extraction (watermark mis à jour)"""
+    return extract_new_reviews(
+        source.value, search,
+        lambda since: scrape_reviews(source, search, max_reviews, engine, since),
+    )
+
+
+def cached_reviews(source: ReviewSource, search, max_reviews, engine: ScrapingEngine, refresh=False):
+    """Avis via le cache de résultats ; retourne (avis, statut du cache)"""
+    return get_result_cache().get_or_fetch(
+        source.value, search, max_reviews,
+        fetch=lambda n: scrape_reviews(source, search, n, engine),
+        refresh=refresh,
+    )
+
+
+def fetch_reviews(source: ReviewSource, search, max_reviews, engine: ScrapingEngine,
+                  refresh=False, only_new=False):
+    """Avis d'une entreprise ; retourne (avis, statut du cache)"""
+    if only_new:
+        return new_reviews(source, search, max_reviews, engine), "bypass"
+    return cached_reviews(source, search, max_reviews, engine, refresh)
+
+
+def add_responses(reviews, job=None):
+    """Génère la réponse, la langue et le sentiment de chaque avis (en place)"""
+    with_text = [review for review in reviews if review.get('review')]
+    if job is not None:
+        job.report("analysis", 0, len(with_text))
+    # langue, sentiment (passes groupées du modèle) et ton : une seule analyse par avis
+    analyses = generator.analyze_batch(
+        [review['review'] for review in with_text], [review.get('rating') for review in with_text]
+    )
+
+    for i, (review, analysis) in enumerate(zip(with_text, analyses)):
+        if job is not None:
+            job.report("responding", i, len(with_text))
+        
+        response = generator.generate_response(
+            review_text=review['review'],
+            rating=review.get('rating'),
+            # tone=tone
+            analysis=analysis,
+        )
+        review['generated_response'] = response
+        review['detected_language'] = analysis.language
+        review['detected_sentiment'] = analysis.sentiment
+        review['sentiment_scores'] = analysis.sentiment_scores
+    return reviews
+
+
+# ---------- Travaux asynchrones ----------
+
+class JobKind(str, Enum):
+    reviews = "reviews"
+    reviews_with_responses = "reviews_with_responses"
+
+
+class JobRequest(BaseModel):
+    kind: JobKind = JobKind.reviews
+    source: ReviewSource
+    search: str | None = None
+    max_reviews: int = Field(50, ge=1)
+    engine: ScrapingEngine = ScrapingEngine.auto
+    refresh: bool = False
+    only_new: bool = False
+    priority: int = Field(DEFAULT_PRIORITY, ge=0, le=9, description="0 = le plus prioritaire")
+
+
+def run_job(job):
+    """Exécute un travail soumis via submit_job (dans un worker de la file)"""
+    p = job.params
+    source, engine = ReviewSource(p["source"]), ScrapingEngine(p["engine"])
+    job.report("scraping")
+    reviews, cache_status = fetch_reviews(
+        source, p["search"], p["max_reviews"], engine, p["refresh"], p["only_new"]
+    )
+
+    if job.kind == JobKind.reviews.value:
+        return {
+            "search": p["search"],
+            "requested_reviews": p["max_reviews"],
+            "cache": cache_status,
+            "data": reviews
+        }
+
+    add_responses(reviews, job)
+    return {
+        "url": p["search"],
+        "requested_reviews": p["max_reviews"],
+        "returned_reviews": len(reviews),
+        "cache": cache_status,
+        "data": reviews
+    }
+
+
+def submit_job(request: JobRequest):
+    """Ajoute le travail à la file ; 429 si la file est pleine"""
+    if request.only_new and request.source.value not in INCREMENTAL_SOURCES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"only_new n'est pas disponible pour {request.source.value} (avis sans identifiant ni date)",
+        )
+    params = request.model_dump(mode="json", exclude={"kind", "priority"})
+    try:
+        return get_job_manager().submit(
+            request.kind.value, request.source.value, params, run_job, request.priority
+        )
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+
+
+@app.post("/jobs", status_code=202)
+def create_job(request: JobRequest):
+    """
+    Soumet un travail de scraping (`reviews`) ou de scraping + réponses
+    (`reviews_with_responses`) ; suivre son état avec GET /jobs/{id}
+
+    Répond 429 si la file d'attente est pleine.
+    """
+    return submit_job(request).as_dict()
+
+
+@app.get("/jobs")
+def get_jobs_stats():
+    """
+    État de la file de travaux (en attente, en cours par source, terminés, refusés)
+    """
+    return get_job_manager().stats()
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """
+    État, progression et résultat d'un travail
+    """
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Travail inconnu ou expiré")
+    return job.as_dict()
+
+
+@app.post("/jobs/{job_id}/retry", status_code=202)
+def retry_job(job_id: str):
+    """
+    Relance un travail échoué : les longues extractions reprennent à la page
+    (ou au scroll) où elles se sont arrêtées
+
+    Répond 409 si le travail n'a pas échoué, 429 si la file d'attente est pleine.
+    """
+    manager = get_job_manager()
+    job = manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Travail inconnu ou expiré")
+    if job.status != "failed":
+        raise HTTPException(status_code=409, detail=f"Travail {job.status} : seul un travail échoué peut être relancé")
+    try:
+        return manager.retry(job).as_dict()
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+
+
 @app.get("/reviews")
-def get_reviews(
+async def get_reviews(
     source: ReviewSource, 
     search: str | None = None,
-    max_reviews: int = 50
+    max_reviews: int = Query(50, ge=1),
+    engine: ScrapingEngine = ScrapingEngine.auto,
+    refresh: bool = False,
+    only_new: bool = False
 ):
-    if source == ReviewSource.trustpilot:
-        reviews = extract_reviews_and_ratings_from_trustpilot(search, max_reviews)
+    """
+    Récupère les avis d'une entreprise
+
+    `engine` (Trustpilot uniquement) : `http` lit les pages sans navigateur,
+    `selenium` pilote Chrome, `auto` tente HTTP puis bascule sur Selenium.
 
-    elif source == ReviewSource.yelp:
-        reviews = extract_reviews_and_ratings_from_yelp(search, max_reviews)
+    Les résultats sont mis en cache (`cache` : hit, stale ou miss) ;
+    `refresh=true` force un nouveau scraping.
+
+    `only_new=true` : seulement les avis publiés depuis la précédente requête
+    `only_new` pour cette entreprise (l'extraction s'arrête au dernier avis
+    connu ; le cache n'est pas utilisé). Non disponible pour Yelp (400).
+
+    Le scraping passe par la file de travaux (voir POST /jobs) : la requête
+    attend son résultat sans occuper de thread du serveur.
+    """
+    job = submit_job(JobRequest(
+        kind=JobKind.reviews, source=source, search=search, max_reviews=max_reviews,
+        engine=engine, refresh=refresh, only_new=only_new,
+    ))
+    return await asyncio.wrap_future(job.future)
 
-    elif source == ReviewSource.google:
-        reviews = extract_google_reviews_full_best_effort(search, max_reviews)
 
-    elif source == ReviewSource.playstore:
-        reviews = extract_reviews_and_ratings_from_google_play_store(search, max_reviews)
 
-    elif source == ReviewSource.amazon:
-        reviews = extract_reviews_and_ratings_from_amazon(search, max_reviews)
+class StreamFormat(str, Enum):
+    ndjson = "ndjson"
+    sse = "sse"
 
+
+def format_stream_event(event, data, fmt: StreamFormat):
+    """Un avis (ou un événement de fin / d'erreur) au format NDJSON ou Server-Sent Events"""
+    if fmt == StreamFormat.sse:
+        return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+    if event != "review":
+        data = {"event": event, **data}
+    return json.dumps(data, ensure_ascii=False) + "\n"
+
+
+async def stream_reviews_events(request: Request, reviews, fmt: StreamFormat):
+    """
+    Transmet les avis du générateur au fil de l'eau
+
+    Chaque avis est lu dans un thread (le scraping est bloquant) puis envoyé
+    aussitôt : rien n'est accumulé en mémoire. Si le client se déconnecte, le
+    générateur est fermé, ce qui rend le navigateur au pool.
+    """
+    count = 0
+    end = object()
+    try:
+        while not await request.is_disconnected():
+            item = await run_in_threadpool(next, reviews, end)
+            if item is end:
+                yield format_stream_event("end", {"count": count}, fmt)
+                break
+            count += 1
+            yield format_stream_event("review", item, fmt)
+    except Exception as e:
+        status = 404 if isinstance(e, CompanyNotFoundError) else 500
+        yield format_stream_event("error", {"status": status, "detail": str(e), "count": count}, fmt)
+    finally:
+        # protégé de l'annulation (déconnexion) pour que la fermeture ait bien lieu
+        with anyio.CancelScope(shield=True):
+            await run_in_threadpool(reviews.close)
+
+
+@app.get("/reviews/stream")
+async def stream_reviews(
+    request: Request,
+    source: ReviewSource,
+    search: str | None = None,
+    max_reviews: int = Query(50, ge=1),
+    engine: ScrapingEngine = ScrapingEngine.auto,
+    format: StreamFormat = StreamFormat.ndjson
+):
+    """
+    Transmet les avis au fur et à mesure du scraping
+
+    `format=ndjson` : un avis JSON par ligne, puis `{"event": "end", "count": N}` ;
+    `format=sse` : événements Server-Sent Events `review`, puis `end`
+    (ou `error` si le scraping échoue en cours de route).
+
+    Le cache de résultats n'est pas utilisé ; la fermeture de la connexion
+    arrête le scraping. Pour une longue extraction (voir checkpoints.py), les
+    pages déjà transmises restent dans le point de reprise : la prochaine
+    requête sur la même entreprise et la même source repart de là
+    (DELETE /scraper/checkpoints pour l'éviter).
+    """
+    reviews = iter_reviews(source, search, max_reviews, engine)
+    if format == StreamFormat.sse:
+        media_type = "text/event-stream"
+        headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    else:
+        media_type = "application/x-ndjson"
+        headers = {}
+    return StreamingResponse(stream_reviews_events(request, reviews, format), media_type=media_type, headers=headers)
+
+
+def run_fanout_job(job):
+    p = job.params
+    job.report("scraping", 0, len(p["sources"]))
+    start = time.monotonic()
+    results = extract_reviews_from_all_sources(
+        p["search"], p["max_reviews"], sources=p["sources"], engine=p["engine"],
+        timeouts=p["timeouts"],
+    )
+    store = get_review_store()
+    for source, result in results.items():
+        store.ingest(source, p["search"], result["reviews"])
     return {
+        "search": p["search"],
+        "requested_reviews": p["max_reviews"],
+        "wall_seconds": round(time.monotonic() - start, 3),
+        "sources": {
+            source: {k: v for k, v in result.items() if k != "reviews"}
+            for source, result in results.items()
+        },
+        "data": {source: result["reviews"] for source, result in results.items()},
+    }
+
+
+@app.get("/reviews/all")
+async def get_reviews_all_sources(
+    search: str,
+    max_reviews: int = Query(50, ge=1),
+    sources: list[ReviewSource] = Query(default=list(ReviewSource)),
+    engine: ScrapingEngine = ScrapingEngine.auto,
+    timeout: float | None = None
+):
+    """
+    Récupère les avis de l'entreprise sur toutes les plateformes en même temps
+
+    Chaque source a son propre délai (`timeout` pour toutes, sinon celui de
+    la source) ; une source en échec ou hors délai n'empêche pas les autres.
+    `sources` donne, par source, le statut (ok, timeout, error), le nombre
+    d'avis et la durée ; pour Google, `search` peut être une URL Google Maps.
+    """
+    params = {
         "search": search,
-        "requested_reviews": max_reviews,
-        "data": reviews
+        "max_reviews": max_reviews,
+        "sources": [s.value for s in dict.fromkeys(sources)],
+        "engine": engine.value,
+        "timeouts": {s: timeout for s in SOURCES} if timeout else None,
     }
+    try:
+        # une place dans chaque source scrapée : la limite Amazon (1) vaut aussi pour les travaux multi-sources
+        job = get_job_manager().submit("reviews_all", "all", params, run_fanout_job, sources=params["sources"])
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+    return await asyncio.wrap_future(job.future)
+
+
+@app.get("/stored-reviews")
+def get_stored_reviews(
+    source: ReviewSource | None = None,
+    search: str | None = None,
+    min_rating: float | None = None,
+    max_rating: float | None = None,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: str | None = None
+):
+    """
+    Lit les avis déjà scrapés dans le stockage local, sans relancer de scraping
 
+    Les avis sont rendus du plus récemment enregistré au plus ancien ;
+    passer `next_cursor` en `cursor` pour obtenir la page suivante
+    (`next_cursor` vaut null sur la dernière page).
+    """
+    if cursor is not None and not cursor.isdigit():
+        raise HTTPException(status_code=400, detail="Curseur invalide")
+    reviews, next_cursor = get_review_store().search(
+        source.value if source else None, search, min_rating, max_rating, limit, cursor
+    )
+    return {"count": len(reviews), "next_cursor": next_cursor, "data": reviews}
+
+
+@app.get("/stored-reviews/stats")
+def get_stored_reviews_stats():
+    """
+    Nombre d'avis et d'entreprises enregistrés par source
+    """
+    return get_review_store().stats()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """
+    Mesures au format Prometheus : durées par étape (launch, search, page_load,
+    extract, detect_language, detect_sentiment, generate) et par route HTTP
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/scraper/pool-stats")
+def get_pool_stats():
+    """
+    Statistiques du pool de navigateurs (hits, attentes, lancements, recyclages)
+    """
+    return driver_pool_stats()
+
+
+@app.get("/scraper/amazon-sessions")
+def get_amazon_sessions_stats():
+    """
+    État des profils Chrome Amazon (connectés ou non, dernière vérification)
+    """
+    return get_amazon_sessions().stats()
+
+
+@app.delete("/scraper/amazon-sessions")
+def check_amazon_sessions():
+    """
+    Force la vérification de la connexion Amazon au prochain scraping
+    """
+    get_amazon_sessions().invalidate()
+    return get_amazon_sessions().stats()
+
+
+@app.get("/scraper/proxies")
+def get_proxy_stats():
+    """
+    État du pool de proxies (disponibles, écartés, évincés, meilleurs scores)
+    """
+    pool = active_proxy_pool()
+    if pool is None:
+        return {"enabled": False}
+    return {"enabled": True, **pool.stats()}
+
+
+@app.get("/scraper/politeness")
+def get_politeness_stats():
+    """
+    Budgets par domaine : débit courant, ralentissement après blocage, requêtes en vol et en attente
+    """
+    return politeness_stats()
+
+
+@app.get("/scraper/resolution-cache")
+def get_resolution_cache_stats():
+    """
+    Statistiques du cache entreprise → URL (hits, recherches, taux de réussite)
+    """
+    return get_resolution_cache().stats()
+
+
+@app.delete("/scraper/resolution-cache")
+def invalidate_resolution_cache(source: str | None = None, search: str | None = None):
+    """
+    Supprime des entrées du cache entreprise → URL (toutes, d'une source
+    ou d'une entreprise), par exemple après un changement d'URL sur le site
+    """
+    return {"invalidated": get_resolution_cache().invalidate(source, search)}
+
+
+@app.get("/scraper/result-cache")
+def get_result_cache_stats():
+    """
+    Statistiques du cache des résultats de /reviews (hits, périmés servis, rafraîchissements)
+    """
+    return get_result_cache().stats()
+
+
+@app.delete("/scraper/result-cache")
+def invalidate_result_cache(source: ReviewSource | None = None, search: str | None = None):
+    """
+    Supprime des résultats en cache (tous, d'une source ou d'une entreprise)
+    """
+    return {"invalidated": get_result_cache().invalidate(source.value if source else None, search)}
+
+
+@app.delete("/scraper/watermarks")
+def reset_watermarks(source: ReviewSource | None = None, search: str | None = None):
+    """
+    Supprime les watermarks : la prochaine requête `only_new` repart du début
+    """
+    return {"reset": get_watermark_store().reset(source.value if source else None, search)}
+
+
+@app.get("/scraper/checkpoints")
+def get_checkpoints():
+    """
+    Extractions interrompues pouvant reprendre (position, nombre d'avis déjà extraits)
+    """
+    return get_checkpoint_store().entries()
+
+
+@app.delete("/scraper/checkpoints")
+def delete_checkpoints(extractor: str | None = None, search: str | None = None):
+    """
+    Supprime les points de reprise : la prochaine extraction repart de la première page
+
+    `extractor` : trustpilot_http, trustpilot_selenium, yelp, google, playstore ou amazon
+    """
+    return {"deleted": get_checkpoint_store().delete(extractor, search)}
+
+
+@app.get("/scraper/html-archive")
+def get_html_archive_stats():
+    """
+    Pages HTML archivées pour la relecture hors ligne (python -m functions.scrapping.offline_parsing)
+    """
+    if not ARCHIVE_CONFIG["enabled"]:
+        return {"enabled": False}
+    return {"enabled": True, **get_html_archive().stats()}
+
+
+@app.get("/generator/analysis-cache")
+def get_analysis_cache_stats():
+    """
+    Cache des détections de langue et de sentiment : entrées, hits / misses par détecteur
+    """
+    cache = get_analysis_cache()
+    return cache.stats() if cache is not None else {"enabled": False}
+
+
+@app.delete("/generator/analysis-cache")
+def clear_analysis_cache(detector: str | None = None):
+    """
+    Vide le cache des détections (ou celui d'un détecteur, ex. language:langdetect)
+    """
+    cache = get_analysis_cache()
+    return {"deleted": cache.clear(detector) if cache is not None else 0}
 
 
 @app.post("/generate-response")
@@ -146,22 +751,21 @@ def generate_response(request: ReviewRequest):
     """
     Génère une réponse pour UN avis
     """
+    analysis = generator.analyze(request.review_text, request.rating)
     response = generator.generate_response(
         review_text=request.review_text,
         rating=request.rating,
-        tone=request.tone
+        # tone=request.tone (champ commenté dans ReviewRequest)
+        analysis=analysis,
     )
     
-    language = generator.detect_language(request.review_text)
-    sentiment = generator.detect_sentiment(request.review_text)
-    auto_tone = generator.auto_detect_tone(request.review_text, request.rating)
-    
     return {
         "review": request.review_text,
         "rating": request.rating,
-        "detected_language": language,
-        "detected_sentiment": sentiment,
-        "response_tone": auto_tone,
+        "detected_language": analysis.language,
+        "detected_sentiment": analysis.sentiment,
+        "sentiment_scores": analysis.sentiment_scores,
+        "response_tone": analysis.tone,
         # "used_tone": request.tone or auto_tone,
         "generated_response": response
     }
@@ -169,47 +773,21 @@ def generate_response(request: ReviewRequest):
 
 
 @app.get("/reviews-with-responses")
-def get_reviews_with_responses(
+async def get_reviews_with_responses(
     source: ReviewSource,
     url: str | None = None,
-    max_reviews: int = 50,
+    max_reviews: int = Query(50, ge=1),
+    engine: ScrapingEngine = ScrapingEngine.auto,
+    refresh: bool = False,
     # tone: str | None = None
 ):
     """
     Récupère les avis ET génère automatiquement les réponses
+
+    Passe par la file de travaux (voir POST /jobs).
     """
-    # Récupérer les avis
-    if source == ReviewSource.trustpilot:
-        reviews = extract_reviews_and_ratings_from_trustpilot(url, max_reviews)
-    elif source == ReviewSource.yelp:
-        reviews = extract_reviews_and_ratings_from_yelp(url, max_reviews)
-    elif source == ReviewSource.google:
-        reviews = extract_google_reviews_full_best_effort(url, max_reviews)
-    elif source == ReviewSource.playstore:
-        reviews = extract_reviews_and_ratings_from_google_play_store(url, max_reviews)
-    elif source == ReviewSource.amazon:
-        reviews = extract_reviews_and_ratings_from_amazon(url, max_reviews)
-    else:
-        return {"error": "Source invalide"}
-    
-    # Générer les réponses pour chaque avis
-    for review in reviews:
-        review_text = review.get('review', '')
-        rating = review.get('rating')
-        
-        if review_text:
-            response = generator.generate_response(
-                review_text=review_text,
-                rating=rating,
-                # tone=tone
-            )
-            review['generated_response'] = response
-            review['detected_language'] = generator.detect_language(review_text)
-            review['detected_sentiment'] = generator.detect_sentiment(review_text)
-    
-    return {
-        "url": url,
-        "requested_reviews": max_reviews,
-        "returned_reviews": len(reviews),
-        "data": reviews
-    }
+    job = submit_job(JobRequest(
+        kind=JobKind.reviews_with_responses, source=source, search=url,
+        max_reviews=max_reviews, engine=engine, refresh=refresh,
+    ))
+    return await asyncio.wrap_future(job.future)
@@ -0,0 +1,265 @@
+"""Cache des résultats de scraping servis par l'API (/reviews, /reviews-with-responses)"""
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from functions.API.jobs import QueueFullError, get_job_manager
+from functions.scrapping.resolution_cache import normalize_company
+from functions.storage.sqlite import DATA_DIR, SQLiteStore
+
+
+# Durée de fraîcheur des résultats par source (s)
+SOURCE_TTLS = {
+    "trustpilot": 6 * 3600,
+    "yelp": 12 * 3600,
+    "google": 6 * 3600,
+    "playstore": 3 * 3600,
+    "amazon": 12 * 3600,
+}
+
+# Configuration par défaut (modifiable via configure_result_cache)
+RESULT_CACHE_CONFIG = {
+    "max_entries": 256,                               # entrées gardées en mémoire (LRU)
+    "default_ttl": 6 * 3600,                          # sources absentes de SOURCE_TTLS
+    "stale_ttl": 24 * 3600,                           # résultat périmé encore servi pendant le rafraîchissement
+    "disk_path": DATA_DIR / "result_cache.sqlite3",   # None : cache en mémoire uniquement
+}
+
+# Priorité des rafraîchissements dans la file de travaux : après les requêtes des clients
+REFRESH_PRIORITY = 9
+
+
+class _DiskTier(SQLiteStore):
+    """Second niveau du cache : résultats conservés entre deux redémarrages"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS results (
+        source TEXT NOT NULL,
+        search TEXT NOT NULL,
+        requested INTEGER NOT NULL,   -- max_reviews de la requête d'origine
+        reviews TEXT NOT NULL,        -- liste d'avis en JSON
+        fetched_at REAL NOT NULL,
+        PRIMARY KEY (source, search)
+    );
+    """
+
+    def load(self, key):
+        rows = self.query(
+            "SELECT requested, reviews, fetched_at FROM results WHERE source = ? AND search = ?", key
+        )
+        if not rows:
+            return None
+        row = rows[0]
+        return {"requested": row["requested"], "reviews": json.loads(row["reviews"]), "fetched_at": row["fetched_at"]}
+
+    def save(self, key, entry):
+        self.execute(
+            "INSERT OR REPLACE INTO results (source, search, requested, reviews, fetched_at) VALUES (?, ?, ?, ?, ?)",
+            (*key, entry["requested"], json.dumps(entry["reviews"], ensure_ascii=False), entry["fetched_at"]),
+        )
+
+    def delete(self, source=None, search=None):
+        clauses, params = [], []
+        if source is not None:
+            clauses.append("source = ?")
+            params.append(source)
+        if search is not None:
+            clauses.append("search = ?")
+            params.append(search)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self.execute(f"DELETE FROM results{where}", params).rowcount
+
+
+class ResultCache:
+    """
+    Cache (source, recherche) → avis, en mémoire (LRU) et optionnellement sur disque
+
+    - Une entrée obtenue avec max_reviews=N répond à toute requête de N avis
+      ou moins, jamais à une requête plus grande : un résultat de moins de N
+      avis peut venir d'une extraction interrompue (délai dépassé, page de
+      blocage) et non de la fin des avis.
+    - Pendant `ttl` le résultat est frais ; pendant `stale_ttl` ensuite il est
+      servi immédiatement tandis qu'un rafraîchissement passe par la file de
+      travaux, avec ses limites par source (stale-while-revalidate) ; au-delà,
+      le scraping est relancé.
+    - Les résultats vides ne sont pas mis en cache (souvent un blocage du site).
+    """
+
+    def __init__(self, max_entries=256, default_ttl=6 * 3600, stale_ttl=24 * 3600,
+                 disk_path=None, ttls=None):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.stale_ttl = stale_ttl
+        self.ttls = dict(SOURCE_TTLS if ttls is None else ttls)
+        self._disk = _DiskTier(disk_path) if disk_path is not None else None
+        self._entries = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "refresh_errors": 0, "disk_hits": 0}
+
+    @staticmethod
+    def _key(source, search):
+        return (source, normalize_company(search))
+
+    def ttl(self, source):
+        return self.ttls.get(source, self.default_ttl)
+
+    # ---------- Lecture / écriture des entrées ----------
+
+    def _get_entry(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        if self._disk is None:
+            return None
+        entry = self._disk.load(key)
+        if entry is not None:
+            with self._lock:
+                self._stats["disk_hits"] += 1
+            self._put_memory(key, entry)
+        return entry
+
+    def _put_memory(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _store(self, key, requested, reviews):
+        if not reviews:
+            return
+        entry = {"requested": requested, "reviews": list(reviews), "fetched_at": time.time()}
+        current = self._get_entry(key)
+        # Ne pas remplacer un résultat frais plus complet par un plus petit
+        if (current is not None and current["requested"] > requested
+                and time.time() - current["fetched_at"] < self.ttl(key[0])):
+            return
+        self._put_memory(key, entry)
+        if self._disk is not None:
+            self._disk.save(key, entry)
+
+    @staticmethod
+    def _covers(entry, max_reviews):
+        return max_reviews <= entry["requested"]
+
+    # ---------- API ----------
+
+    def get_or_fetch(self, source, search, max_reviews, fetch, refresh=False):
+        """
+        Retourne les avis en cache ou lance le scraping
+
+        Args:
+            source: Plateforme
+            search: Entreprise recherchée
+            max_reviews: Nombre maximum d'avis
+            fetch: Fonction max_reviews -> liste d'avis (scraping)
+            refresh: Ignore le cache et relance le scraping
+
+        Returns:
+            (liste d'avis, statut) avec statut "hit", "stale" ou "miss"
+        """
+        key = self._key(source, search)
+        entry = None if refresh else self._get_entry(key)
+
+        if entry is not None and self._covers(entry, max_reviews):
+            age = time.time() - entry["fetched_at"]
+            ttl = self.ttl(source)
+            if age < ttl:
+                self._count("hits")
+                return self._copy(entry, max_reviews), "hit"
+            if age < ttl + self.stale_ttl:
+                self._count("stale_hits")
+                self._refresh_in_background(key, entry["requested"], fetch)
+                return self._copy(entry, max_reviews), "stale"
+
+        self._count("misses")
+        reviews = fetch(max_reviews)
+        self._store(key, max_reviews, reviews)
+        return [dict(r) for r in reviews[:max_reviews]], "miss"
+
+    def _refresh_in_background(self, key, requested, fetch):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run(job):
+            try:
+                self._store(key, requested, fetch(requested))
+                self._count("refreshes")
+            except Exception as e:
+                self._count("refresh_errors")
+                print(f"Rafraîchissement du cache impossible pour {key}: {e}")
+                raise
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        try:
+            get_job_manager().submit(
+                "cache_refresh", key[0], {"search": key[1], "max_reviews": requested}, run, REFRESH_PRIORITY,
+            )
+        except (QueueFullError, RuntimeError) as e:
+            # file pleine ou arrêtée : le résultat périmé reste servi, rafraîchi à la prochaine requête
+            print(f"Rafraîchissement du cache reporté pour {key}: {e}")
+            with self._lock:
+                self._refreshing.discard(key)
+
+    @staticmethod
+    def _copy(entry, max_reviews):
+        # copie : les appelants complètent les avis (réponses générées)
+        return [dict(r) for r in entry["reviews"][:max_reviews]]
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def invalidate(self, source=None, search=None):
+        """Supprime les entrées (toutes, d'une source, ou d'une recherche) ; retourne leur nombre"""
+        norm = normalize_company(search) if search is not None else None
+        with self._lock:
+            keys = [
+                k for k in self._entries
+                if (source is None or k[0] == source) and (norm is None or k[1] == norm)
+            ]
+            for k in keys:
+                del self._entries[k]
+        deleted = len(keys)
+        if self._disk is not None:
+            deleted = max(deleted, self._disk.delete(source, norm))
+        return deleted
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["refreshing"] = len(self._refreshing)
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits"] + stats["stale_hits"]) / lookups, 3) if lookups else None
+        stats["disk"] = self._disk is not None
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def configure_result_cache(**kwargs):
+    """Modifie la configuration utilisée pour le cache créé ensuite"""
+    unknown = set(kwargs) - set(RESULT_CACHE_CONFIG)
+    if unknown:
+        raise ValueError(f"Paramètres inconnus: {', '.join(sorted(unknown))}")
+    RESULT_CACHE_CONFIG.update(kwargs)
+
+
+def get_result_cache() -> ResultCache:
+    """Cache partagé (créé au premier appel)"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache(**RESULT_CACHE_CONFIG)
+        return _cache
@@ -0,0 +1,198 @@
+"""Cache des détections de langue et de sentiment, adressé par le contenu normalisé des avis"""
+import hashlib
+import json
+import threading
+import unicodedata
+from collections import OrderedDict
+
+from functions.metrics import REGISTRY
+from functions.storage.sqlite import DATA_DIR, SQLiteStore
+
+
+DEFAULT_DISK_PATH = DATA_DIR / "analysis_cache.sqlite3"
+
+# Configuration par défaut (modifiable via configure_analysis_cache)
+ANALYSIS_CACHE_CONFIG = {
+    "enabled": True,
+    "max_entries": 50_000,     # résultats gardés en mémoire (LRU)
+    "disk_path": None,         # DEFAULT_DISK_PATH : résultats conservés entre deux redémarrages
+}
+
+ANALYSIS_CACHE_LOOKUPS = REGISTRY.counter(
+    "reviews_api_analysis_cache_lookups_total",
+    "Recherches dans le cache des détections (hit, disk_hit, miss)", ("detector", "result"),
+)
+
+
+def text_key(text):
+    """Empreinte du texte normalisé (Unicode NFC, espaces réduits) : les avis identiques partagent leur résultat"""
+    normalized = " ".join(unicodedata.normalize("NFC", text or "").split())
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+class _DiskTier(SQLiteStore):
+    """Second niveau du cache : détections conservées entre deux redémarrages"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS analyses (
+        detector TEXT NOT NULL,       -- détecteur et modèle ("sentiment:nlptown/...")
+        key TEXT NOT NULL,            -- empreinte du texte normalisé
+        value TEXT NOT NULL,          -- résultat en JSON
+        PRIMARY KEY (detector, key)
+    );
+    """
+
+    def load_many(self, detector, keys):
+        found = {}
+        keys = list(keys)
+        # par paquets : limite du nombre de paramètres d'une requête SQLite
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = self.query(
+                f"SELECT key, value FROM analyses WHERE detector = ? AND key IN ({', '.join('?' * len(chunk))})",
+                (detector, *chunk),
+            )
+            found.update((row["key"], json.loads(row["value"])) for row in rows)
+        return found
+
+    def save_many(self, detector, values):
+        self.executemany(
+            "INSERT OR REPLACE INTO analyses (detector, key, value) VALUES (?, ?, ?)",
+            [(detector, key, json.dumps(value, ensure_ascii=False)) for key, value in values.items()],
+        )
+
+    def delete(self, detector=None):
+        if detector is None:
+            return self.execute("DELETE FROM analyses").rowcount
+        return self.execute("DELETE FROM analyses WHERE detector = ?", (detector,)).rowcount
+
+
+class AnalysisCache:
+    """
+    Résultats des détecteurs par (détecteur, empreinte du texte), en mémoire (LRU)
+    et optionnellement sur disque
+
+    Le nom du détecteur inclut le modèle utilisé : changer de modèle ne
+    réutilise pas les résultats de l'ancien.
+    """
+
+    def __init__(self, max_entries=50_000, disk_path=None):
+        self.max_entries = max_entries
+        self._disk = _DiskTier(disk_path) if disk_path is not None else None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _count(self, detector, result, amount):
+        if not amount:
+            return
+        with self._lock:
+            counts = self._stats.setdefault(detector, {"hits": 0, "disk_hits": 0, "misses": 0})
+            counts[{"hit": "hits", "disk_hit": "disk_hits", "miss": "misses"}[result]] += amount
+        ANALYSIS_CACHE_LOOKUPS.inc(amount, detector=detector, result=result)
+
+    def _put_memory(self, detector, values):
+        with self._lock:
+            for key, value in values.items():
+                self._entries[(detector, key)] = value
+                self._entries.move_to_end((detector, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_compute_many(self, detector, texts, compute):
+        """
+        Résultats du détecteur pour chaque texte ; seuls les textes absents du cache sont calculés
+
+        Args:
+            detector: Nom du détecteur (et du modèle)
+            texts: Textes à analyser
+            compute: Fonction liste de textes -> liste de résultats (appelée une fois, textes distincts)
+
+        Returns:
+            Résultats dans l'ordre de texts
+        """
+        texts = list(texts)
+        keys = [text_key(text) for text in texts]
+        found = {}
+        with self._lock:
+            for key in keys:
+                value = self._entries.get((detector, key))
+                if value is not None:
+                    self._entries.move_to_end((detector, key))
+                    found[key] = value
+        self._count(detector, "hit", sum(1 for key in keys if key in found))
+
+        # un seul calcul par texte distinct, y compris s'il apparaît plusieurs fois
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+
+        if missing and self._disk is not None:
+            loaded = self._disk.load_many(detector, missing)
+            if loaded:
+                self._put_memory(detector, loaded)
+                found.update(loaded)
+                self._count(detector, "disk_hit", sum(1 for key in keys if key in loaded))
+                missing = {key: text for key, text in missing.items() if key not in loaded}
+
+        if missing:
+            self._count(detector, "miss", sum(1 for key in keys if key in missing))
+            computed = dict(zip(missing, compute(list(missing.values()))))
+            self._put_memory(detector, computed)
+            if self._disk is not None:
+                try:
+                    self._disk.save_many(detector, computed)
+                except Exception as e:
+                    print(f"Erreur enregistrement du cache des détections: {e}")
+            found.update(computed)
+
+        return [found[key] for key in keys]
+
+    def get_or_compute(self, detector, text, compute):
+        """Comme get_or_compute_many pour un seul texte (compute : texte -> résultat)"""
+        return self.get_or_compute_many(detector, [text], lambda texts: [compute(texts[0])])[0]
+
+    def clear(self, detector=None):
+        """Vide le cache (ou les résultats d'un détecteur) ; retourne le nombre d'entrées supprimées"""
+        with self._lock:
+            keys = [k for k in self._entries if detector is None or k[0] == detector]
+            for k in keys:
+                del self._entries[k]
+        deleted = len(keys)
+        if self._disk is not None:
+            deleted = max(deleted, self._disk.delete(detector))
+        return deleted
+
+    def stats(self) -> dict:
+        with self._lock:
+            detectors = {name: dict(counts) for name, counts in self._stats.items()}
+            entries = len(self._entries)
+        for counts in detectors.values():
+            lookups = counts["hits"] + counts["disk_hits"] + counts["misses"]
+            counts["hit_rate"] = round((counts["hits"] + counts["disk_hits"]) / lookups, 3) if lookups else None
+        return {"entries": entries, "max_entries": self.max_entries, "disk": self._disk is not None,
+                "detectors": detectors}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def configure_analysis_cache(**kwargs):
+    """Modifie la configuration utilisée pour le cache créé ensuite"""
+    unknown = set(kwargs) - set(ANALYSIS_CACHE_CONFIG)
+    if unknown:
+        raise ValueError(f"Paramètres inconnus: {', '.join(sorted(unknown))}")
+    ANALYSIS_CACHE_CONFIG.update(kwargs)
+
+
+def get_analysis_cache():
+    """Cache partagé (créé au premier appel) ; None si désactivé"""
+    global _cache
+    if not ANALYSIS_CACHE_CONFIG["enabled"]:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = AnalysisCache(ANALYSIS_CACHE_CONFIG["max_entries"], ANALYSIS_CACHE_CONFIG["disk_path"])
+        return _cache
@@ -1,11 +1,42 @@
 """Service de génération de réponses personnalisées aux avis"""
 import re
+import threading
+import time
+from dataclasses import asdict, dataclass
 from langdetect import detect, DetectorFactory
 DetectorFactory.seed = 0
-from transformers import pipeline
+from functions.metrics import span
+from functions.generator.analysis_cache import get_analysis_cache
+from functions.generator.sentiment_backends import create_sentiment_backend
 
-# Import GPT4All
-from gpt4all import GPT4All
+# transformers et GPT4All ne sont importés qu'au chargement des modèles
+# (plusieurs secondes) : voir ResponseGenerator.sentiment_model et _load_llm
+
+LLM_MODEL = "orca-mini-3b-gguf2-q4_0.gguf"
+SENTIMENT_MODEL = "nlptown/bert-base-multilingual-uncased-sentiment"
+# Avis analysés par passe du modèle de sentiment
+SENTIMENT_BATCH_SIZE = 16
+# Limite du modèle BERT (tokens) : les avis plus longs sont tronqués
+SENTIMENT_MAX_LENGTH = 512
+
+# Noms des détecteurs dans le cache des détections (le modèle en fait partie ;
+# pour le sentiment, le moteur aussi : voir ResponseGenerator.sentiment_detector)
+LANGUAGE_DETECTOR = "language:langdetect"
+
+
+@dataclass
+class ReviewAnalysis:
+    """
+    Analyse d'un avis, calculée une seule fois (voir ResponseGenerator.analyze)
+    puis réutilisée par generate_response et par les endpoints
+    """
+    language: str              # code ISO 639-1 ('fr', 'en', ...)
+    sentiment: str             # 'positive', 'negative' ou 'neutral'
+    sentiment_scores: dict     # probabilité de chaque label du modèle ("1 star" → "5 stars")
+    tone: str                  # ton recommandé ('formel', 'amical', 'empathique')
+
+    def as_dict(self):
+        return asdict(self)
 
 
 class ResponseGenerator:
@@ -17,28 +48,123 @@ class ResponseGenerator:
         'empathique': 'empathique'
     }
     
-    def __init__(self, use_ai=False):
+    def __init__(self, use_ai=False, sentiment_batch_size=SENTIMENT_BATCH_SIZE, sentiment_backend=None):
         """
+        Les modèles ne sont pas chargés ici mais au premier usage, ou en
+        arrière-plan par start_warmup() : créer le générateur est immédiat.
+
         Args:
             use_ai: Si True, utilise GPT4All pour générer des réponses personnalisées
+            sentiment_batch_size: Avis analysés par passe du modèle de sentiment
+            sentiment_backend: Moteur du modèle de sentiment ("pytorch", "onnx", "onnx-int8" ;
+                défaut : SENTIMENT_BACKEND_CONFIG)
+
+        Raises:
+            ValueError: si le moteur est inconnu
         """
         self.use_ai = use_ai
         self.model = None
-        self.sentiment_pipeline = pipeline(
-            "sentiment-analysis",
-            model="nlptown/bert-base-multilingual-uncased-sentiment"
-        )
-        
-        if use_ai:
+        self.sentiment_batch_size = sentiment_batch_size
+        # résultats des détecteurs par texte normalisé (None : cache désactivé)
+        self.analysis_cache = get_analysis_cache()
+        self.sentiment_backend = create_sentiment_backend(SENTIMENT_MODEL, sentiment_backend)
+        # les probabilités varient légèrement d'un moteur à l'autre : pas de résultats partagés
+        self.sentiment_detector = f"sentiment:{SENTIMENT_MODEL}:{self.sentiment_backend.name}"
+        self._sentiment_model = None
+        self._sentiment_lock = threading.Lock()
+        self._llm_loaded = not use_ai      # sans IA, pas de LLM à charger
+        self._llm_lock = threading.Lock()
+        self._warmup_thread = None
+        # état du chargement de chaque modèle (voir status)
+        self.load_times = {}
+        self.load_errors = {}
+
+    @property
+    def sentiment_model(self):
+        """Moteur du modèle de sentiment, chargé au premier accès"""
+        if self._sentiment_model is None:
+            with self._sentiment_lock:
+                if self._sentiment_model is None:
+                    print(f"Chargement du modèle de sentiment {SENTIMENT_MODEL} ({self.sentiment_backend.name})...")
+                    start = time.perf_counter()
+                    try:
+                        sentiment_model = self.sentiment_backend.load()
+                    except Exception as e:
+                        self.load_errors["sentiment"] = f"{type(e).__name__}: {e}"
+                        raise
+                    self.load_times["sentiment"] = round(time.perf_counter() - start, 2)
+                    self.load_errors.pop("sentiment", None)
+                    print(f"Modèle de sentiment chargé en {self.load_times['sentiment']} s")
+                    self._sentiment_model = sentiment_model
+        return self._sentiment_model
+
+    def _load_llm(self):
+        """Charge GPT4All au premier usage (en cas d'échec, les templates sont utilisés)"""
+        if self._llm_loaded:
+            return
+        with self._llm_lock:
+            if self._llm_loaded:
+                return
             print("Chargement du modèle GPT4All (première fois: téléchargement ~2GB)...")
+            start = time.perf_counter()
             try:
+                from gpt4all import GPT4All
                 # Modèle léger et rapide
-                self.model = GPT4All("orca-mini-3b-gguf2-q4_0.gguf")
-                print("Modèle GPT4All chargé avec succès")
+                self.model = GPT4All(LLM_MODEL)
+                self.load_times["llm"] = round(time.perf_counter() - start, 2)
+                print(f"Modèle GPT4All chargé avec succès en {self.load_times['llm']} s")
             except Exception as e:
                 print(f"Erreur chargement GPT4All: {e}")
                 print("→ Utilisation des templates à la place")
+                self.load_errors["llm"] = f"{type(e).__name__}: {e}"
                 self.use_ai = False
+            self._llm_loaded = True
+
+    def warmup(self):
+        """Charge tous les modèles (bloquant) ; retourne True si le générateur est prêt"""
+        start = time.perf_counter()
+        try:
+            self.sentiment_model
+        except Exception as e:
+            print(f"Erreur chargement du modèle de sentiment: {e}")
+        self._load_llm()
+        print(f"Préchargement des modèles terminé en {time.perf_counter() - start:.1f} s")
+        return self.ready
+
+    def start_warmup(self):
+        """Lance warmup() dans un thread (sans effet si déjà prêt ou en cours)"""
+        if self.ready or (self._warmup_thread is not None and self._warmup_thread.is_alive()):
+            return
+        self._warmup_thread = threading.Thread(target=self.warmup, name="model-warmup", daemon=True)
+        self._warmup_thread.start()
+
+    @property
+    def ready(self):
+        """Modèles chargés (GPT4All en échec compte comme chargé : les templates prennent le relais)"""
+        return self._sentiment_model is not None and self._llm_loaded
+
+    def status(self) -> dict:
+        warming_up = self._warmup_thread is not None and self._warmup_thread.is_alive()
+        return {
+            "ready": self.ready,
+            "warming_up": warming_up,
+            "models": {
+                "sentiment": {
+                    "name": SENTIMENT_MODEL,
+                    "backend": self.sentiment_backend.name,
+                    "loaded": self._sentiment_model is not None,
+                    "seconds": self.load_times.get("sentiment"),
+                    "error": self.load_errors.get("sentiment"),
+                },
+                "llm": {
+                    "name": LLM_MODEL,
+                    "enabled": self.use_ai,
+                    "loaded": self.model is not None,
+                    "seconds": self.load_times.get("llm"),
+                    "error": self.load_errors.get("llm"),
+                },
+            },
+        }
     
     def detect_language(self, text: str) -> str:
         """
@@ -50,11 +176,17 @@ class ResponseGenerator:
         Returns:
             Code langue ISO 639-1 ('fr', 'en', 'es', etc.)
         """
-        try:
-            lang = detect(text)
-            return lang
-        except Exception:
-            return 'fr'
+        if self.analysis_cache is not None:
+            return self.analysis_cache.get_or_compute(LANGUAGE_DETECTOR, text, self._detect_language)
+        return self._detect_language(text)
+
+    def _detect_language(self, text: str) -> str:
+        with span("detect_language"):
+            try:
+                lang = detect(text)
+                return lang
+            except Exception:
+                return 'fr'
     
     # def detect_sentiment(self, text: str) -> str:
     #     """Détecte le sentiment du texte"""
@@ -84,10 +216,65 @@ class ResponseGenerator:
     #         return 'neutral'
 
     def detect_sentiment(self,text: str) -> str:
-        result = self.sentiment_pipeline(text)[0]['label']
+        return self.detect_sentiment_batch([text])[0]
+
+    def detect_sentiment_batch(self, texts, batch_size: int = None) -> list:
+        """
+        Détecte le sentiment de plusieurs textes (voir sentiment_scores_batch)
 
+        Returns:
+            Sentiments ('positive', 'negative', 'neutral') dans l'ordre de texts
+        """
+        return [self._sentiment_from_scores(scores) for scores in self.sentiment_scores_batch(texts, batch_size)]
+
+    def sentiment_scores_batch(self, texts, batch_size: int = None) -> list:
+        """
+        Probabilités des labels du modèle de sentiment, en passes groupées
+
+        Les textes sont triés par longueur avant d'être groupés : chaque lot
+        n'est complété (padding) que jusqu'au plus long de ses textes, au lieu
+        du plus long de toute la liste. Les textes de plus de 512 tokens sont
+        tronqués.
+
+        Args:
+            texts: Textes à analyser
+            batch_size: Textes par passe (défaut : sentiment_batch_size)
+
+        Returns:
+            Dicts {label: probabilité} ("1 star" → "5 stars") dans l'ordre de texts
+        """
+        texts = list(texts)
+        if not texts:
+            return []
+        if self.analysis_cache is not None:
+            # seuls les textes jamais analysés passent par le modèle
+            return self.analysis_cache.get_or_compute_many(
+                self.sentiment_detector, texts, lambda missing: self._sentiment_scores(missing, batch_size),
+            )
+        return self._sentiment_scores(texts, batch_size)
+
+    def _sentiment_scores(self, texts, batch_size=None):
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
+        with span("detect_sentiment"):
+            results = self.sentiment_model.scores(
+                [texts[i] for i in order],
+                batch_size or self.sentiment_batch_size,
+                SENTIMENT_MAX_LENGTH,
+            )
+
+        scores = [None] * len(texts)
+        for i, labels in zip(order, results):
+            scores[i] = {label: round(score, 4) for label, score in labels.items()}
+        return scores
+
+    @classmethod
+    def _sentiment_from_scores(cls, scores: dict) -> str:
+        return cls._sentiment_from_label(max(scores, key=scores.get))
+
+    @staticmethod
+    def _sentiment_from_label(label: str) -> str:
         # Labels: "1 star" → "5 stars"
-        stars = int(result[0])
+        stars = int(label[0])
 
         if stars <= 2:
             return "negative"
@@ -97,13 +284,49 @@ class ResponseGenerator:
             return "positive"
     
     
-    def auto_detect_tone(self, review_text: str, rating: float = None) -> str:
+    def analyze(self, review_text: str, rating: float = None) -> ReviewAnalysis:
+        """
+        Langue, sentiment (avec probabilités) et ton recommandé d'un avis
+
+        Args:
+            review_text: Texte de l'avis
+            rating: Note sur 5 (optionnel, prioritaire sur le sentiment pour le ton)
+        """
+        return self.analyze_batch([review_text], [rating])[0]
+
+    def analyze_batch(self, texts, ratings=None) -> list:
+        """
+        Analyse de plusieurs avis : une détection de langue et une inférence
+        du modèle de sentiment (groupée, voir sentiment_scores_batch) par avis
+
+        Args:
+            texts: Textes des avis
+            ratings: Notes sur 5 (mêmes positions que texts ; None si absentes)
+
+        Returns:
+            Liste de ReviewAnalysis dans l'ordre de texts
+        """
+        texts = list(texts)
+        ratings = list(ratings) if ratings is not None else [None] * len(texts)
+        analyses = []
+        for text, rating, scores in zip(texts, ratings, self.sentiment_scores_batch(texts)):
+            sentiment = self._sentiment_from_scores(scores)
+            analyses.append(ReviewAnalysis(
+                language=self.detect_language(text),
+                sentiment=sentiment,
+                sentiment_scores=dict(scores),   # copie : le dict en cache est partagé
+                tone=self.auto_detect_tone(text, rating, sentiment),
+            ))
+        return analyses
+
+    def auto_detect_tone(self, review_text: str, rating: float = None, sentiment: str = None) -> str:
         """
         Détecte automatiquement le ton approprié basé sur le rating et le sentiment
         
         Args:
             review_text: Texte de l'avis
             rating: Note sur 5 (optionnel)
+            sentiment: Sentiment déjà détecté (optionnel, évite une inférence)
         
         Returns:
             Ton recommandé ('formel', 'amical', 'empathique')
@@ -116,7 +339,8 @@ class ResponseGenerator:
             else:
                 return 'formel'
         
-        sentiment = self.detect_sentiment(review_text)
+        if sentiment is None:
+            sentiment = self.detect_sentiment(review_text)
         
         if sentiment == 'positive':
             return 'amical'
@@ -125,7 +349,8 @@ class ResponseGenerator:
         else:
             return 'formel'
     
-    def generate_response(self, review_text: str, rating: float = None, tone: str = None) -> str:
+    def generate_response(self, review_text: str, rating: float = None, tone: str = None,
+                          analysis: ReviewAnalysis = None) -> str:
         """
         Génère une réponse personnalisée pour un avis dans la langue de l'avis
         
@@ -134,46 +359,52 @@ class ResponseGenerator:
             rating: Note sur 5 (optionnel, pour auto-détecter le ton)
             tone: Ton souhaité ('formel', 'amical', 'empathique'). 
                   Si None, sera détecté automatiquement.
+            analysis: Analyse déjà calculée de l'avis (sinon calculée ici, voir analyze)
         
         Returns:
             Réponse générée dans la langue de l'avis
         """
-        # Détecter la langue de l'avis
-        language = self.detect_language(review_text)
+        # Langue, sentiment et ton recommandé de l'avis (calculés une seule fois)
+        if analysis is None:
+            analysis = self.analyze(review_text, rating)
+        language = analysis.language
         
-        # Auto-détecter le ton si non spécifié
+        # Ton recommandé si non spécifié
         if tone is None:
-            tone = self.auto_detect_tone(review_text, rating)
+            tone = analysis.tone
         
         # Valider le ton
         if tone not in self.TONES:
             tone = 'formel'
         
-        # Si AI activée, utiliser GPT4All
+        # Si AI activée, utiliser GPT4All (chargé au premier usage)
+        self._load_llm()
         if self.use_ai:
-            return self._generate_with_ai(review_text, tone, language)
+            with span("generate"):
+                return self._generate_with_ai(review_text, tone, language, analysis.sentiment)
         
         # Sinon utiliser les templates
-        sentiment = self.detect_sentiment(review_text)
-        templates = self._get_templates(tone, sentiment, language)
-        
-        response_parts = [
-            templates['greeting'],
-            templates['acknowledgment'],
-            templates['closing']
-        ]
-        
-        return ' '.join(response_parts)
+        with span("generate"):
+            templates = self._get_templates(tone, analysis.sentiment, language)
+            
+            response_parts = [
+                templates['greeting'],
+                templates['acknowledgment'],
+                templates['closing']
+            ]
+            
+            return ' '.join(response_parts)
     
 
 
 
-    def _generate_with_ai(self, review_text: str, tone: str, language: str = 'fr') -> str:
+    def _generate_with_ai(self, review_text: str, tone: str, language: str = 'fr', sentiment: str = None) -> str:
         """Génère une réponse avec GPT4All (LLM local) dans la langue détectée"""
         
         if not self.model:
             # Fallback sur templates si modèle non chargé
-            sentiment = self.detect_sentiment(review_text)
+            if sentiment is None:
+                sentiment = self.detect_sentiment(review_text)
             templates = self._get_templates(tone, sentiment, language)
             return ' '.join([templates['greeting'], templates['acknowledgment'], templates['closing']])
         
@@ -235,7 +466,8 @@ class ResponseGenerator:
         except Exception as e:
             print(f"Erreur génération GPT4All: {e}")
             # Fallback sur templates
-            sentiment = self.detect_sentiment(review_text)
+            if sentiment is None:
+                sentiment = self.detect_sentiment(review_text)
             templates = self._get_templates(tone, sentiment, language)
             return ' '.join([templates['greeting'], templates['acknowledgment'], templates['closing']])
     
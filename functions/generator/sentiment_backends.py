@@ -0,0 +1,230 @@
+"""
+Moteurs d'inférence du modèle de sentiment (PyTorch ou ONNX Runtime)
+
+Les deux moteurs exécutent le même modèle nlptown et retournent les mêmes
+probabilités par label ("1 star" → "5 stars") : ResponseGenerator en déduit
+le sentiment de la même façon quel que soit le moteur. Le moteur ONNX lit un
+export du modèle (créé au premier chargement ou à l'avance) :
+
+    python -m functions.generator.sentiment_backends [--no-quantize]
+
+Les moteurs ONNX demandent l'extra "onnx" du projet (poetry install --extras onnx).
+
+"onnx-int8" applique une quantification dynamique int8 aux poids : modèle
+~4x plus petit, inférence plus rapide sur CPU, et ni torch ni le modèle
+PyTorch ne sont chargés en mémoire une fois l'export fait.
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+from functions.storage.sqlite import DATA_DIR
+
+# Configuration par défaut (modifiable via configure_sentiment_backend)
+SENTIMENT_BACKEND_CONFIG = {
+    "backend": "pytorch",            # voir SENTIMENT_BACKENDS
+    "onnx_dir": DATA_DIR / "onnx",   # exports ONNX (un sous-répertoire par modèle)
+    "threads": None,                 # threads d'inférence ONNX (None : tous les CPU)
+}
+
+ONNX_INPUTS = ("input_ids", "attention_mask", "token_type_ids")
+LABELS_FILE = "labels.json"
+
+
+class PyTorchSentimentBackend:
+    """Pipeline transformers (PyTorch), le moteur d'origine"""
+
+    name = "pytorch"
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+        self.pipeline = None
+
+    def load(self):
+        from transformers import pipeline
+        self.pipeline = pipeline("sentiment-analysis", model=self.model_name)
+        return self
+
+    def scores(self, texts, batch_size, max_length):
+        """
+        Probabilités des labels de chaque texte
+
+        Returns:
+            Dicts {label: probabilité} dans l'ordre de texts
+        """
+        results = self.pipeline(texts, batch_size=batch_size, truncation=True, max_length=max_length, top_k=None)
+        return [{label['label']: label['score'] for label in labels} for labels in results]
+
+
+class OnnxSentimentBackend:
+    """Modèle exporté en ONNX, exécuté par ONNX Runtime (quantifié en int8 si quantize)"""
+
+    def __init__(self, model_name, quantize=True, directory=None, threads=None):
+        self.model_name = model_name
+        self.quantize = quantize
+        self.name = "onnx-int8" if quantize else "onnx"
+        self.directory = Path(directory or SENTIMENT_BACKEND_CONFIG["onnx_dir"]) / model_name.replace("/", "__")
+        self.threads = threads if threads is not None else SENTIMENT_BACKEND_CONFIG["threads"]
+        self.session = None
+        self.tokenizer = None
+        self.labels = None
+
+    @property
+    def model_path(self):
+        return self.directory / ("model.int8.onnx" if self.quantize else "model.onnx")
+
+    def load(self):
+        import onnxruntime
+        # tokenizer rapide lu directement : importer transformers chargerait torch
+        from tokenizers import Tokenizer
+
+        if not self.model_path.exists():
+            print(f"Export ONNX du modèle {self.model_name} dans {self.directory}...")
+            export_onnx(self.model_name, self.directory, self.quantize)
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self.threads:
+            options.intra_op_num_threads = self.threads
+        self.session = onnxruntime.InferenceSession(
+            str(self.model_path), options, providers=["CPUExecutionProvider"],
+        )
+        self.tokenizer = Tokenizer.from_file(str(self.directory / "tokenizer.json"))
+        with open(self.directory / "tokenizer_config.json", encoding="utf-8") as file:
+            pad_token = json.load(file).get("pad_token") or "[PAD]"
+        self.tokenizer.enable_padding(pad_id=self.tokenizer.token_to_id(pad_token), pad_token=pad_token)
+        with open(self.directory / LABELS_FILE, encoding="utf-8") as file:
+            # clés JSON en texte : indice de sortie du modèle -> label
+            self.labels = [label for _, label in sorted(json.load(file).items(), key=lambda item: int(item[0]))]
+        return self
+
+    def scores(self, texts, batch_size, max_length):
+        """Comme PyTorchSentimentBackend.scores (softmax des logits, comme le pipeline)"""
+        import numpy as np
+
+        input_names = {i.name for i in self.session.get_inputs()}
+        if (self.tokenizer.truncation or {}).get("max_length") != max_length:
+            self.tokenizer.enable_truncation(max_length)
+        results = []
+        for start in range(0, len(texts), batch_size):
+            encodings = self.tokenizer.encode_batch(texts[start:start + batch_size])
+            encoded = {
+                "input_ids": [e.ids for e in encodings],
+                "attention_mask": [e.attention_mask for e in encodings],
+                "token_type_ids": [e.type_ids for e in encodings],
+            }
+            feed = {name: np.array(encoded[name], dtype=np.int64) for name in ONNX_INPUTS if name in input_names}
+            logits = self.session.run(["logits"], feed)[0]
+            exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+            probabilities = exp / exp.sum(axis=1, keepdims=True)
+            results.extend(
+                {label: float(p) for label, p in zip(self.labels, row)} for row in probabilities
+            )
+        return results
+
+
+# Moteurs disponibles : nom -> fabrique (nom du modèle -> moteur non chargé)
+SENTIMENT_BACKENDS = {
+    "pytorch": PyTorchSentimentBackend,
+    "onnx": lambda model_name: OnnxSentimentBackend(model_name, quantize=False),
+    "onnx-int8": lambda model_name: OnnxSentimentBackend(model_name, quantize=True),
+}
+
+
+def export_onnx(model_name, directory, quantize=True):
+    """
+    Exporte le modèle en ONNX (et sa version int8) avec son tokenizer et ses labels
+
+    Nécessite torch et transformers ; l'inférence ONNX n'a ensuite plus besoin de torch.
+
+    Args:
+        model_name: Modèle Hugging Face
+        directory: Répertoire de l'export
+        quantize: Crée aussi model.int8.onnx (quantification dynamique des poids)
+
+    Returns:
+        Chemin du modèle à utiliser
+    """
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    start = time.perf_counter()
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name).eval()
+    sample = tokenizer(["Très bon service", "Service lent"], padding=True, return_tensors="pt")
+    input_names = [name for name in ONNX_INPUTS if name in sample]
+    path = directory / "model.onnx"
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            str(path),
+            input_names=input_names,
+            output_names=["logits"],
+            # taille de lot et longueur des textes variables
+            dynamic_axes={**{name: {0: "batch", 1: "sequence"} for name in input_names}, "logits": {0: "batch"}},
+            opset_version=14,
+            # exporteur TorchScript, pour lequel dynamic_axes et opset_version sont écrits
+            # (l'exporteur dynamo, défaut depuis torch 2.9, demande onnxscript)
+            dynamo=False,
+        )
+    tokenizer.save_pretrained(directory)
+    with open(directory / LABELS_FILE, "w", encoding="utf-8") as file:
+        json.dump({str(i): label for i, label in model.config.id2label.items()}, file, ensure_ascii=False)
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantized = directory / "model.int8.onnx"
+        quantize_dynamic(str(path), str(quantized), weight_type=QuantType.QInt8)
+        path = quantized
+
+    print(f"Export ONNX terminé en {time.perf_counter() - start:.1f} s ({path.stat().st_size // 2**20} Mo)")
+    return path
+
+
+def configure_sentiment_backend(**kwargs):
+    """Modifie la configuration utilisée pour les générateurs créés ensuite"""
+    unknown = set(kwargs) - set(SENTIMENT_BACKEND_CONFIG)
+    if unknown:
+        raise ValueError(f"Paramètres inconnus: {', '.join(sorted(unknown))}")
+    if "backend" in kwargs and kwargs["backend"] not in SENTIMENT_BACKENDS:
+        raise ValueError(f"Moteur inconnu: {kwargs['backend']} (attendu: {', '.join(SENTIMENT_BACKENDS)})")
+    SENTIMENT_BACKEND_CONFIG.update(kwargs)
+
+
+def create_sentiment_backend(model_name, backend=None):
+    """
+    Moteur non chargé (load() au premier usage)
+
+    Args:
+        model_name: Modèle Hugging Face
+        backend: Nom du moteur (défaut : configuration)
+
+    Raises:
+        ValueError: si le moteur est inconnu
+    """
+    backend = backend or SENTIMENT_BACKEND_CONFIG["backend"]
+    factory = SENTIMENT_BACKENDS.get(backend)
+    if factory is None:
+        raise ValueError(f"Moteur inconnu: {backend} (attendu: {', '.join(SENTIMENT_BACKENDS)})")
+    return factory(model_name)
+
+
+def main(argv=None):
+    from functions.generator.response_generator import SENTIMENT_MODEL
+
+    parser = argparse.ArgumentParser(description="Exporte le modèle de sentiment en ONNX")
+    parser.add_argument("--model", default=SENTIMENT_MODEL)
+    parser.add_argument("--no-quantize", action="store_true", help="n'exporte que le modèle float32")
+    args = parser.parse_args(argv)
+
+    backend = OnnxSentimentBackend(args.model, quantize=not args.no_quantize)
+    export_onnx(args.model, backend.directory, backend.quantize)
+
+
+if __name__ == "__main__":
+    main()
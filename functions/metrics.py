@@ -0,0 +1,258 @@
+"""Durées par étape (scraping, génération des réponses) et export au format Prometheus"""
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Configuration par défaut (modifiable via configure_metrics)
+METRICS_CONFIG = {
+    "server_timing": False,   # en-tête Server-Timing sur toutes les réponses (sinon sur demande)
+}
+
+# Bornes des histogrammes (s) : de l'extraction d'une page (ms) au scraping complet (min)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} : labels attendus {self.labelnames}, reçus {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Compteur croissant (par combinaison de labels)"""
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def render(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values
+        ]
+
+
+class Histogram(_Metric):
+    """Distribution des durées observées (buckets cumulés, somme et nombre)"""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._values = {}   # labels → [compteurs par bucket, somme, nombre]
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total, count = self._values.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total + value, count + 1)
+
+    def snapshot(self, **labels):
+        """(somme, nombre) des observations"""
+        with self._lock:
+            _, total, count = self._values.get(self._key(labels)) or (None, 0.0, 0)
+        return total, count
+
+    def render(self):
+        with self._lock:
+            values = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items())
+        lines = self.header()
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                labels = _format_labels(self.labelnames, key, [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class CallbackGauge(_Metric):
+    """Valeurs lues au moment de l'export : fonction -> {valeurs des labels (tuple): valeur}"""
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames, collect):
+        super().__init__(name, documentation, labelnames)
+        self.collect = collect
+
+    def render(self):
+        try:
+            values = sorted(self.collect().items())
+        except Exception as e:
+            print(f"Erreur lecture de la mesure {self.name}: {e}")
+            values = []
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values
+        ]
+
+
+class Registry:
+    """Ensemble des mesures exportées par /metrics"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Mesure déjà enregistrée: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name, documentation, labelnames, collect):
+        return self.register(CallbackGauge(name, documentation, labelnames, collect))
+
+    def render(self) -> str:
+        """Toutes les mesures au format texte Prometheus (version 0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "reviews_api_stage_seconds",
+    "Durée des étapes : launch, politeness_wait, search, page_load, extract, "
+    "detect_language, detect_sentiment, generate",
+    ("stage", "source"),
+)
+STAGE_ERRORS = REGISTRY.counter(
+    "reviews_api_stage_errors_total",
+    "Étapes interrompues par une exception (délais d'attente compris)", ("stage", "source"),
+)
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "reviews_api_http_request_seconds",
+    "Durée des requêtes HTTP jusqu'à l'envoi des en-têtes", ("method", "route", "status"),
+)
+
+
+# ---------- Durées par requête (en-tête Server-Timing) ----------
+
+class RequestTimings:
+    """Durées des étapes exécutées pour une requête (tous threads confondus)"""
+
+    def __init__(self):
+        self._totals = {}   # étape → [durée totale, nombre]
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            total = self._totals.setdefault(stage, [0.0, 0])
+            total[0] += seconds
+            total[1] += 1
+
+    def header(self, total_seconds=None) -> str:
+        """Valeur de l'en-tête Server-Timing (durées en ms)"""
+        with self._lock:
+            items = sorted(self._totals.items())
+        parts = [f'{stage};dur={seconds * 1000:.1f};desc="x{count}"' for stage, (seconds, count) in items]
+        if total_seconds is not None:
+            parts.append(f"total;dur={total_seconds * 1000:.1f}")
+        return ", ".join(parts)
+
+
+_current_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def request_timings():
+    """Collecte les étapes exécutées dans ce contexte (et les threads qui en héritent)"""
+    timings = RequestTimings()
+    token = _current_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _current_timings.reset(token)
+
+
+@contextmanager
+def span(stage, source=""):
+    """
+    Chronomètre une étape : histogramme, compteur d'erreurs et Server-Timing de la requête
+
+    Args:
+        stage: "launch", "search", "page_load", "extract", "detect_language", ...
+        source: Plateforme scrapée ("" hors scraping)
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage=stage, source=source)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=stage, source=source)
+        timings = _current_timings.get()
+        if timings is not None:
+            timings.add(stage, elapsed)
+
+
+def configure_metrics(**kwargs):
+    unknown = set(kwargs) - set(METRICS_CONFIG)
+    if unknown:
+        raise ValueError(f"Paramètres inconnus: {', '.join(sorted(unknown))}")
+    METRICS_CONFIG.update(kwargs)
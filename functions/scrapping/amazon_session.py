@@ -0,0 +1,245 @@
+"""Sessions Amazon connectées, conservées dans des profils Chrome (user-data-dir)"""
+import pickle
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.common.by import By
+
+from functions.scrapping.driver_pool import DriverPool, POOL_CONFIG, build_chrome_options
+from functions.storage.sqlite import DATA_DIR
+
+
+AMAZON_HOME_URL = "https://www.amazon.fr/"
+AMAZON_SIGNIN_URL = "https://www.amazon.fr/ap/signin?openid.pape.max_auth_age=900&openid.return_to=https%3A%2F%2Fwww.amazon.fr%2Fgp%2Fyourstore%2Fhome%3Fpath%3D%252Fgp%252Fyourstore%252Fhome%26useRedirectOnSuccess%3D1%26signIn%3D1%26action%3Dsign-out%26ref_%3Dnav_AccountFlyout_signout&openid.assoc_handle=frflex&openid.mode=checkid_setup&openid.ns=http%3A%2F%2Fspecs.openid.net%2Fauth%2F2.0"
+
+# Configuration par défaut (modifiable via configure_amazon_sessions)
+AMAZON_SESSION_CONFIG = {
+    "profiles_dir": DATA_DIR / "chrome_profiles",   # un sous-répertoire par profil
+    "profiles": 1,                                  # navigateurs Amazon simultanés (un par profil)
+    "check_interval": 1800,                         # vérification de la connexion au plus toutes les N s
+    "legacy_cookies": Path("cookies.pkl"),          # cookies de save_cookies, importés dans un profil vide
+    "headless": False,
+    "user_agent": None,                             # celui utilisé lors de la connexion manuelle
+    "home_url": AMAZON_HOME_URL,                    # page ouverte pour vérifier la connexion
+}
+
+
+def _profile_options(profile_dir, headless=False, user_agent=None):
+    """Options Chrome d'un profil : les cookies de connexion restent dans `profile_dir`"""
+    options = build_chrome_options(headless)
+    options.add_argument(f"--user-data-dir={Path(profile_dir).resolve()}")
+    if user_agent:
+        options.add_argument(f"user-agent={user_agent}")
+    return options
+
+
+def is_signed_in(driver):
+    """La page Amazon affichée est-elle celle d'un compte connecté ?"""
+    try:
+        greeting = driver.find_element(By.ID, "nav-link-accountList-nav-line-1").text
+    except WebDriverException:
+        return False
+    return bool(greeting) and "identifiez-vous" not in greeting.lower()
+
+
+def import_legacy_cookies(driver, path):
+    """Ajoute les cookies de cookies.pkl à la session ; le profil les conserve ensuite"""
+    with open(path, "rb") as file:
+        cookies = pickle.load(file)
+    for cookie in cookies:
+        try:
+            driver.add_cookie(cookie)
+        except WebDriverException:
+            pass
+    driver.refresh()
+
+
+class _Profile:
+    """Profil Chrome : son navigateur (pool d'un seul) et l'état de sa session"""
+
+    def __init__(self, name, path, headless, user_agent=None):
+        self.name = name
+        self.path = Path(path)
+        # un user-data-dir ne peut servir qu'à un seul Chrome à la fois
+        self.pool = DriverPool(
+            min_size=0, max_size=1,
+            max_uses=POOL_CONFIG["max_uses"], max_memory_mb=POOL_CONFIG["max_memory_mb"],
+            options_factory=lambda proxy=None: _profile_options(self.path, headless, user_agent),
+        )
+        self.busy = False
+        self.signed_in = None
+        self.checked_at = None   # time.monotonic() de la dernière vérification
+
+
+class AmazonSessionManager:
+    """
+    Prête des navigateurs Amazon déjà connectés
+
+    Chaque profil Chrome garde ses cookies sur disque : une page Amazon
+    s'ouvre directement connectée, sans rechargement. La connexion n'est
+    vérifiée qu'une fois par `check_interval` secondes et par profil ; si
+    elle a expiré, les cookies de cookies.pkl sont réimportés (s'il existe).
+
+    Les profils ne passent pas par le pool de proxies : une session connectée
+    qui change d'adresse IP à chaque requête se fait déconnecter.
+    """
+
+    def __init__(self, profiles_dir, profiles=1, check_interval=1800, legacy_cookies=None, headless=False,
+                 user_agent=None, home_url=AMAZON_HOME_URL):
+        if profiles < 1:
+            raise ValueError("profiles doit être >= 1")
+        self.check_interval = check_interval
+        self.home_url = home_url
+        self.legacy_cookies = Path(legacy_cookies) if legacy_cookies else None
+        self._profiles = [
+            _Profile(f"amazon-{i}", Path(profiles_dir) / f"amazon-{i}", headless, user_agent)
+            for i in range(profiles)
+        ]
+        self._cond = threading.Condition()
+        self._closed = False
+        self._stats = {"checkouts": 0, "checks": 0, "imports": 0, "expired": 0}
+
+    def _take_profile(self, timeout):
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Les sessions Amazon sont fermées")
+                for profile in self._profiles:
+                    if not profile.busy:
+                        profile.busy = True
+                        self._stats["checkouts"] += 1
+                        return profile
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError("Aucun profil Amazon disponible")
+                self._cond.wait(remaining)
+
+    def _give_back(self, profile):
+        with self._cond:
+            profile.busy = False
+            self._cond.notify()
+
+    def _count(self, name):
+        with self._cond:
+            self._stats[name] += 1
+
+    def _check_session(self, profile, driver):
+        """Vérifie la connexion (au plus une fois par intervalle) ; une navigation si besoin"""
+        now = time.monotonic()
+        if profile.checked_at is not None and now - profile.checked_at < self.check_interval:
+            return
+        self._count("checks")
+        driver.get(self.home_url)
+        signed_in = is_signed_in(driver)
+        if not signed_in and self.legacy_cookies and self.legacy_cookies.is_file():
+            self._count("imports")
+            import_legacy_cookies(driver, self.legacy_cookies)
+            signed_in = is_signed_in(driver)
+        if not signed_in:
+            if profile.signed_in is not False:
+                self._count("expired")
+            print(f"Session Amazon non connectée ({profile.name}) : lancer login_amazon_profile()")
+        profile.signed_in = signed_in
+        profile.checked_at = now
+
+    @contextmanager
+    def checkout(self, timeout=None):
+        """
+        Prête le navigateur d'un profil libre le temps d'un bloc `with`
+
+        Yields:
+            Un webdriver Chrome dont la session Amazon est (normalement) connectée
+        """
+        profile = self._take_profile(POOL_CONFIG["checkout_timeout"] if timeout is None else timeout)
+        try:
+            with profile.pool.checkout(timeout=timeout) as driver:
+                self._check_session(profile, driver)
+                yield driver
+        finally:
+            self._give_back(profile)
+
+    def invalidate(self):
+        """Force la vérification des sessions au prochain prêt"""
+        with self._cond:
+            for profile in self._profiles:
+                profile.checked_at = None
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                **self._stats,
+                "profiles": [
+                    {
+                        "name": p.name,
+                        "busy": p.busy,
+                        "signed_in": p.signed_in,
+                        "checked_ago": round(time.monotonic() - p.checked_at, 1) if p.checked_at else None,
+                    }
+                    for p in self._profiles
+                ],
+            }
+
+    def shutdown(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        for profile in self._profiles:
+            profile.pool.shutdown()
+
+
+def login_amazon_profile(profile=0, user_agent=None):
+    """
+    Ouvre Chrome sur le profil pour une connexion MANUELLE à Amazon
+
+    À faire une fois par profil (serveur arrêté : un profil ne s'ouvre que
+    dans un seul Chrome) ; la session reste ensuite dans le profil.
+
+    Args:
+        profile: Numéro du profil
+        user_agent: User-agent du navigateur (défaut : celui de la configuration)
+    """
+    from selenium import webdriver
+
+    if user_agent is None:
+        user_agent = AMAZON_SESSION_CONFIG["user_agent"]
+
+    path = Path(AMAZON_SESSION_CONFIG["profiles_dir"]) / f"amazon-{profile}"
+    driver = webdriver.Chrome(options=_profile_options(path, user_agent=user_agent))
+    try:
+        driver.get(AMAZON_SIGNIN_URL)
+        input("Connectez-vous manuellement puis appuyez sur Entrée...")
+    finally:
+        driver.quit()
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def configure_amazon_sessions(**kwargs):
+    """Modifie la configuration (à appeler avant la première utilisation)"""
+    unknown = set(kwargs) - set(AMAZON_SESSION_CONFIG)
+    if unknown:
+        raise ValueError(f"Paramètres inconnus: {', '.join(sorted(unknown))}")
+    AMAZON_SESSION_CONFIG.update(kwargs)
+
+
+def get_amazon_sessions() -> AmazonSessionManager:
+    """Gestionnaire partagé (les navigateurs sont lancés au premier prêt)"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = AmazonSessionManager(**AMAZON_SESSION_CONFIG)
+        return _manager
+
+
+def shutdown_amazon_sessions():
+    global _manager
+    with _manager_lock:
+        manager, _manager = _manager, None
+    if manager is not None:
+        manager.shutdown()
@@ -0,0 +1,233 @@
+"""Points de reprise des longues extractions : position (page, URL, scroll) et avis déjà extraits"""
+import json
+import threading
+import time
+
+from functions.scrapping.resolution_cache import normalize_company
+from functions.storage.sqlite import DATA_DIR, SQLiteStore
+
+
+DEFAULT_PATH = DATA_DIR / "checkpoints.sqlite3"
+
+# Configuration par défaut (modifiable via configure_checkpoints)
+CHECKPOINT_CONFIG = {
+    "enabled": True,
+    "path": DEFAULT_PATH,
+    "min_reviews": 100,        # en dessous, l'extraction est assez courte pour être refaite
+    "ttl": 24 * 3600,          # au-delà, les pages ont trop changé : on repart du début
+}
+
+
+class CheckpointStore(SQLiteStore):
+    """
+    Points de reprise par (extracteur, entreprise)
+
+    La position est remplacée à chaque page ; les avis sont ajoutés dans la
+    même transaction, si bien qu'une reprise ne perd ni ne répète aucun avis.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS checkpoints (
+        source TEXT NOT NULL,
+        company TEXT NOT NULL,
+        fingerprint TEXT NOT NULL,    -- paramètres de l'extraction (watermark)
+        cursor TEXT NOT NULL,         -- JSON : page suivante, URL courante, cartes lues...
+        reviews INTEGER NOT NULL,
+        requested INTEGER NOT NULL DEFAULT 0,   -- plus grand max_reviews des extractions qui l'ont avancé
+        updated_at REAL NOT NULL,
+        PRIMARY KEY (source, company)
+    );
+    CREATE TABLE IF NOT EXISTS checkpoint_reviews (
+        source TEXT NOT NULL,
+        company TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        data TEXT NOT NULL,
+        PRIMARY KEY (source, company, position)
+    );
+    """
+
+    def __init__(self, path, wal=True):
+        super().__init__(path, wal)
+        # bases créées avant la colonne requested
+        columns = {row["name"] for row in self.query("PRAGMA table_info(checkpoints)")}
+        if "requested" not in columns:
+            self.execute("ALTER TABLE checkpoints ADD COLUMN requested INTEGER NOT NULL DEFAULT 0")
+
+    def load(self, source, company):
+        """(fingerprint, position, avis, avis demandés, date de mise à jour) ou None"""
+        company = normalize_company(company)
+        with self._lock:
+            rows = self.query(
+                "SELECT fingerprint, cursor, requested, updated_at FROM checkpoints WHERE source = ? AND company = ?",
+                (source, company),
+            )
+            if not rows:
+                return None
+            reviews = self.query(
+                "SELECT data FROM checkpoint_reviews WHERE source = ? AND company = ? ORDER BY position",
+                (source, company),
+            )
+        row = rows[0]
+        results = [json.loads(r["data"]) for r in reviews]
+        return row["fingerprint"], json.loads(row["cursor"]), results, row["requested"], row["updated_at"]
+
+    def save(self, source, company, fingerprint, cursor, new_reviews, offset, requested=0):
+        """Enregistre la position et ajoute les avis new_reviews (à partir du rang offset)"""
+        company = normalize_company(company)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints "
+                "(source, company, fingerprint, cursor, reviews, requested, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    source, company, fingerprint, json.dumps(cursor), offset + len(new_reviews),
+                    requested, time.time(),
+                ),
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO checkpoint_reviews (source, company, position, data) VALUES (?, ?, ?, ?)",
+                [
+                    (source, company, offset + i, json.dumps(item, ensure_ascii=False))
+                    for i, item in enumerate(new_reviews)
+                ],
+            )
+
+    def delete(self, source=None, company=None):
+        """Supprime les points de reprise (tous, d'un extracteur ou d'une entreprise) ; retourne leur nombre"""
+        clauses, params = [], []
+        if source is not None:
+            clauses.append("source = ?")
+            params.append(source)
+        if company is not None:
+            clauses.append("company = ?")
+            params.append(normalize_company(company))
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock, self._conn:
+            self._conn.execute(f"DELETE FROM checkpoint_reviews{where}", params)
+            return self._conn.execute(f"DELETE FROM checkpoints{where}", params).rowcount
+
+    def entries(self):
+        return [
+            dict(row) for row in self.query(
+                "SELECT source, company, cursor, reviews, requested, updated_at "
+                "FROM checkpoints ORDER BY updated_at DESC"
+            )
+        ]
+
+
+class Checkpoint:
+    """
+    Point de reprise d'une extraction en cours
+
+    `cursor` est la position où reprendre (clés propres à chaque extracteur)
+    et `results` les avis déjà rendus avant l'interruption. Sans stockage
+    (extraction courte ou reprises désactivées), seule la position est tenue
+    à jour.
+
+    `requested` est le plus grand nombre d'avis demandé par les extractions
+    qui ont avancé ce point de reprise : une extraction plus courte qui s'arrête
+    à sa limite (max_reviews) ne le supprime pas.
+    """
+
+    def __init__(self, source, company, fingerprint="", store=None, cursor=None, results=None,
+                 max_reviews=0, requested=0):
+        self.source = source
+        self.company = company
+        self.fingerprint = fingerprint
+        self.store = store
+        self.cursor = dict(cursor or {})
+        self.results = list(results or [])
+        self.resumed = bool(self.cursor)
+        self.max_reviews = max_reviews
+        self.requested = max(requested, max_reviews)
+
+    @property
+    def persistent(self):
+        """False si la position n'est pas enregistrée (inutile de la calculer)"""
+        return self.store is not None
+
+    def advance(self, new_reviews=(), **cursor):
+        """
+        Page terminée : mémorise les avis rendus et la position suivante
+
+        À n'appeler qu'une fois tous les avis de la page rendus à l'appelant.
+        """
+        self.cursor.update(cursor)
+        if self.store is None:
+            return
+        new_reviews = list(new_reviews)
+        try:
+            self.store.save(
+                self.source, self.company, self.fingerprint,
+                self.cursor, new_reviews, len(self.results), self.requested,
+            )
+        except Exception as e:
+            # l'extraction continue sans point de reprise
+            print(f"Erreur enregistrement du point de reprise ({self.source}): {e}")
+        self.results.extend(new_reviews)
+
+    def clear(self, count=None):
+        """
+        Extraction terminée : le point de reprise est supprimé
+
+        Args:
+            count: Avis rendus par l'extraction ; s'il atteint max_reviews alors
+                qu'une extraction plus longue (requested) a avancé ce point de
+                reprise, celui-ci est conservé pour elle
+        """
+        if self.store is None:
+            return
+        if count is not None and count >= self.max_reviews and self.max_reviews < self.requested:
+            return
+        self.store.delete(self.source, self.company)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def configure_checkpoints(**kwargs):
+    """Modifie la configuration (à appeler avant la première extraction)"""
+    unknown = set(kwargs) - set(CHECKPOINT_CONFIG)
+    if unknown:
+        raise ValueError(f"Paramètres inconnus: {', '.join(sorted(unknown))}")
+    CHECKPOINT_CONFIG.update(kwargs)
+
+
+def get_checkpoint_store() -> CheckpointStore:
+    """Stockage partagé (créé au premier appel)"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = CheckpointStore(CHECKPOINT_CONFIG["path"])
+        return _store
+
+
+def open_checkpoint(source, company, max_reviews, since=None) -> Checkpoint:
+    """
+    Point de reprise de l'extraction (reprend le précédent s'il est récent et de mêmes paramètres)
+
+    Le point de reprise appartient à (extracteur, entreprise, watermark), pas
+    à une requête : une extraction interrompue (erreur, client du flux
+    /reviews/stream déconnecté, travail annulé) est reprise par la suivante
+    de mêmes paramètres, quelle que soit la requête qui l'a lancée.
+
+    Args:
+        source: Extracteur ("trustpilot_http", "amazon", ...) : chacun a ses propres positions
+        company: Entreprise (ou URL du lieu)
+        max_reviews: Nombre d'avis demandés (pas de point de reprise en dessous de min_reviews)
+        since: Watermark de l'extraction (une extraction incrémentale ne reprend pas une complète)
+    """
+    fingerprint = json.dumps(since, sort_keys=True)
+    if not CHECKPOINT_CONFIG["enabled"] or max_reviews < CHECKPOINT_CONFIG["min_reviews"]:
+        return Checkpoint(source, company, fingerprint)
+
+    store = get_checkpoint_store()
+    saved = store.load(source, company)
+    if saved is not None:
+        saved_fingerprint, cursor, results, requested, updated_at = saved
+        if saved_fingerprint == fingerprint and time.time() - updated_at < CHECKPOINT_CONFIG["ttl"]:
+            print(f"Reprise de l'extraction {source} '{company}' ({len(results)} avis déjà extraits)")
+            return Checkpoint(source, company, fingerprint, store, cursor, results, max_reviews, requested)
+        store.delete(source, company)
+    return Checkpoint(source, company, fingerprint, store, max_reviews=max_reviews)
@@ -0,0 +1,81 @@
+"""Extraction des cartes d'avis en un seul aller-retour WebDriver"""
+import hashlib
+import re
+
+
+def parse_rating(value, cast=float):
+    """Convertit '4,5 étoiles' / '4.0 out of 5' / 4 en nombre (None si absent)"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return cast(value)
+    match = re.search(r"\d+(?:[.,]\d+)?", str(value))
+    if not match:
+        return None
+    return cast(float(match.group().replace(',', '.')))
+
+
+def collect_reviews(driver, script, *args, rating_cast=float, require_rating=True):
+    """
+    Exécute un script JS d'extraction et normalise les avis retournés
+
+    Le script doit retourner un tableau d'objets
+    {rating, review, review_id, date, author} : toute la page est lue en
+    un seul appel execute_script au lieu d'un find_element / .text /
+    get_attribute par carte.
+
+    Args:
+        driver: webdriver Selenium
+        script: Code JS (retourne un tableau JSON)
+        *args: Arguments transmis au script (arguments[0], ...)
+        rating_cast: Type de la note (float ou int)
+        require_rating: Si False, conserve les avis sans note (rating=None)
+
+    Returns:
+        Liste de dicts {rating, review, review_id, date, author}
+        (les avis incomplets sont ignorés)
+    """
+    items = driver.execute_script(script, *args) or []
+    return normalize_reviews(items, rating_cast, require_rating)
+
+
+def normalize_reviews(items, rating_cast=float, require_rating=True):
+    """
+    Normalise des avis bruts {rating, review, review_id, date, author}
+    (extraits du DOM par un script JS ou hors ligne par offline_parsing.py)
+    """
+    results = []
+    for item in items:
+        text = (item.get("review") or "").strip()
+        rating = parse_rating(item.get("rating"), rating_cast)
+        # Avis incomplet → on ignore
+        if not text or (rating is None and require_rating):
+            continue
+        results.append({
+            "rating": rating,
+            "review": text,
+            "review_id": item.get("review_id"),
+            "date": item.get("date"),
+            "author": item.get("author"),
+        })
+    return results
+
+
+def review_key(item):
+    """
+    Clé de déduplication d'un avis : son identifiant plateforme s'il existe,
+    sinon une empreinte de la note et du texte
+    """
+    if item.get("review_id"):
+        return item["review_id"]
+    content = f"{item.get('rating')}|{item.get('review', '')}"
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+def collect_texts(driver, css_selector, start=0):
+    """Textes des éléments correspondant au sélecteur, à partir de l'index start (un seul appel)"""
+    texts = driver.execute_script(
+        "return Array.from(document.querySelectorAll(arguments[0])).slice(arguments[1]).map(e => e.innerText.trim());",
+        css_selector, start,
+    ) or []
+    return [t for t in texts if t]
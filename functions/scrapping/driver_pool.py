@@ -0,0 +1,346 @@
+"""Pool de navigateurs Chrome partagé par tous les scrapers"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+
+from functions.metrics import span
+from functions.scrapping.proxy_pool import active_proxy_pool
+
+
+# Configuration par défaut des pools (modifiable via configure_driver_pool)
+POOL_CONFIG = {
+    "min_size": 1,            # navigateurs pré-lancés
+    "max_size": 4,            # navigateurs simultanés au maximum
+    "max_uses": 50,           # recyclage après N utilisations
+    "max_memory_mb": 1024,    # recyclage au-delà de ce tas JS (Mo)
+    "checkout_timeout": 300,  # attente max d'un navigateur libre (s)
+    "headless": False,        # tous les navigateurs sans fenêtre (serveur, benchmarks)
+}
+
+
+def build_chrome_options(headless=False, proxy=None):
+    """Options Chrome communes à tous les navigateurs du pool (proxy : adresse ip:port)"""
+    options = webdriver.ChromeOptions()
+    if headless:
+        options.add_argument("--headless=new")
+    options.add_argument("--window-size=1400,900")
+    if proxy:
+        options.add_argument(f"--proxy-server=http://{proxy}")
+    return options
+
+
+class _PooledDriver:
+    """Navigateur du pool avec ses compteurs d'utilisation"""
+
+    def __init__(self, driver, proxy=None):
+        self.driver = driver
+        self.proxy = proxy
+        self.uses = 0
+        self.created_at = time.monotonic()
+
+
+class DriverPool:
+    """
+    Pool de webdriver Chrome réutilisables.
+
+    Les navigateurs sont lancés à la demande (jusqu'à max_size), vérifiés
+    avant chaque prêt et recyclés après max_uses utilisations ou lorsque
+    leur mémoire dépasse max_memory_mb.
+
+    Avec un pool de proxies, chaque navigateur sort par son propre proxy
+    (tiré au sort au lancement) ; un navigateur dont le proxy est écarté
+    est recyclé, le suivant en reçoit un autre.
+
+    Utilisation :
+        with pool.checkout() as driver:
+            driver.get(url)
+    """
+
+    def __init__(self, min_size=1, max_size=4, max_uses=50, max_memory_mb=1024,
+                 checkout_timeout=300, headless=False, options_factory=None, proxy_pool=None):
+        if max_size < 1:
+            raise ValueError("max_size doit être >= 1")
+        self.min_size = min(min_size, max_size)
+        self.max_size = max_size
+        self.max_uses = max_uses
+        self.max_memory_mb = max_memory_mb
+        self.checkout_timeout = checkout_timeout
+        self.headless = headless
+        self.options_factory = options_factory or (lambda proxy=None: build_chrome_options(headless, proxy))
+        self.proxy_pool = proxy_pool
+
+        self._idle = deque()
+        self._size = 0  # navigateurs existants (libres + prêtés + en lancement)
+        self._closed = False
+        self._cond = threading.Condition()
+        self._stats = {
+            "hits": 0,        # prêt d'un navigateur déjà lancé
+            "waits": 0,       # attente d'un navigateur libre (pool plein)
+            "launches": 0,    # lancements de Chrome
+            "recycles": 0,    # navigateurs fermés (usure, mémoire, santé)
+            "health_failures": 0,
+            "checkouts": 0,
+        }
+
+    # ---------- Cycle de vie des navigateurs ----------
+
+    def _launch(self):
+        proxy = self.proxy_pool.acquire() if self.proxy_pool else None
+        if proxy is None:
+            options = self.options_factory()
+        else:
+            options = self.options_factory(proxy.address)
+        with span("launch"):
+            driver = webdriver.Chrome(options=options)
+        with self._cond:
+            self._stats["launches"] += 1
+        return _PooledDriver(driver, proxy)
+
+    def _quit(self, pooled):
+        try:
+            pooled.driver.quit()
+        except Exception:
+            pass
+
+    def _is_healthy(self, pooled):
+        try:
+            pooled.driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    def _memory_mb(self, pooled):
+        try:
+            used = pooled.driver.execute_script(
+                "return performance.memory ? performance.memory.usedJSHeapSize : 0"
+            )
+            return (used or 0) / (1024 * 1024)
+        except Exception:
+            return 0
+
+    def _needs_recycle(self, pooled):
+        if pooled.proxy is not None and not self.proxy_pool.is_available(pooled.proxy):
+            return True
+        if self.max_uses and pooled.uses >= self.max_uses:
+            return True
+        if self.max_memory_mb and self._memory_mb(pooled) >= self.max_memory_mb:
+            return True
+        return False
+
+    def _reset(self, pooled):
+        """Remet le navigateur dans un état neutre avant de le rendre au pool"""
+        driver = pooled.driver
+        handles = driver.window_handles
+        # Yelp ouvre la fiche dans un nouvel onglet : on ne garde que le premier
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        driver.get("about:blank")
+
+    def _discard(self, pooled):
+        self._quit(pooled)
+        with self._cond:
+            self._size -= 1
+            self._stats["recycles"] += 1
+            self._cond.notify()
+
+    # ---------- API publique ----------
+
+    def warmup(self, background=True):
+        """Pré-lance min_size navigateurs (en tâche de fond par défaut)"""
+        def _fill():
+            while True:
+                with self._cond:
+                    if self._closed or self._size >= self.min_size:
+                        return
+                    self._size += 1
+                try:
+                    pooled = self._launch()
+                except Exception as e:
+                    print(f"Erreur pré-lancement Chrome: {e}")
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    return
+                with self._cond:
+                    self._idle.append(pooled)
+                    self._cond.notify()
+
+        if background:
+            threading.Thread(target=_fill, name="driver-pool-warmup", daemon=True).start()
+        else:
+            _fill()
+
+    def _acquire(self, timeout):
+        deadline = time.monotonic() + timeout
+        waited = False
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Le pool de navigateurs est fermé")
+                    if self._idle:
+                        pooled = self._idle.popleft()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        pooled = None
+                        break
+                    if not waited:
+                        self._stats["waits"] += 1
+                        waited = True
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError("Aucun navigateur disponible dans le pool")
+                    self._cond.wait(remaining)
+
+            if pooled is None:
+                try:
+                    return self._launch()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+
+            # Navigateur existant : vérifier qu'il répond encore
+            if self._is_healthy(pooled):
+                with self._cond:
+                    self._stats["hits"] += 1
+                return pooled
+
+            with self._cond:
+                self._stats["health_failures"] += 1
+            self._report_proxy(pooled, ok=False)
+            self._discard(pooled)
+
+    def _report_proxy(self, pooled, ok):
+        if pooled.proxy is None:
+            return
+        if ok:
+            self.proxy_pool.report_success(pooled.proxy)
+        else:
+            self.proxy_pool.report_failure(pooled.proxy)
+
+    def _release(self, pooled, broken=False, proxy_ok=True):
+        pooled.uses += 1
+        if not broken:
+            try:
+                self._reset(pooled)
+            except Exception:
+                broken = True
+        self._report_proxy(pooled, ok=proxy_ok)
+
+        if broken or self._closed or self._needs_recycle(pooled):
+            self._discard(pooled)
+            return
+
+        with self._cond:
+            self._idle.append(pooled)
+            self._cond.notify()
+
+    @contextmanager
+    def checkout(self, timeout=None):
+        """
+        Prête un navigateur du pool le temps d'un bloc `with`
+
+        Args:
+            timeout: Attente max (s) si tous les navigateurs sont occupés
+
+        Yields:
+            Un webdriver Chrome prêt à l'emploi
+        """
+        pooled = self._acquire(self.checkout_timeout if timeout is None else timeout)
+        with self._cond:
+            self._stats["checkouts"] += 1
+        broken = False
+        proxy_ok = True
+        try:
+            yield pooled.driver
+        except GeneratorExit:
+            # extracteur-générateur fermé par l'appelant (client déconnecté) :
+            # le navigateur est sain, il est remis à zéro et rendu au pool
+            raise
+        except BaseException as e:
+            # Une erreur non gérée laisse le navigateur dans un état inconnu ;
+            # seules les erreurs du navigateur (pages bloquées, délais) comptent contre le proxy
+            broken = True
+            proxy_ok = not isinstance(e, WebDriverException)
+            raise
+        finally:
+            self._release(pooled, broken=broken, proxy_ok=proxy_ok)
+
+    def stats(self) -> dict:
+        """Compteurs du pool (pour dimensionner min_size / max_size par machine)"""
+        with self._cond:
+            return {
+                **self._stats,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+            }
+
+    def shutdown(self):
+        """Ferme tous les navigateurs libres et refuse les nouveaux prêts"""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for pooled in idle:
+            self._quit(pooled)
+
+
+# ---------- Pools partagés (un par mode d'affichage) ----------
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def configure_driver_pool(**kwargs):
+    """Modifie la configuration utilisée pour les pools créés ensuite"""
+    unknown = set(kwargs) - set(POOL_CONFIG)
+    if unknown:
+        raise ValueError(f"Paramètres inconnus: {', '.join(sorted(unknown))}")
+    POOL_CONFIG.update(kwargs)
+
+
+def get_driver_pool(headless=False) -> DriverPool:
+    """Retourne le pool partagé (créé et pré-chauffé au premier appel)"""
+    with _pools_lock:
+        pool = _pools.get(headless)
+        if pool is None:
+            options = {k: v for k, v in POOL_CONFIG.items() if k != "headless"}
+            pool = DriverPool(
+                headless=headless or POOL_CONFIG["headless"], proxy_pool=active_proxy_pool(), **options
+            )
+            pool.warmup()
+            _pools[headless] = pool
+        return pool
+
+
+def driver_pool_stats() -> dict:
+    """Statistiques de tous les pools partagés"""
+    with _pools_lock:
+        pools = dict(_pools)
+    return {
+        ("headless" if headless else "default"): pool.stats()
+        for headless, pool in pools.items()
+    }
+
+
+def shutdown_driver_pools():
+    """Ferme tous les pools partagés"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown()
@@ -0,0 +1,161 @@
+"""Extraction simultanée des avis d'une même entreprise sur toutes les plateformes"""
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from urllib.parse import quote
+
+from functions.scrapping.functions_trustpilot import iter_reviews_from_trustpilot
+from functions.scrapping.functions_yelp import iter_reviews_from_yelp
+from functions.scrapping.functions_google_reviews import iter_google_reviews_full_best_effort
+from functions.scrapping.functions_play_store import iter_reviews_from_google_play_store
+from functions.scrapping.functions_amazon import iter_reviews_from_amazon
+
+
+# Durée maximale accordée à chaque source (s) ; au-delà ses avis déjà lus sont rendus
+FANOUT_TIMEOUTS = {
+    "trustpilot": 90,
+    "yelp": 180,
+    "google": 180,
+    "playstore": 180,
+    "amazon": 180,
+}
+
+# Délai laissé à un extracteur bloqué (attente WebDriver) pour s'arrêter de lui-même
+STOP_GRACE = 5
+
+
+def google_maps_url(search):
+    """URL Google Maps d'une recherche (les URL sont utilisées telles quelles)"""
+    if search.startswith(("http://", "https://")):
+        return search
+    return f"https://www.google.com/maps/search/{quote(search)}"
+
+
+# Sources dont les avis ont un identifiant stable : extraction incrémentale possible
+# (Yelp n'expose ni identifiant ni date dans ses cartes)
+INCREMENTAL_SOURCES = ("trustpilot", "google", "playstore", "amazon")
+
+
+def iter_source_reviews(source, search, max_reviews, engine="auto", since=None):
+    """
+    Générateur d'avis d'une source
+
+    Args:
+        source: "trustpilot", "yelp", "google", "playstore" ou "amazon"
+        search: Entreprise (ou URL Google Maps pour "google")
+        max_reviews: Nombre maximum d'avis
+        engine: Moteur Trustpilot ("auto", "http", "selenium")
+        since: Watermark de reprise (voir watermarks.py), ignoré hors INCREMENTAL_SOURCES
+    """
+    if source == "trustpilot":
+        return iter_reviews_from_trustpilot(search, max_reviews, engine, since=since)
+    elif source == "yelp":
+        return iter_reviews_from_yelp(search, max_reviews)
+    elif source == "google":
+        return iter_google_reviews_full_best_effort(google_maps_url(search), max_reviews, since=since)
+    elif source == "playstore":
+        return iter_reviews_from_google_play_store(search, max_reviews, since=since)
+    elif source == "amazon":
+        return iter_reviews_from_amazon(search, max_reviews, since=since)
+    raise ValueError(f"Source invalide: {source}")
+
+
+SOURCES = tuple(FANOUT_TIMEOUTS)
+
+
+class _SourceRun:
+    """État de l'extraction d'une source (partagé entre son thread et l'appelant)"""
+
+    def __init__(self, source, timeout):
+        self.source = source
+        self.timeout = timeout
+        self.reviews = []
+        self.status = "running"
+        self.error = None
+        self.started_at = None
+        self.seconds = None
+        self.stop = threading.Event()
+
+
+def _run_source(run, reviews_iter):
+    run.started_at = time.monotonic()
+    deadline = run.started_at + run.timeout
+    try:
+        for item in reviews_iter:
+            run.reviews.append(item)
+            if run.stop.is_set() or time.monotonic() >= deadline:
+                run.status = "timeout"
+                break
+        else:
+            run.status = "ok"
+    except Exception as e:
+        run.status = "error"
+        run.error = f"{type(e).__name__}: {e}"
+    finally:
+        # ferme l'extracteur : le navigateur est rendu au pool
+        reviews_iter.close()
+        run.seconds = round(time.monotonic() - run.started_at, 3)
+
+
+def extract_reviews_from_all_sources(company, max_reviews, sources=None, timeouts=None, engine="auto",
+                                     iterate=iter_source_reviews):
+    """
+    Extrait les avis de l'entreprise sur toutes les sources en même temps
+
+    Chaque source tourne dans son propre thread (et son propre navigateur du
+    pool) : la durée totale est celle de la source la plus lente, bornée par
+    son timeout. Une source en échec ou hors délai n'empêche pas les autres
+    de rendre leurs avis.
+
+    Args:
+        company: Entreprise recherchée
+        max_reviews: Nombre maximum d'avis par source
+        sources: Sources à interroger (défaut : toutes)
+        timeouts: Timeouts par source (s), complétant FANOUT_TIMEOUTS
+        engine: Moteur Trustpilot
+        iterate: Fonction (source, company, max_reviews, engine) -> générateur d'avis
+
+    Returns:
+        {source: {"status": "ok" | "timeout" | "error", "count", "seconds", "error", "reviews"}}
+    """
+    sources = list(sources or SOURCES)
+    timeouts = {**FANOUT_TIMEOUTS, **(timeouts or {})}
+    runs = {source: _SourceRun(source, timeouts.get(source, max(FANOUT_TIMEOUTS.values()))) for source in sources}
+
+    executor = ThreadPoolExecutor(max_workers=len(sources), thread_name_prefix="fanout")
+    futures = {}
+    start = time.monotonic()
+    for source, run in runs.items():
+        try:
+            reviews_iter = iterate(source, company, max_reviews, engine)
+        except Exception as e:
+            run.status, run.error, run.seconds = "error", f"{type(e).__name__}: {e}", 0.0
+            continue
+        futures[source] = executor.submit(contextvars.copy_context().run, _run_source, run, reviews_iter)
+
+    try:
+        for source, future in futures.items():
+            run = runs[source]
+            # le délai d'une source court depuis le lancement commun
+            remaining = start + run.timeout + STOP_GRACE - time.monotonic()
+            try:
+                future.result(timeout=max(0, remaining))
+            except FutureTimeoutError:
+                # extracteur bloqué au-delà de son délai : il s'arrêtera au prochain avis
+                run.stop.set()
+                run.status = "timeout"
+                run.seconds = round(time.monotonic() - start, 3)
+    finally:
+        executor.shutdown(wait=False)
+
+    return {
+        source: {
+            "status": run.status,
+            "count": len(run.reviews),
+            "seconds": run.seconds,
+            "error": run.error,
+            "reviews": list(run.reviews),
+        }
+        for source, run in runs.items()
+    }
@@ -6,13 +6,43 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.chrome.options import Options
 import time
-import pandas as pd
 import unicodedata
 import requests
 import pickle
+from functions.metrics import span
+from functions.scrapping.amazon_session import AMAZON_HOME_URL, get_amazon_sessions
+from functions.scrapping.checkpoints import open_checkpoint
+from functions.scrapping.dom_extraction import collect_reviews, collect_texts, review_key
+from functions.scrapping.pagination import PAGE_CONCURRENCY, page_url, fetch_pages_in_tabs
+from functions.scrapping.politeness import detect_blocks, polite_request
+from functions.scrapping.resolution_cache import resolve_cached
+from functions.scrapping.watermarks import cut_at_watermark, mark_exhausted
+from functions.storage.html_archive import archive_page
+
+# Lecture de toutes les cartes de la page en un seul appel WebDriver
+AMAZON_CARDS_JS = """
+return Array.from(
+    document.querySelectorAll('li[data-hook="review"]'),
+    card => {
+        const text = card.querySelector('span[data-hook="review-body"] span');
+        const rating = card.querySelector('i[data-hook="review-star-rating"] span.a-icon-alt');
+        const date = card.querySelector('span[data-hook="review-date"]');
+        const author = card.querySelector('span.a-profile-name');
+        return {
+            rating: rating ? rating.innerHTML : null,
+            review: text ? text.innerText : '',
+            review_id: card.id || null,
+            date: date ? date.innerText.trim() : null,
+            author: author ? author.innerText.trim() : null
+        };
+    }
+);
+"""
 
 
 # Sauvegarder les cookies après une première connexion manuelle
+# (ils sont importés dans les profils Chrome d'amazon_session.py lors de la
+# première vérification ; login_amazon_profile() connecte directement un profil)
 def save_cookies(user_agent):
 
     chrome_options = Options()
@@ -32,70 +62,65 @@ def save_cookies(user_agent):
     
     driver.quit()
 
-# Recharger les cookies pour une session ultérieure
-def load_cookies(url):
-    driver = webdriver.Chrome()
-    driver.get(url)
-    
-    # Charger les cookies sauvegardés
-    with open("cookies.pkl", "rb") as file:
-        cookies = pickle.load(file)
-        for cookie in cookies:
-            driver.add_cookie(cookie)
-    
-    # Recharger la page avec les cookies
-    driver.refresh()
-    
-    return driver
-
 def extract_review_from_amazon(url, max_reviews):
-    driver = load_cookies(url)
-    wait = WebDriverWait(driver, 5)
-    bouton = wait.until(EC.element_to_be_clickable((By.XPATH,  "//a[contains(., 'Voir plus de commentaires')]")))
-    bouton.click()
-
-    reviews_text = []
-    page = 1
-    while len(reviews_text) < max_reviews:
-        try:
-                wait.until(
-                    EC.presence_of_all_elements_located(
-                        (By.XPATH, '//span[@data-hook="review-body"]')
+    with get_amazon_sessions().checkout() as driver:
+        driver.get(url)
+        wait = WebDriverWait(driver, 5)
+        bouton = wait.until(EC.element_to_be_clickable((By.XPATH,  "//a[contains(., 'Voir plus de commentaires')]")))
+        bouton.click()
+
+        reviews_text = []
+        page = 1
+        while len(reviews_text) < max_reviews:
+            try:
+                    reviews = wait.until(
+                        EC.presence_of_all_elements_located(
+                            (By.XPATH, '//span[@data-hook="review-body"]')
+                        )
                     )
-                )
 
-                reviews = driver.find_elements(
-                        By.XPATH, 
-                        '//span[@data-hook="review-body"]//span'
-                    )
-                
-                for review in reviews:
-                    text = review.text.strip()
-                    if text != '':
-                        reviews_text.append(text)
+                    texts = collect_texts(driver, 'span[data-hook="review-body"] span')
+                    reviews_text.extend(texts[:max_reviews - len(reviews_text)])
                     if len(reviews_text) >= max_reviews:
-                            # return liste_review
-                            break
+                        break
 
+                    next_btn = wait.until(EC.element_to_be_clickable((By.XPATH, "//a[contains(text(), 'Suivant')]")))
+                    driver.execute_script("arguments[0].click();", next_btn)
+                    # maintenant on attend que l’ancienne page disparaisse
+                    wait.until(EC.staleness_of(reviews[0]))
+                    page += 1
 
-                next_btn = wait.until(EC.element_to_be_clickable((By.XPATH, "//a[contains(text(), 'Suivant')]")))
-                driver.execute_script("arguments[0].click();", next_btn)
-                # maintenant on attend que l’ancienne page disparaisse
-                wait.until(EC.staleness_of(reviews[0]))
-                page += 1
+            except TimeoutException:
+                # print("\nPlus de page suivante")
+                break
 
-        except TimeoutException:
-            # print("\nPlus de page suivante")
-            break
-    driver.quit()
     return reviews_text
 
 
-def search_company_from_amazon(company):
-    driver = webdriver.Chrome()
+def search_company_from_amazon(company, driver):
+    """
+    Ouvre la page produit Amazon (URL mémorisée dans le cache de résolution)
 
-    #driver.get("https://www.trustpilot.com/")
-    driver = load_cookies("https://www.amazon.fr/")
+    Args:
+        company: Produit recherché
+        driver: Navigateur d'une session Amazon (get_amazon_sessions().checkout())
+
+    Raises:
+        CompanyNotFoundError: si la recherche ne donne aucun résultat
+    """
+    resolve_cached(
+        "amazon", company,
+        search=lambda c: _search_company_url_selenium(c, driver),
+        open_url=driver.get,
+    )
+    return driver
+
+
+def _search_company_url_selenium(company, driver):
+    """Recherche sur le site et ouvre le premier résultat ; retourne son URL (None si aucun)"""
+    # la vérification de session vient peut-être d'ouvrir l'accueil
+    if not driver.current_url.startswith(AMAZON_HOME_URL):
+        driver.get(AMAZON_HOME_URL)
     wait = WebDriverWait(driver, 10)
 
     # ---- Recherche ----
@@ -104,88 +129,125 @@ def search_company_from_amazon(company):
     search.send_keys(Keys.RETURN)
 
     # ---- Premier résultat ----
-    first_card = wait.until(
-        EC.element_to_be_clickable((By.CSS_SELECTOR, "a[class='a-link-normal s-no-outline']"))
-    )
-
-    # Option 1 : cliquer directement
-    driver.execute_script("arguments[0].click();", first_card)
-
-    # Option 2 : récupérer l'URL 
-    # url = first_card.get_attribute("href")
-    # driver.get(url)
-
-    return driver
-
-
-
-def extract_reviews_and_ratings_from_amazon(company, max_reviews):
-    
-    driver = search_company_from_amazon(company)
-    wait = WebDriverWait(driver, 5)
-
-    # Ouvrir la page des avis
-    bouton = wait.until(
-        EC.element_to_be_clickable((By.XPATH, "//a[contains(., 'Voir plus de commentaires')]"))
-    )
-    bouton.click()
-
-    results = []
-    page = 1
-
-    while len(results) < max_reviews:
-        try:
-            # Attendre les blocs d'avis
-            wait.until(
-                EC.presence_of_all_elements_located(
-                    (By.XPATH, '//li[@data-hook="review"]')
-                )
-            )
-
-            reviews = driver.find_elements(By.XPATH, '//li[@data-hook="review"]')
-
-            for review in reviews:
-                try:
-                    # Texte de l'avis
-                    text = review.find_element(
-                        By.XPATH, './/span[@data-hook="review-body"]//span'
-                    ).text.strip()
-
-                    # Rating
-                    rating_text = review.find_element(
-                        By.XPATH, './/i[@data-hook="review-star-rating"]//span[@class="a-icon-alt"]'
-                    ).get_attribute("innerHTML")
-
-                    rating = float(rating_text.split()[0].replace(',', '.'))
-
-                    if text:
-                        results.append({
-                            "rating": rating,
-                            "review": text
-                        })
+    try:
+        first_card = wait.until(
+            EC.element_to_be_clickable((By.CSS_SELECTOR, "a[class='a-link-normal s-no-outline']"))
+        )
+    except TimeoutException:
+        return None
+
+    url = first_card.get_attribute("href")
+    driver.get(url)
+    return url
 
-                    if len(results) >= max_reviews:
-                        break
 
-                except Exception:
-                    # Avis incomplet → on ignore
-                    continue
 
-            # Bouton suivant
-            next_btn = wait.until(
-                EC.element_to_be_clickable((By.XPATH, "//a[contains(text(), 'Suivant')]"))
+def _extract_amazon_page(driver, company="", timeout=5):
+    """Avis de la page Amazon affichée (liste vide si aucun avis n'apparaît)"""
+    try:
+        with detect_blocks("amazon", driver), span("page_load", "amazon"):
+            WebDriverWait(driver, timeout).until(
+                EC.presence_of_all_elements_located((By.XPATH, '//li[@data-hook="review"]'))
             )
-            driver.execute_script("arguments[0].click();", next_btn)
-
-            # Attendre que la page change
-            wait.until(EC.staleness_of(reviews[0]))
-            page += 1
-
-        except TimeoutException:
-            break
-
-    driver.quit()
-    return results
+    except TimeoutException:
+        return []
+    with span("extract", "amazon"):
+        items = collect_reviews(driver, AMAZON_CARDS_JS)
+    archive_page("amazon", company, driver)
+    return items
+
+
+def extract_reviews_and_ratings_from_amazon(company, max_reviews, concurrency=PAGE_CONCURRENCY, since=None):
+    """
+    Extrait les avis Amazon d'un produit
+
+    Avec un watermark `since` (voir watermarks.py), les avis sont triés du
+    plus récent au plus ancien et l'extraction s'arrête au premier avis connu.
+    """
+    return list(iter_reviews_from_amazon(company, max_reviews, concurrency, since))
+
+
+def iter_reviews_from_amazon(company, max_reviews, concurrency=PAGE_CONCURRENCY, since=None):
+    """
+    Avis Amazon rendus un par un dès leur lecture (générateur ; le fermer libère le navigateur)
+
+    Une longue extraction interrompue reprend au numéro de page suivant le
+    dernier lot de pages rendu, ou à la page restée vide (délai dépassé,
+    blocage) qui l'a arrêtée (voir checkpoints.py).
+    """
+    checkpoint = open_checkpoint("amazon", company, max_reviews, since)
+    done = checkpoint.results[:max_reviews]
+    yield from done
+    if len(done) >= max_reviews:
+        checkpoint.clear(len(done))
+        return
+
+    with get_amazon_sessions().checkout() as driver:
+        if checkpoint.resumed:
+            # pages adressables par ?pageNumber=N : pas besoin de repasser par la fiche produit
+            reviews_url, page = checkpoint.cursor["url"], checkpoint.cursor["page"]
+        else:
+            search_company_from_amazon(company, driver)
+            wait = WebDriverWait(driver, 5)
+
+            # Ouvrir la page des avis
+            with polite_request("amazon", company, driver), span("page_load", "amazon"):
+                bouton = wait.until(
+                    EC.element_to_be_clickable((By.XPATH, "//a[contains(., 'Voir plus de commentaires')]"))
+                )
+                bouton.click()
+                if since:
+                    driver.get(page_url(driver.current_url, "sortBy", "recent"))
+            reviews_url, page = None, 1
+
+        count = len(done)
+        seen = {review_key(item) for item in checkpoint.results}
+
+        while count < max_reviews:
+            if page == 1:
+                pages = [_extract_amazon_page(driver, company)]
+                reviews_url = driver.current_url
+            else:
+                # Les pages suivantes sont adressables par ?pageNumber=N :
+                # `concurrency` pages sont chargées en même temps dans des onglets
+                urls = [page_url(reviews_url, "pageNumber", n) for n in range(page, page + concurrency)]
+                with polite_request("amazon", company, driver, cost=len(urls)):
+                    pages = fetch_pages_in_tabs(driver, urls, lambda d: _extract_amazon_page(d, company))
+            first_page, page = page, page + len(pages)
+
+            finished = False
+            produced = []
+            for offset, items in enumerate(pages):
+                # page vide : délai dépassé ou blocage, pas la preuve de la fin des avis →
+                # le point de reprise est conservé et la prochaine extraction repart de cette page
+                if not items:
+                    if first_page + offset > 1:
+                        checkpoint.advance(produced, url=reviews_url, page=first_page + offset)
+                    return
+                new_items = [item for item in items if review_key(item) not in seen]
+                # dernière page renvoyée à nouveau (Amazon la renvoie au-delà) : fin des avis
+                if not new_items:
+                    mark_exhausted(since)
+                    finished = True
+                    break
+                new_items, reached = cut_at_watermark(new_items, since)
+                for item in new_items[:max_reviews - count]:
+                    seen.add(review_key(item))
+                    yield item
+                    produced.append(item)
+                    count += 1
+                # watermark atteint : les avis suivants sont déjà connus
+                if reached:
+                    finished = True
+                    break
+                if count >= max_reviews:
+                    break
+
+            if finished or count >= max_reviews:
+                break
+            checkpoint.advance(produced, url=reviews_url, page=page)
+
+    checkpoint.clear(count)
 
 
 # driver = load_cookies(url)
@@ -5,225 +5,289 @@ from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 import re
+from functions.metrics import span
+from functions.scrapping.driver_pool import get_driver_pool
+from functions.scrapping.politeness import polite_request
+from functions.scrapping.checkpoints import open_checkpoint
+from functions.scrapping.dom_extraction import collect_reviews, review_key
+from functions.scrapping.waits import (
+    MAX_IDLE_SCROLLS, wait_for_cards, scroll_and_wait_for_cards, scroll_until_card_count,
+)
+from functions.scrapping.watermarks import cut_at_watermark, mark_exhausted
+from functions.storage.html_archive import archive_page
+
+CARD_SELECTOR = "div[data-review-id]"
+PANEL_SELECTOR = "div.m6QErb.DxyBCb.kA9KIf.dS8AEf"
+
+# Bouton de consentement aux cookies (une seule attente pour toutes les variantes)
+COOKIES_XPATH = " | ".join([
+    "//button//*[contains(text(),'Tout accepter')]/..",
+    "//button//*[contains(text(),'J’accepte')]/..",
+    "//button//*[contains(text(),\"J'accepte\")]/..",
+    "//button//*[contains(text(),'Accept all')]/..",
+    "//button//*[contains(text(),'Accept')]/..",
+])
+
+# Onglet "Avis / Reviews"
+REVIEWS_TAB_XPATH = " | ".join([
+    "//button[contains(@aria-label,'Avis')]",
+    "//button[contains(@aria-label,'Reviews')]",
+    "//*[@role='tab'][contains(.,'Avis')]",
+    "//*[@role='tab'][contains(.,'Reviews')]",
+])
+
+# Tri des avis : bouton "Trier" puis option "Plus récents"
+SORT_BUTTON_XPATH = " | ".join([
+    "//button[contains(@aria-label,'Trier')]",
+    "//button[contains(@aria-label,'Sort')]",
+])
+NEWEST_OPTION_XPATH = " | ".join([
+    "//*[@role='menuitemradio'][contains(.,'récents')]",
+    "//*[@role='menuitemradio'][contains(.,'Newest')]",
+])
+
+# Lit en un seul appel WebDriver les cartes ajoutées depuis l'index arguments[0]
+# (en dépliant leurs boutons "Plus/More")
+GOOGLE_CARDS_JS = """
+const start = arguments[0] || 0;
+const seen = new Set();
+return Array.from(document.querySelectorAll('div[data-review-id]'))
+    .slice(start)
+    .filter(card => {
+        // les cartes Google contiennent un div imbriqué avec le même id
+        const id = card.getAttribute('data-review-id');
+        if (seen.has(id)) return false;
+        seen.add(id);
+        return true;
+    })
+    .map(card => {
+        card.querySelectorAll('button.w8nwRe.kyuRq').forEach(b => { try { b.click(); } catch (e) {} });
+        const rating = card.querySelector("[role='img'][aria-label]");
+        const el = card.querySelector('span.wiI7pd');
+        let text = '';
+        if (el) {
+            // texte complet : le plus long entre innerText, aria-label et textContent
+            for (const candidate of [el.innerText, el.getAttribute('aria-label'), el.textContent]) {
+                const value = (candidate || '').trim();
+                if (value.length > text.length) text = value;
+            }
+        }
+        const date = card.querySelector('span.rsqaWe');
+        const author = card.querySelector('div.d4r55');
+        return {
+            rating: rating ? rating.getAttribute('aria-label') : null,
+            review: text,
+            review_id: card.getAttribute('data-review-id'),
+            date: date ? date.innerText.trim() : null,
+            author: author ? author.innerText.trim() : null
+        };
+    });
+"""
+
+
+def _accept_cookies(driver, timeout=4):
+    """Clique sur le bouton de consentement s'il apparaît"""
+    try:
+        btn = WebDriverWait(driver, timeout).until(EC.element_to_be_clickable((By.XPATH, COOKIES_XPATH)))
+        driver.execute_script("arguments[0].click();", btn)
+        # la bannière disparaît (ou la page de consentement redirige)
+        WebDriverWait(driver, 10).until(EC.invisibility_of_element(btn))
+    except Exception:
+        pass
 
 
-def extract_google_reviews_full_best_effort(url: str, max_reviews: int = 50, headless: bool = False):
-    options = webdriver.ChromeOptions()
-    if headless:
-        options.add_argument("--headless=new")
-    options.add_argument("--window-size=1400,900")
-
-    driver = webdriver.Chrome(options=options)
-    wait = WebDriverWait(driver, 10)
-
-    def get_full_text_from_el(el):
-       
-        txt = (el.text or "").strip()
-
-        aria = (el.get_attribute("aria-label") or "").strip()
-        if len(aria) > len(txt):
-            txt = aria
+def _open_reviews_panel(driver, wait):
+    """Ouvre l'onglet des avis et retourne le panneau scrollable une fois chargé"""
+    try:
+        wait.until(EC.element_to_be_clickable((By.XPATH, REVIEWS_TAB_XPATH))).click()
+    except Exception:
+        pass
 
-        
-        js_txt = driver.execute_script("return arguments[0].textContent;", el)
-        js_txt = (js_txt or "").strip()
-        if len(js_txt) > len(txt):
-            txt = js_txt
+    panel = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, PANEL_SELECTOR)))
+    return panel
 
-        return txt
 
+def _sort_reviews_by_newest(driver, timeout=5):
+    """Trie les avis du plus récent au plus ancien (False si le menu de tri est introuvable)"""
+    wait = WebDriverWait(driver, timeout)
     try:
+        driver.execute_script("arguments[0].click();", wait.until(
+            EC.element_to_be_clickable((By.XPATH, SORT_BUTTON_XPATH))
+        ))
+        driver.execute_script("arguments[0].click();", wait.until(
+            EC.element_to_be_clickable((By.XPATH, NEWEST_OPTION_XPATH))
+        ))
+    except Exception:
+        return False
+    return True
+
+
+def _prepare_watermark(driver, since):
+    """Watermark utilisable seulement si les avis sont triés par date"""
+    if since and not _sort_reviews_by_newest(driver):
+        print("Tri par date impossible sur Google Maps → extraction complète")
+        return None
+    return since
+
+
+def extract_google_reviews_full_best_effort(url: str, max_reviews: int = 50, headless: bool = False, since=None):
+    """
+    Extrait les avis Google Maps d'un lieu
+
+    Avec un watermark `since` (voir watermarks.py), les avis sont triés du
+    plus récent au plus ancien et l'extraction s'arrête au premier avis connu.
+    """
+    return list(iter_google_reviews_full_best_effort(url, max_reviews, headless, since))
+
+
+def iter_google_reviews_full_best_effort(url: str, max_reviews: int = 50, headless: bool = False, since=None):
+    """
+    Avis Google Maps rendus un par un dès leur lecture (générateur ; le fermer libère le navigateur)
+
+    Une longue extraction interrompue reprend après les cartes déjà lues :
+    la liste est redéroulée sans les extraire (voir checkpoints.py).
+    """
+    checkpoint = open_checkpoint("google", url, max_reviews, since)
+    done = checkpoint.results[:max_reviews]
+    yield from done
+    if len(done) >= max_reviews:
+        checkpoint.clear(len(done))
+        return
+
+    count = len(done)
+    with get_driver_pool(headless).checkout() as driver:
+        for item in _iter_google_reviews_full_best_effort(driver, url, max_reviews, since, checkpoint):
+            yield item
+            count += 1
+    checkpoint.clear(count)
+
+
+def _iter_google_reviews_full_best_effort(driver, url: str, max_reviews: int, since=None, checkpoint=None):
+    wait = WebDriverWait(driver, 10)
+
+    with polite_request("google", url, driver), span("page_load", "google"):
         driver.get(url)
-        time.sleep(3)
 
         # Cookies
-        for xp in [
-            "//button//*[contains(text(),'Tout accepter')]/..",
-            "//button//*[contains(text(),'J’accepte')]/..",
-            "//button//*[contains(text(),\"J'accepte\")]/..",
-            "//button//*[contains(text(),'Accept all')]/..",
-            "//button//*[contains(text(),'Accept')]/..",
-        ]:
-            try:
-                btn = WebDriverWait(driver, 4).until(EC.element_to_be_clickable((By.XPATH, xp)))
-                driver.execute_script("arguments[0].click();", btn)
-                time.sleep(2)
-                break
-            except Exception:
-                pass
+        _accept_cookies(driver)
 
         # Ouvrir "Avis / Reviews"
-        for xp in [
-            "//button[contains(@aria-label,'Avis')]",
-            "//button[contains(@aria-label,'Reviews')]",
-            "//*[@role='tab'][contains(.,'Avis')]",
-            "//*[@role='tab'][contains(.,'Reviews')]",
-        ]:
-            try:
-                wait.until(EC.element_to_be_clickable((By.XPATH, xp))).click()
-                time.sleep(2)
-                break
-            except Exception:
-                pass
+        panel = _open_reviews_panel(driver, wait)
+        # watermark de l'appelant : marqué même si le tri par date échoue (since → None)
+        watermark, since = since, _prepare_watermark(driver, since)
+        card_count = wait_for_cards(driver, CARD_SELECTOR, container=panel)
+
+    results = checkpoint.results[:max_reviews] if checkpoint is not None else []
+    count = len(results)
+    seen = {review_key(item) for item in results}  # id Google ou empreinte du contenu
+    processed = 0  # cartes déjà lues : seules les nouvelles sont extraites
+    same_scroll_count = 0
 
-        # Panel scroll 
-        panel = wait.until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "div.m6QErb.DxyBCb.kA9KIf.dS8AEf"))
+    if checkpoint is not None and checkpoint.resumed:
+        card_count = scroll_until_card_count(
+            driver, panel, CARD_SELECTOR, card_count, checkpoint.cursor["cards"],
+            pace=lambda: polite_request("google", url),
         )
+        processed = min(card_count, checkpoint.cursor["cards"])
 
-        results = []
-        seen = set()
-        last_h = 0
+    while count < max_reviews and same_scroll_count < MAX_IDLE_SCROLLS:
+        with span("extract", "google"):
+            items = collect_reviews(driver, GOOGLE_CARDS_JS, processed, rating_cast=int, require_rating=False)
+        processed = card_count
+        items, reached = cut_at_watermark(items, since)
 
-        while len(results) < max_reviews:
-            cards = driver.find_elements(By.CSS_SELECTOR, "div[data-review-id]")
-            if not cards:
+        produced = []
+        for item in items:
+            if count >= max_reviews:
                 break
+            # filtre basique
+            if len(item["review"]) > 30:
+                key = review_key(item)
+                if key not in seen:
+                    seen.add(key)
+                    yield item
+                    produced.append(item)
+                    count += 1
+
+        if reached or count >= max_reviews:
+            break
+        if checkpoint is not None:
+            checkpoint.advance(produced, cards=processed)
 
-            # Clique "More/Plus" sur les avis
-            more_btns = driver.find_elements(By.CSS_SELECTOR, "button.w8nwRe.kyuRq")
-            for b in more_btns:
-                try:
-                    driver.execute_script("arguments[0].click();", b)
-                    time.sleep(0.05)
-                except Exception:
-                    pass
-
-            # Extrait texte
-            for c in cards:
-                if len(results) >= max_reviews:
-                    break
-                try:
-                    text_el = c.find_element(By.CSS_SELECTOR, "span.wiI7pd")
-                    full = get_full_text_from_el(text_el)
-                    # filtre basique
-                    if full and len(full) > 30:
-                        key = full[:180]
-                        if key not in seen:
-                            seen.add(key)
-                            results.append(full)
-                except Exception:
-                    pass
-
-            # scroll pour charger + avis
-            driver.execute_script("arguments[0].scrollTop = arguments[0].scrollHeight", panel)
-            time.sleep(2)
-
-            new_h = driver.execute_script("return arguments[0].scrollHeight", panel)
-            if new_h == last_h:
-                break
-            last_h = new_h
+        # scroll pour charger + avis (retour dès que de nouvelles cartes arrivent)
+        with polite_request("google", url), span("page_load", "google"):
+            new_count = scroll_and_wait_for_cards(driver, panel, CARD_SELECTOR, card_count)
+        if new_count > card_count:
+            same_scroll_count = 0
+            card_count = new_count
+        else:
+            same_scroll_count += 1
 
-        return results
+    # plus aucune carte après MAX_IDLE_SCROLLS défilements : fin de la liste
+    if same_scroll_count >= MAX_IDLE_SCROLLS:
+        mark_exhausted(watermark)
 
-    finally:
-        driver.quit()
+    # liste déroulée (boutons "Plus" dépliés) : une seule capture contient toutes les cartes lues
+    archive_page("google", url, driver)
 
 
+def extract_reviews_and_ratings_from_google_map(url, max_avis=30, headless: bool = False, since=None):
+    return list(iter_reviews_from_google_map(url, max_avis, headless, since))
 
 
+def iter_reviews_from_google_map(url, max_avis=30, headless: bool = False, since=None):
+    """Avis Google Maps rendus un par un dès leur lecture (générateur ; le fermer libère le navigateur)"""
+    with get_driver_pool(headless).checkout() as driver:
+        wait = WebDriverWait(driver, 10)
+        with polite_request("google", url, driver), span("page_load", "google"):
+            driver.get(url)
 
-def extract_reviews_and_ratings_from_google_map(url, max_avis=30, headless: bool = False):
-    options = webdriver.ChromeOptions()
-    if headless:
-        options.add_argument("--headless=new")
-    options.add_argument("--window-size=1400,900")
+            # Cookies
+            _accept_cookies(driver, timeout=10)
 
-    driver = webdriver.Chrome(options=options)
-    driver.get(url)
-    wait = WebDriverWait(driver, 10)
+            # Conteneur scrollable (onglet "Avis / Reviews")
+            panel = _open_reviews_panel(driver, wait)
+            watermark, since = since, _prepare_watermark(driver, since)
+            card_count = wait_for_cards(driver, CARD_SELECTOR, container=panel)
 
-    # Cookies
-    for xp in [
-        "//button//*[contains(text(),'Tout accepter')]/..",
-        "//button//*[contains(text(),'J’accepte')]/..",
-        "//button//*[contains(text(),\"J'accepte\")]/..",
-        "//button//*[contains(text(),'Accept all')]/..",
-        "//button//*[contains(text(),'Accept')]/..",
-    ]:
-        try:
-            btn = wait.until(EC.element_to_be_clickable((By.XPATH, xp)))
-            driver.execute_script("arguments[0].click();", btn)
-            time.sleep(2)
-            break
-        except Exception:
-            pass
-
-    # Ouvrir "Avis / Reviews"
-    for xp in [
-        "//button[contains(@aria-label,'Avis')]",
-        "//button[contains(@aria-label,'Reviews')]",
-        "//*[@role='tab'][contains(.,'Avis')]",
-        "//*[@role='tab'][contains(.,'Reviews')]",
-    ]:
-        try:
-            wait.until(EC.element_to_be_clickable((By.XPATH, xp))).click()
-            time.sleep(2)
-            break
-        except Exception:
-            pass
+        count = 0
+        seen = set()  # clés des avis déjà retenus (id Google ou empreinte du contenu)
+        processed = 0  # cartes déjà lues : seules les nouvelles sont extraites
+        same_scroll_count = 0
 
-    # Conteneur scrollable
-    panel = wait.until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "div.m6QErb.DxyBCb.kA9KIf.dS8AEf"))
-        )
+        while count < max_avis and same_scroll_count < MAX_IDLE_SCROLLS:
 
-    results = []
-    last_h = 0
-    same_scroll_count = 0
+            with span("extract", "google"):
+                items = collect_reviews(driver, GOOGLE_CARDS_JS, processed, rating_cast=int)
+            processed = card_count
+            items, reached = cut_at_watermark(items, since)
 
-    while len(results) < max_avis and same_scroll_count < 5 :     # and same_scroll_count < 5
+            for item in items:
+                key = review_key(item)
+                if key not in seen:
+                    seen.add(key)
+                    yield item
+                    count += 1
 
-        review_cards = driver.find_elements(By.CSS_SELECTOR, "div[data-review-id]")
-        if not review_cards:
-            break
-        
-        # Clique "More/Plus" sur les avis
-        more_btns = driver.find_elements(By.CSS_SELECTOR, "button.w8nwRe.kyuRq")
-        for b in more_btns:
-            try:
-                driver.execute_script("arguments[0].click();", b)
-                time.sleep(0.05)
-            except Exception:
-                pass
-
-
-        for card in review_cards:
-            try:
-                # ----- RATING -----
-                rating_el = card.find_element(By.CSS_SELECTOR, "div[role='img'][aria-label]")
-                aria_label = rating_el.get_attribute("aria-label")
-                rating = int(re.search(r"\d+", aria_label).group())
-
-                # ----- TEXTE -----
-                review_el = card.find_element(By.CSS_SELECTOR, "span.wiI7pd")
-                review_text = review_el.text.strip()
-
-                item = {
-                    "rating": rating,
-                    "review": review_text
-                }
-
-                if item not in results:
-                    results.append(item)
-
-                if len(results) >= max_avis:
+                if count >= max_avis:
                     break
 
-            except Exception:
-                continue
+            if reached or count >= max_avis:
+                break
 
-        # ----- SCROLL -----
-        driver.execute_script("arguments[0].scrollTop = arguments[0].scrollHeight", panel)
-        time.sleep(2)
+            # ----- SCROLL -----
+            with polite_request("google", url), span("page_load", "google"):
+                new_count = scroll_and_wait_for_cards(driver, panel, CARD_SELECTOR, card_count)
 
-        new_h = driver.execute_script("return arguments[0].scrollHeight", panel)
+            if new_count > card_count:
+                same_scroll_count = 0
+                card_count = new_count
+            else:
+                same_scroll_count += 1
 
-        if new_h == last_h:
-            same_scroll_count += 1
-        else:
-            same_scroll_count = 0
-            last_h = new_h
+        # plus aucune carte après MAX_IDLE_SCROLLS défilements : fin de la liste
+        if same_scroll_count >= MAX_IDLE_SCROLLS:
+            mark_exhausted(watermark)
+
+        archive_page("google", url, driver)
 
-    driver.quit()
-    return results
@@ -6,63 +6,112 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.chrome.options import Options
 import time
-import pandas as pd
 import unicodedata
 import re
+from functions.metrics import span
+from functions.scrapping.driver_pool import get_driver_pool
+from functions.scrapping.dom_extraction import collect_reviews, collect_texts, review_key
+from functions.scrapping.waits import (
+    MAX_IDLE_SCROLLS, wait_for_cards, scroll_and_wait_for_cards, scroll_until_card_count,
+)
+from functions.scrapping.checkpoints import open_checkpoint
+from functions.scrapping.politeness import polite_request
+from functions.scrapping.resolution_cache import resolve_cached
+from functions.scrapping.watermarks import cut_at_watermark, mark_exhausted
+from functions.storage.html_archive import archive_page
+
+# Lecture en un seul appel WebDriver des cartes ajoutées depuis l'index arguments[0]
+PLAY_STORE_CARDS_JS = """
+return Array.from(document.querySelectorAll('div.RHo1pe'))
+    .slice(arguments[0] || 0)
+    .map(card => {
+        const rating = card.querySelector("div[role='img'][aria-label]");
+        const text = card.querySelector('.h3YV2d');
+        const header = card.querySelector('[data-review-id]');
+        const date = card.querySelector('span.bp9Aid');
+        const author = card.querySelector('div.X5PpBb');
+        return {
+            rating: rating ? rating.getAttribute('aria-label') : null,
+            review: text ? text.innerText : '',
+            review_id: header ? header.getAttribute('data-review-id') : null,
+            date: date ? date.innerText.trim() : null,
+            author: author ? author.innerText.trim() : null
+        };
+    });
+"""
 
 
 def extract_review_from_gloogle_play_store(url, max):
-    driver = webdriver.Chrome()
-    driver.get(url)
-    wait = WebDriverWait(driver, 10)
+    with get_driver_pool().checkout() as driver:
+        driver.get(url)
+        wait = WebDriverWait(driver, 10)
 
-    bouton = wait.until(EC.element_to_be_clickable((By.XPATH, "//span[contains(text(), 'Afficher tous les avis')]")))
-    bouton.click()
+        bouton = wait.until(EC.element_to_be_clickable((By.XPATH, "//span[contains(text(), 'Afficher tous les avis')]")))
+        bouton.click()
 
-    # -------- PARAMETRE --------
-    MAX_AVIS = max
+        # -------- PARAMETRE --------
+        MAX_AVIS = max
 
-    # -------- SELECTION DU CONTENEUR D'AVIS --------
-    container = wait.until(
-        EC.presence_of_element_located(
-            (By.XPATH, "//div[@jsname='bN97Pc']")  # conteneur scrollable
+        # -------- SELECTION DU CONTENEUR D'AVIS --------
+        container = wait.until(
+            EC.presence_of_element_located(
+                (By.XPATH, "//div[@jsname='bN97Pc']")  # conteneur scrollable
+            )
         )
-    )
 
-    avis_text_list = []
-    last_height = 0  # la hauteur enregistrée au scroll précédent
-    same_scroll_count = 0  # Compte combien de fois on a scrollé sans obtenir de nouveaux avis
+        avis_text_list = []
+        seen = set()
+        card_count = wait_for_cards(driver, "div.h3YV2d", container=container)  # avis déjà chargés
+        processed = 0  # avis déjà lus
+        same_scroll_count = 0  # Compte combien de fois on a scrollé sans obtenir de nouveaux avis
 
-    while len(avis_text_list) < MAX_AVIS and same_scroll_count < 5:
+        while len(avis_text_list) < MAX_AVIS and same_scroll_count < MAX_IDLE_SCROLLS:
         
-        # récupérer tous les avis actuellement visibles
-        avis_elements = driver.find_elements(By.XPATH, "//div[contains(@class,'h3YV2d')]")
-
-        for el in avis_elements:
-            txt = el.text.strip()
-            if txt and txt not in avis_text_list:
-                avis_text_list.append(txt)
+            # récupérer uniquement les avis apparus depuis le dernier passage
+            for txt in collect_texts(driver, "div.h3YV2d", start=processed):
+                if txt not in seen:
+                    seen.add(txt)
+                    avis_text_list.append(txt)
 
+                if len(avis_text_list) >= MAX_AVIS:
+                    break
+            processed = card_count
+        
             if len(avis_text_list) >= MAX_AVIS:
                 break
-        
-        # -------- SCROLL --------
-        driver.execute_script("arguments[0].scrollTop = arguments[0].scrollHeight", container)
-        time.sleep(2)
-
-        # vérifier si ça charge encore
-        new_height = driver.execute_script("return arguments[0].scrollHeight", container)
-        if new_height == last_height:
-            same_scroll_count += 1
-        else:
-            same_scroll_count = 0
-            last_height = new_height
-    driver.quit()
+
+            # -------- SCROLL --------
+            # on rend la main dès que de nouveaux avis arrivent (ou que la liste est stable)
+            new_count = scroll_and_wait_for_cards(driver, container, "div.h3YV2d", card_count)
+            if new_count > card_count:
+                same_scroll_count = 0
+                card_count = new_count
+            else:
+                same_scroll_count += 1
+
     return avis_text_list
 
 
-def search_company_from_google_play_store(company):
-    driver = webdriver.Chrome()
+def search_company_from_google_play_store(company, driver=None):
+    """
+    Ouvre la page Play Store du premier résultat de recherche
+    (URL mémorisée dans le cache de résolution)
+
+    Raises:
+        CompanyNotFoundError: si la recherche ne donne aucun résultat
+    """
+    if driver is None:
+        driver = webdriver.Chrome()
+    resolve_cached(
+        "play_store_first_result", company,
+        search=lambda c: _search_first_app_url(c, driver),
+        open_url=driver.get,
+    )
+    return driver
+
+
+def _search_first_app_url(company, driver):
+    """Recherche sur le site et ouvre le premier résultat ; retourne son URL (None si aucun)"""
     wait = WebDriverWait(driver, 10)
 
     driver.get("https://play.google.com/")
@@ -78,24 +127,43 @@ def search_company_from_google_play_store(company):
     search.send_keys(company)
     search.send_keys(Keys.RETURN)
 
-    time.sleep(5)
-    #---- Premier résultat ----
-    first_card = wait.until(
-        EC.element_to_be_clickable((By.XPATH, "//a[contains(@class,'Si6A0c Gy4nib') or contains(@class,'Qfxief')]"))
-    )
-
-    # # Option 1 : cliquer directement
-    driver.execute_script("arguments[0].click();", first_card)
+    # Attendre que la page de résultats soit affichée et stable
+    wait.until(EC.url_contains("/store/search"))
+    wait_for_cards(driver, "a[href*='/store/apps/details?id=']", min_wait=0.5)
 
-    # Option 2 : récupérer l'URL
-    # url = first_card.get_attribute("href")
-    # driver.get(url)
+    #---- Premier résultat ----
+    try:
+        first_card = wait.until(
+            EC.element_to_be_clickable((By.XPATH, "//a[contains(@class,'Si6A0c Gy4nib') or contains(@class,'Qfxief')]"))
+        )
+    except TimeoutException:
+        return None
 
+    url = first_card.get_attribute("href")
+    driver.get(url)
+    return url
+
+
+def search_company_from_google_play_store_2(company, driver=None):
+    """
+    Ouvre la page Play Store de l'application dont l'URL correspond à la recherche
+    (URL mémorisée dans le cache de résolution)
+
+    Raises:
+        CompanyNotFoundError: si aucune application ne correspond
+    """
+    if driver is None:
+        driver = webdriver.Chrome()
+    resolve_cached(
+        "play_store", company,
+        search=lambda c: _search_matching_app_url(c, driver),
+        open_url=driver.get,
+    )
     return driver
 
 
-def search_company_from_google_play_store_2(company):
-    driver = webdriver.Chrome()
+def _search_matching_app_url(company, driver):
+    """Recherche sur le site et ouvre l'application correspondante ; retourne son URL (None si aucune)"""
     wait = WebDriverWait(driver, 10)
 
     driver.get("https://play.google.com/")
@@ -113,8 +181,9 @@ def search_company_from_google_play_store_2(company):
     search.send_keys(company)
     search.send_keys(Keys.RETURN)
 
-    # Attendre que les résultats apparaissent
-    time.sleep(3)
+    # Attendre que les résultats apparaissent (page de résultats stable)
+    wait.until(EC.url_contains("/store/search"))
+    wait_for_cards(driver, "a[href*='/store/apps/details?id=']", min_wait=0.5)
 
     # Récupérer tous les liens apps
     cards = driver.find_elements(
@@ -122,92 +191,146 @@ def search_company_from_google_play_store_2(company):
     )
 
     # Chercher le lien qui correspond le mieux à la recherche
-    target_card = None
+    target_url = None
     company_lower = company.lower().replace(" ", "")
     for card in cards:
-        href = card.get_attribute("href").lower().replace(" ", "")
-        if company_lower in href:
-            target_card = card
+        href = card.get_attribute("href")
+        if company_lower in href.lower().replace(" ", ""):
+            target_url = href
             break
 
-    if not target_card:
-        driver.quit()
-        return print(f"Aucun résultat correspondant à '{company}' trouvé sur Google Play Store.")
+    if not target_url:
+        print(f"Aucun résultat correspondant à '{company}' trouvé sur Google Play Store.")
+        return None
 
-    # Cliquer dessus
-    driver.execute_script("arguments[0].click();", target_card)
+    driver.get(target_url)
 
     # Attendre que la page app soit chargée
     wait.until(EC.url_contains("/store/apps/details?id="))
 
-    return driver
-
-
-def extract_reviews_and_ratings_from_google_play_store(company, max_avis=30):
-    driver = search_company_from_google_play_store_2(company)
-    # driver.get(url)
-    wait = WebDriverWait(driver, 10)
-
-    # Bouton "Afficher tous les avis"
-    bouton = wait.until(
-        EC.element_to_be_clickable((By.XPATH, "//span[contains(text(), 'Afficher tous les avis')]"))
-    )
-    bouton.click()
-
-    # Conteneur scrollable
-    container = wait.until(
-        EC.presence_of_element_located((By.XPATH, "//div[@jsname='bN97Pc']"))
-    )
-
-    results = []
-    last_height = 0
-    same_scroll_count = 0
-
-    while len(results) < max_avis and same_scroll_count < 5:
-
-        # Toutes les cartes d’avis visibles
-        review_cards = driver.find_elements(By.XPATH, "//div[contains(@class,'RHo1pe')]")
-
-        for card in review_cards:
-            try:
-                # ----- RATING -----
-                rating_el = card.find_element(By.CSS_SELECTOR, "div[role='img'][aria-label]")
-                aria_label = rating_el.get_attribute("aria-label")
-                rating = int(re.search(r"\d+", aria_label).group())
-
-                # ----- TEXTE -----
-                review_el = card.find_element(By.CLASS_NAME, "h3YV2d")
-                review_text = review_el.text.strip()
-
-                item = {
-                    "rating": rating,
-                    "review": review_text
-                }
+    return target_url
+
+
+def _sort_reviews_by_newest(driver, timeout=5):
+    """Trie les avis de la fenêtre "tous les avis" du plus récent au plus ancien (False si impossible)"""
+    wait = WebDriverWait(driver, timeout)
+    try:
+        menu = wait.until(EC.element_to_be_clickable(
+            (By.XPATH, "//div[@role='dialog']//*[@role='button'][.//span[contains(text(), 'pertinent')]]")
+        ))
+        driver.execute_script("arguments[0].click();", menu)
+        option = wait.until(EC.element_to_be_clickable(
+            (By.XPATH, "//*[@role='menuitemradio' or @role='option'][.//span[contains(text(), 'récent')]]")
+        ))
+        driver.execute_script("arguments[0].click();", option)
+    except TimeoutException:
+        return False
+    return True
+
+
+def extract_reviews_and_ratings_from_google_play_store(company, max_avis=30, since=None):
+    """
+    Extrait les avis Play Store d'une application
+
+    Avec un watermark `since` (voir watermarks.py), les avis sont triés du
+    plus récent au plus ancien et l'extraction s'arrête au premier avis connu.
+    Si le tri est impossible, l'extraction est complète (ordre de pertinence).
+    """
+    return list(iter_reviews_from_google_play_store(company, max_avis, since))
+
+
+def iter_reviews_from_google_play_store(company, max_avis=30, since=None):
+    """
+    Avis Play Store rendus un par un dès leur lecture (générateur ; le fermer libère le navigateur)
+
+    Une longue extraction interrompue reprend après les cartes déjà lues :
+    la liste est redéroulée sans les extraire (voir checkpoints.py).
+    """
+    checkpoint = open_checkpoint("playstore", company, max_avis, since)
+    done = checkpoint.results[:max_avis]
+    yield from done
+    if len(done) >= max_avis:
+        checkpoint.clear(len(done))
+        return
+
+    with get_driver_pool().checkout() as driver:
+        search_company_from_google_play_store_2(company, driver)
+        # driver.get(url)
+        wait = WebDriverWait(driver, 10)
+
+        with polite_request("playstore", company, driver), span("page_load", "playstore"):
+            # Bouton "Afficher tous les avis"
+            bouton = wait.until(
+                EC.element_to_be_clickable((By.XPATH, "//span[contains(text(), 'Afficher tous les avis')]"))
+            )
+            bouton.click()
+
+            # Conteneur scrollable
+            container = wait.until(
+                EC.presence_of_element_located((By.XPATH, "//div[@jsname='bN97Pc']"))
+            )
+
+            # watermark de l'appelant : marqué même si le tri par date échoue (since → None)
+            watermark = since
+            if since and not _sort_reviews_by_newest(driver):
+                print("Tri par date impossible sur Google Play Store → extraction complète")
+                since = None
+
+            card_count = wait_for_cards(driver, "div.RHo1pe", container=container)
+
+        count = len(done)
+        # clés des avis déjà retenus (id Play Store ou empreinte du contenu)
+        seen = {review_key(item) for item in checkpoint.results}
+        processed = 0  # cartes déjà lues : seules les nouvelles sont extraites
+        same_scroll_count = 0
+
+        if checkpoint.resumed:
+            card_count = scroll_until_card_count(
+                driver, container, "div.RHo1pe", card_count, checkpoint.cursor["cards"],
+                pace=lambda: polite_request("playstore", company),
+            )
+            processed = min(card_count, checkpoint.cursor["cards"])
+
+        while count < max_avis and same_scroll_count < MAX_IDLE_SCROLLS:
+
+            # Cartes apparues depuis le dernier scroll (un seul appel WebDriver)
+            with span("extract", "playstore"):
+                items = collect_reviews(driver, PLAY_STORE_CARDS_JS, processed, rating_cast=int)
+            processed = card_count
+            items, reached = cut_at_watermark(items, since)
+
+            produced = []
+            for item in items:
+                key = review_key(item)
+                if key not in seen:
+                    seen.add(key)
+                    yield item
+                    produced.append(item)
+                    count += 1
+
+                if count >= max_avis:
+                    break
 
-                if item not in results:
-                    results.append(item)
+            if reached or count >= max_avis:
+                break
+            checkpoint.advance(produced, cards=processed)
 
-                if len(results) >= max_avis:
-                    break
+            # ----- SCROLL -----
+            with polite_request("playstore", company), span("page_load", "playstore"):
+                new_count = scroll_and_wait_for_cards(driver, container, "div.RHo1pe", card_count)
 
-            except Exception:
-                continue
+            if new_count > card_count:
+                same_scroll_count = 0
+                card_count = new_count
+            else:
+                same_scroll_count += 1
 
-        # ----- SCROLL -----
-        driver.execute_script(
-            "arguments[0].scrollTop = arguments[0].scrollHeight", container
-        )
-        time.sleep(2)
+        # plus aucune carte après MAX_IDLE_SCROLLS défilements : fin de la liste
+        if same_scroll_count >= MAX_IDLE_SCROLLS:
+            mark_exhausted(watermark)
 
-        new_height = driver.execute_script(
-            "return arguments[0].scrollHeight", container
-        )
+        # liste déroulée : une seule capture contient toutes les cartes lues
+        archive_page("playstore", company, driver)
 
-        if new_height == last_height:
-            same_scroll_count += 1
-        else:
-            same_scroll_count = 0
-            last_height = new_height
+    checkpoint.clear(count)
 
-    driver.quit()
-    return results
@@ -5,8 +5,55 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
 import time
-import pandas as pd
 import unicodedata
+import json
+import math
+import re
+from urllib.parse import urljoin
+import requests
+from bs4 import BeautifulSoup
+from functions.metrics import span
+from functions.scrapping.driver_pool import get_driver_pool
+from functions.scrapping.checkpoints import open_checkpoint
+from functions.scrapping.dom_extraction import collect_reviews
+from functions.scrapping.http_session import new_session, thread_session, fetch_html
+from functions.scrapping.pagination import PAGE_CONCURRENCY, iter_page_reviews, page_url
+from functions.scrapping.politeness import detect_blocks, polite_request
+from functions.scrapping.resolution_cache import CompanyNotFoundError, resolve_cached
+from functions.scrapping.watermarks import cut_at_watermark, mark_exhausted
+from functions.storage.html_archive import archive_page
+
+TRUSTPILOT_BASE_URL = "https://www.trustpilot.com"
+
+# Moteurs disponibles : "http" (pages + JSON embarqué), "selenium" (navigateur),
+# "auto" (HTTP puis Selenium en cas d'échec)
+TRUSTPILOT_ENGINES = ("auto", "http", "selenium")
+
+NEXT_DATA_RE = re.compile(r'<script[^>]*id="__NEXT_DATA__"[^>]*>(.*?)</script>', re.DOTALL)
+
+CARD_XPATH = '//div[@class="styles_cardWrapper__g8amG styles_show__Z8n7u"]'
+
+# Lecture de toutes les cartes de la page en un seul appel WebDriver
+TRUSTPILOT_CARDS_JS = """
+return Array.from(
+    document.querySelectorAll('div[class="styles_cardWrapper__g8amG styles_show__Z8n7u"]'),
+    card => {
+        const content = card.querySelector('div.styles_reviewContent__tuXiN');
+        const p = content ? content.querySelector('p') : null;
+        const header = card.querySelector('div.styles_reviewHeader__DzoAZ');
+        const link = card.querySelector('a[href*="/reviews/"]');
+        const time = card.querySelector('time[datetime]');
+        const author = card.querySelector('[data-consumer-name-typography]');
+        return {
+            rating: header ? header.getAttribute('data-service-review-rating') : null,
+            review: p ? p.innerText : '',
+            review_id: link ? link.getAttribute('href').split('/reviews/')[1] : null,
+            date: time ? time.getAttribute('datetime') : null,
+            author: author ? author.innerText.trim() : null
+        };
+    }
+);
+"""
 
 def enlever_accents(texte):
     return ''.join(
@@ -70,8 +117,28 @@ def rechercher_elements(liste, recherche):
 #     result
 #     return result
 
-def search_company_from_trustpilot(company):
-    driver = webdriver.Chrome()
+def search_company_from_trustpilot(company, driver=None):
+    """
+    Ouvre la page d'avis Trustpilot de l'entreprise
+
+    L'URL trouvée est mémorisée dans le cache de résolution : les appels
+    suivants vont directement à la page d'avis sans passer par la recherche.
+
+    Raises:
+        CompanyNotFoundError: si la recherche ne donne aucun résultat
+    """
+    if driver is None:
+        driver = webdriver.Chrome()
+    resolve_cached(
+        "trustpilot", company,
+        search=lambda c: _search_company_url_selenium(c, driver),
+        open_url=driver.get,
+    )
+    return driver
+
+
+def _search_company_url_selenium(company, driver):
+    """Recherche sur le site et ouvre le premier résultat ; retourne son URL (None si aucun)"""
     wait = WebDriverWait(driver, 10)
 
     driver.get("https://www.trustpilot.com/")
@@ -82,78 +149,303 @@ def search_company_from_trustpilot(company):
     search.send_keys(Keys.RETURN)
 
     # ---- Premier résultat ----
-    first_card = wait.until(
-        EC.element_to_be_clickable((By.CSS_SELECTOR, "a[name='business-unit-card']"))
-    )
+    try:
+        first_card = wait.until(
+            EC.element_to_be_clickable((By.CSS_SELECTOR, "a[name='business-unit-card']"))
+        )
+    except TimeoutException:
+        return None
 
-    # Option 1 : cliquer directement
-    driver.execute_script("arguments[0].click();", first_card)
+    url = first_card.get_attribute("href")
+    driver.get(url)
+    return url
 
-    # Option 2 : récupérer l'URL 
-    # url = first_card.get_attribute("href")
-    # driver.get(url)
 
-    return driver
 
+def extract_reviews_and_ratings_from_trustpilot(company, max_reviews, engine="auto", since=None):
+    """
+    Extrait les avis Trustpilot d'une entreprise
 
+    Args:
+        company: Nom de l'entreprise à rechercher
+        max_reviews: Nombre maximum d'avis
+        engine: "http", "selenium" ou "auto" (HTTP, puis Selenium en cas d'échec)
+        since: Watermark (voir watermarks.py) : arrêt au premier avis déjà connu
 
-def extract_reviews_and_ratings_from_trustpilot(company, max_reviews):
-    driver = search_company_from_trustpilot(company)
+    Returns:
+        Liste de dicts {rating, review, review_id, date, author}
+    """
+    return list(iter_reviews_from_trustpilot(company, max_reviews, engine, since))
 
-    wait = WebDriverWait(driver, 6)
 
-    results = []
-    page = 1
+def iter_reviews_from_trustpilot(company, max_reviews, engine="auto", since=None):
+    """
+    Comme extract_reviews_and_ratings_from_trustpilot, mais rend chaque avis
+    dès qu'il est lu (générateur ; le fermer libère le navigateur)
+    """
+    if engine not in TRUSTPILOT_ENGINES:
+        raise ValueError(f"Moteur inconnu: {engine} (attendu: {', '.join(TRUSTPILOT_ENGINES)})")
 
-    while len(results) < max_reviews:
+    if engine != "selenium":
+        produced = 0
         try:
-            # Attendre les blocs d'avis
-            wait.until(EC.presence_of_all_elements_located((By.XPATH, '//div[@class="styles_cardWrapper__g8amG styles_show__Z8n7u"]')))
-
-            reviews = driver.find_elements(By.XPATH, '//div[@class="styles_cardWrapper__g8amG styles_show__Z8n7u"]')
-
-            for review in reviews:
+            for item in iter_reviews_from_trustpilot_http(company, max_reviews, since=since):
+                produced += 1
+                yield item
+            # terminé sans erreur, même sans avis (aucun nouvel avis, entreprise sans avis)
+            return
+        # LookupError couvre CompanyNotFoundError : la recherche sans JavaScript peut manquer
+        # un résultat que le navigateur affiche
+        except (requests.RequestException, ValueError, KeyError, LookupError) as e:
+            # avis déjà rendus : pas de bascule (ils seraient rendus deux fois)
+            if engine == "http" or produced:
+                raise
+            print(f"Extraction HTTP Trustpilot impossible ({e}) → utilisation de Selenium")
+
+    yield from iter_reviews_from_trustpilot_selenium(company, max_reviews, since)
+
+
+def extract_reviews_from_trustpilot_selenium(company, max_reviews, since=None):
+    return list(iter_reviews_from_trustpilot_selenium(company, max_reviews, since))
+
+
+def iter_reviews_from_trustpilot_selenium(company, max_reviews, since=None):
+    """
+    Avis Trustpilot lus dans le navigateur, page par page (bouton suivant)
+
+    Une longue extraction interrompue reprend à l'URL de la page suivant la
+    dernière page rendue (voir checkpoints.py).
+    """
+    checkpoint = open_checkpoint("trustpilot_selenium", company, max_reviews, since)
+    done = checkpoint.results[:max_reviews]
+    yield from done
+    if len(done) >= max_reviews:
+        checkpoint.clear(len(done))
+        return
+
+    with get_driver_pool().checkout() as driver:
+        if checkpoint.resumed:
+            with polite_request("trustpilot", company, driver), span("page_load", "trustpilot"):
+                driver.get(checkpoint.cursor["url"])
+        else:
+            search_company_from_trustpilot(company, driver)
+
+        wait = WebDriverWait(driver, 6)
+
+        count = len(done)
+        page = 1
+        finished = False
+
+        while count < max_reviews:
+            try:
+                # Attendre les blocs d'avis
+                with detect_blocks("trustpilot", driver), span("page_load", "trustpilot"):
+                    reviews = wait.until(EC.presence_of_all_elements_located((By.XPATH, CARD_XPATH)))
+
+                with span("extract", "trustpilot"):
+                    items = collect_reviews(driver, TRUSTPILOT_CARDS_JS)
+                archive_page("trustpilot", company, driver)
+                # avis triés du plus récent au plus ancien : arrêt au premier avis connu
+                items, reached = cut_at_watermark(items, since)
+                items = items[:max_reviews - count]
+                for item in items:
+                    yield item
+                    count += 1
+                if reached or count >= max_reviews:
+                    finished = True
+                    break
+
+                # Bouton suivant (absent sur la dernière page)
                 try:
-                    # Texte de l'avis
-                    text_1 = review.find_element(By.XPATH, './/div[@class="styles_reviewContent__tuXiN"]')
-                    text_2 = text_1.find_elements(By.TAG_NAME, "p")
-                    if text_2:  # si la liste n'est pas vide
-                         text = text_2[0].text.strip()
-
-                    # Rating
-                    rating_text = review.find_element(By.XPATH, './/div[@class="styles_reviewHeader__DzoAZ"]')
-                    rating = float(rating_text.get_attribute("data-service-review-rating"))
-
-                    if text:
-                        results.append({
-                            "rating": rating,
-                            "review": text
-                        })
-
-                    if len(results) >= max_reviews:
-                        break
-
-                except Exception:
-                    # Avis incomplet → on ignore
-                    continue
-
-            # Bouton suivant
-            next_btn = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "a[name='pagination-button-next']")))
-            # on garde une référence à un élément de l’ancienne page
-            old_first_card = reviews[0]
-            # clic (JS car Trustpilot bloque parfois les clics standards)
-            driver.execute_script("arguments[0].click();", next_btn)
-            # maintenant on attend que l’ancienne page disparaisse
-            wait.until(EC.staleness_of(old_first_card))
-            page += 1
-
-        except TimeoutException:
-            break
-
-    driver.quit()
+                    with span("page_load", "trustpilot"):
+                        next_btn = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "a[name='pagination-button-next']")))
+                except TimeoutException:
+                    mark_exhausted(since)
+                    finished = True
+                    break
+                with polite_request("trustpilot", company, driver), span("page_load", "trustpilot"):
+                    # on garde une référence à un élément de l’ancienne page
+                    old_first_card = reviews[0]
+                    # clic (JS car Trustpilot bloque parfois les clics standards)
+                    driver.execute_script("arguments[0].click();", next_btn)
+                    # maintenant on attend que l’ancienne page disparaisse
+                    wait.until(EC.staleness_of(old_first_card))
+                page += 1
+                if checkpoint.persistent:
+                    checkpoint.advance(items, url=driver.current_url)
+
+            except TimeoutException:
+                # page sans avis (chargement en échec, blocage) : le point de reprise est conservé
+                break
+
+    if finished:
+        checkpoint.clear(count)
+
+
+# ---------- Moteur HTTP (sans navigateur) ----------
+
+def parse_trustpilot_page_props(html):
+    """
+    Retourne les pageProps du JSON __NEXT_DATA__ embarqué dans une page Trustpilot
+
+    Raises:
+        ValueError: si la page ne contient pas de JSON exploitable
+    """
+    match = NEXT_DATA_RE.search(html)
+    if not match:
+        raise ValueError("JSON __NEXT_DATA__ absent de la page")
+    return json.loads(match.group(1))["props"]["pageProps"]
+
+
+def parse_trustpilot_reviews(page_props):
+    """Convertit les avis du JSON Trustpilot au format des extracteurs"""
+    results = []
+    for review in page_props.get("reviews") or []:
+        text = (review.get("text") or "").strip()
+        rating = review.get("rating")
+        # Avis incomplet → on ignore
+        if not text or rating is None:
+            continue
+        results.append({
+            "rating": float(rating),
+            "review": text,
+            "review_id": review.get("id"),
+            "date": (review.get("dates") or {}).get("publishedDate"),
+            "author": (review.get("consumer") or {}).get("displayName"),
+        })
     return results
 
 
+def trustpilot_total_pages(page_props):
+    """Nombre total de pages d'avis (None si inconnu)"""
+    return ((page_props.get("filters") or {}).get("pagination") or {}).get("totalPages")
+
+
+def search_company_url_from_trustpilot(company, session, base_url=TRUSTPILOT_BASE_URL):
+    """
+    URL de la page d'avis du premier résultat de recherche
+
+    Sur le site réel, le résultat passe par le cache de résolution, partagé
+    avec le moteur Selenium : une URL trouvée sert aux deux moteurs, mais une
+    recherche HTTP sans résultat n'est pas mémorisée (la page de recherche
+    servie sans JavaScript peut ne pas contenir les résultats que le
+    navigateur afficherait).
+
+    Raises:
+        CompanyNotFoundError: si la recherche ne donne aucun résultat
+    """
+    def search(c):
+        html = fetch_html(session, f"{base_url}/search", params={"query": c})
+        soup = BeautifulSoup(html, "html.parser")
+        card = soup.select_one("a[name='business-unit-card']") or soup.select_one("a[href^='/review/']")
+        if card is None or not card.get("href"):
+            return None
+        return urljoin(base_url, card["href"]).split("?")[0]
+
+    if base_url != TRUSTPILOT_BASE_URL:
+        # autre serveur (fixtures) : pas de cache
+        with polite_request("trustpilot", company), span("search", "trustpilot"):
+            url = search(company)
+        if url is None:
+            raise CompanyNotFoundError("trustpilot", company)
+        return url
+    return resolve_cached("trustpilot", company, search, cache_not_found=False)
+
+
+def extract_reviews_from_trustpilot_http(company, max_reviews, base_url=TRUSTPILOT_BASE_URL,
+                                         concurrency=PAGE_CONCURRENCY, since=None):
+    return list(iter_reviews_from_trustpilot_http(company, max_reviews, base_url, concurrency, since))
+
+
+def iter_reviews_from_trustpilot_http(company, max_reviews, base_url=TRUSTPILOT_BASE_URL,
+                                      concurrency=PAGE_CONCURRENCY, since=None):
+    """
+    Extrait les avis Trustpilot avec requests uniquement
+
+    Les pages /review/<domaine>?page=N sont rendues côté serveur et contiennent
+    les avis au format JSON : aucune exécution de JavaScript n'est nécessaire.
+    La première page donne le nombre total de pages ; les suivantes sont
+    téléchargées `concurrency` à la fois.
+
+    Avec un watermark `since`, l'extraction s'arrête au premier avis déjà
+    connu (les pages sont triées du plus récent au plus ancien) : une mise à
+    jour sans nouveaux avis ne lit que la première page.
+
+    Une longue extraction interrompue reprend à la page suivant la dernière
+    page rendue (voir checkpoints.py).
+
+    Raises:
+        CompanyNotFoundError: si l'entreprise est introuvable
+        requests.RequestException, ValueError: si une page ne peut être lue
+    """
+    checkpoint = open_checkpoint("trustpilot_http", company, max_reviews, since)
+    done = checkpoint.results[:max_reviews]
+    yield from done
+    if len(done) >= max_reviews:
+        checkpoint.clear(len(done))
+        return
+
+    # tri explicite par date pour que l'arrêt au watermark soit fiable
+    sort_params = {"sort": "recency"} if since else {}
+
+    if not checkpoint.resumed:
+        session = new_session()
+        url = search_company_url_from_trustpilot(company, session, base_url)
+        with polite_request("trustpilot", company), span("page_load", "trustpilot"):
+            html = fetch_html(session, url, params=sort_params or None)
+        archive_page("trustpilot", company, html=html, url=url)
+        with span("extract", "trustpilot"):
+            page_props = parse_trustpilot_page_props(html)
+            first_items = parse_trustpilot_reviews(page_props)
+        new_items, reached = cut_at_watermark(first_items, since)
+        new_items = new_items[:max_reviews]
+        yield from new_items
+        if not first_items or reached or len(new_items) >= max_reviews:
+            if not first_items:
+                mark_exhausted(since)
+            checkpoint.clear(len(new_items))
+            return
+        checkpoint.advance(
+            new_items, url=url, page=2, per_page=len(first_items), total_pages=trustpilot_total_pages(page_props),
+        )
+
+    count = len(done) if checkpoint.resumed else len(new_items)
+    url, first_page = checkpoint.cursor["url"], checkpoint.cursor["page"]
+    remaining = max_reviews - count
+
+    # Pages nécessaires pour atteindre max_reviews (bornées par le total annoncé)
+    last_page = first_page - 1 + math.ceil(remaining / checkpoint.cursor["per_page"])
+    total_pages = checkpoint.cursor["total_pages"]
+    if total_pages is not None:
+        last_page = min(last_page, total_pages)
+
+    def fetch_page(page):
+        try:
+            with polite_request("trustpilot", company), span("page_load", "trustpilot"):
+                html = fetch_html(thread_session(), url, params={"page": page, **sort_params})
+        except requests.HTTPError as e:
+            # au-delà de la dernière page Trustpilot répond 404 ; un blocage (403, 429, 503)
+            # interrompt l'extraction (le point de reprise garde les pages déjà lues)
+            if e.response is not None and e.response.status_code == 404:
+                return []
+            raise
+        archive_page("trustpilot", company, html=html, url=page_url(url, "page", page))
+        with span("extract", "trustpilot"):
+            return parse_trustpilot_reviews(parse_trustpilot_page_props(html))
+
+    produced = 0
+    for item in iter_page_reviews(
+        fetch_page, remaining, since, checkpoint,
+        first_page=first_page, last_page=last_page, concurrency=concurrency,
+    ):
+        produced += 1
+        yield item
+    # moins d'avis que demandé sans erreur : watermark atteint, page 404 ou dernière page annoncée
+    if produced < remaining:
+        mark_exhausted(since)
+    checkpoint.clear(count + produced)
+
+
 # def extract_review_from_trustpilot(url, max_reviews=20):
 #     driver = webdriver.Chrome()
 #     driver.get(url)
@@ -5,12 +5,58 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
 import time
-import pandas as pd
 import unicodedata
 import requests
+from functions.metrics import span
+from functions.scrapping.driver_pool import get_driver_pool
+from functions.scrapping.checkpoints import open_checkpoint
+from functions.scrapping.dom_extraction import collect_reviews, collect_texts
+from functions.scrapping.resolution_cache import resolve_cached
+from functions.scrapping.politeness import detect_blocks, polite_request
+from functions.storage.html_archive import archive_page
+
+CARD_XPATH = '//li[@class=" y-css-19cyavo-styles"]' #y-css-1sqelp2
+
+# Lecture de toutes les cartes de la page en un seul appel WebDriver.
+# Les cartes Yelp n'exposent ni identifiant ni date exploitables : les avis sont
+# dédupliqués sur l'empreinte note + texte (review_key) et l'extraction
+# incrémentale (only_new) n'est pas proposée pour Yelp.
+YELP_CARDS_JS = """
+return Array.from(
+    document.querySelectorAll('li[class=" y-css-19cyavo-styles"]'),
+    card => {
+        const text = card.querySelector('span.raw__09f24__PkHSg');  // raw__09f24__T4Ezm
+        const rating = card.querySelector("div[class*='arrange-unit'] div[role='img']")
+            || card.querySelector("div[role='img'][aria-label]");
+        const author = card.querySelector('a[href*="/user_details"]');
+        return {
+            rating: rating ? rating.getAttribute('aria-label') : null,
+            review: text ? text.innerText : '',
+            author: author ? author.innerText.trim() : null
+        };
+    }
+);
+"""
+
+def search_company_from_yelp(company, driver=None):
+    """
+    Ouvre la page Yelp de l'entreprise (URL mémorisée dans le cache de résolution)
+
+    Raises:
+        CompanyNotFoundError: si la recherche ne donne aucun résultat
+    """
+    if driver is None:
+        driver = webdriver.Chrome()
+    resolve_cached(
+        "yelp", company,
+        search=lambda c: _search_company_url_selenium(c, driver),
+        open_url=driver.get,
+    )
+    return driver
 
-def search_company_from_yelp(company):
-    driver = webdriver.Chrome()
+
+def _search_company_url_selenium(company, driver):
+    """Recherche sur le site et ouvre le premier résultat ; retourne son URL (None si aucun)"""
     wait = WebDriverWait(driver, 10)
 
     driver.get("https://www.yelp.fr/")
@@ -21,115 +67,121 @@ def search_company_from_yelp(company):
     search.send_keys(Keys.RETURN)
 
     # ---- Premier résultat ----
-    first_card = wait.until(
-        # EC.element_to_be_clickable((By.CSS_SELECTOR, "a[class='y-css-9o0pq']")) #y-css-1887ssu
-        EC.element_to_be_clickable((By.XPATH, f"//a[contains(@name,'{company}')]"))
-    )
-
-    # Option 1 : cliquer directement
-    driver.execute_script("arguments[0].click();", first_card)
-
-    wait.until(lambda d: len(d.window_handles) > 1)
-    driver.switch_to.window(driver.window_handles[-1])
-
-    # Option 2 : récupérer l'URL 
-    # url = first_card.get_attribute("href")
-    # driver.get(url)
-
-    return driver
+    try:
+        first_card = wait.until(
+            # EC.element_to_be_clickable((By.CSS_SELECTOR, "a[class='y-css-9o0pq']")) #y-css-1887ssu
+            EC.element_to_be_clickable((By.XPATH, f"//a[contains(@name,'{company}')]"))
+        )
+    except TimeoutException:
+        return None
+
+    # URL du résultat ouverte dans l'onglet courant (le clic ouvre une nouvelle fenêtre)
+    url = first_card.get_attribute("href")
+    driver.get(url)
+    return url
 
 def extract_review_from_yelp(url, max_reviews):
-    driver = webdriver.Chrome()
-    driver.get(url)
+    with get_driver_pool().checkout() as driver:
+        driver.get(url)
 
-    wait = WebDriverWait(driver, 10)
+        wait = WebDriverWait(driver, 10)
     
-    liste_review = []
-    page = 1
-    while len(liste_review) < max_reviews:
-        try:
-
-                cards = wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, "#reviews span.raw__09f24__T4Ezm")))
-                for card in cards:
-                        liste_review.append(card.text.strip())
-
-                        # ---- arrêt si limite atteinte ----
-                        if len(liste_review) >= max_reviews:
-                            break
-
-                next_btn = wait.until(EC.element_to_be_clickable((By.XPATH, "//a[contains(@class,'navigation-button') and contains(@class,'next-link')]")))
-                driver.execute_script("arguments[0].click();", next_btn)
-                # maintenant on attend que l’ancienne page disparaisse
-                wait.until(EC.staleness_of(cards[0]))
-                page += 1
-
-        except TimeoutException:
-            # print("\nPlus de page suivante")
-            break
-    driver.quit()
-    return liste_review
+        liste_review = []
+        page = 1
+        while len(liste_review) < max_reviews:
+            try:
 
+                    cards = wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, "#reviews span.raw__09f24__T4Ezm")))
+                    texts = collect_texts(driver, "#reviews span.raw__09f24__T4Ezm")
+                    liste_review.extend(texts[:max_reviews - len(liste_review)])
 
+                    # ---- arrêt si limite atteinte ----
+                    if len(liste_review) >= max_reviews:
+                        break
 
-def extract_reviews_and_ratings_from_yelp(company, max_reviews):
-    driver = search_company_from_yelp(company)
-    # driver.get(url)
+                    next_btn = wait.until(EC.element_to_be_clickable((By.XPATH, "//a[contains(@class,'navigation-button') and contains(@class,'next-link')]")))
+                    driver.execute_script("arguments[0].click();", next_btn)
+                    # maintenant on attend que l’ancienne page disparaisse
+                    wait.until(EC.staleness_of(cards[0]))
+                    page += 1
 
-    wait = WebDriverWait(driver, 10)
+            except TimeoutException:
+                # print("\nPlus de page suivante")
+                break
 
-    results = []
-    page = 1
+    return liste_review
 
-    while len(results) < max_reviews:
-        try:
-            # Attendre les blocs d'avis
-            wait.until(
-                EC.presence_of_all_elements_located(
-                    (By.XPATH, '//li[@class=" y-css-19cyavo-styles"]') #y-css-1sqelp2
-                )
-            )
 
-            reviews = driver.find_elements(By.XPATH, '//li[@class=" y-css-19cyavo-styles"]')
 
-            for review in reviews:
+def extract_reviews_and_ratings_from_yelp(company, max_reviews):
+    """Extrait les avis Yelp d'une entreprise"""
+    return list(iter_reviews_from_yelp(company, max_reviews))
+
+
+def iter_reviews_from_yelp(company, max_reviews):
+    """
+    Avis Yelp rendus un par un dès leur lecture (générateur ; le fermer libère le navigateur)
+
+    Une longue extraction interrompue reprend à l'URL de la page suivant la
+    dernière page rendue (voir checkpoints.py). Pas de watermark : sans
+    identifiant ni date fiables, le dernier avis connu ne peut pas être repéré.
+    """
+    checkpoint = open_checkpoint("yelp", company, max_reviews)
+    done = checkpoint.results[:max_reviews]
+    yield from done
+    if len(done) >= max_reviews:
+        checkpoint.clear(len(done))
+        return
+
+    with get_driver_pool().checkout() as driver:
+        if checkpoint.resumed:
+            with polite_request("yelp", company, driver), span("page_load", "yelp"):
+                driver.get(checkpoint.cursor["url"])
+        else:
+            search_company_from_yelp(company, driver)
+
+        wait = WebDriverWait(driver, 10)
+
+        count = len(done)
+        page = 1
+        finished = False
+
+        while count < max_reviews:
+            try:
+                # Attendre les blocs d'avis
+                with detect_blocks("yelp", driver), span("page_load", "yelp"):
+                    reviews = wait.until(EC.presence_of_all_elements_located((By.XPATH, CARD_XPATH)))
+
+                with span("extract", "yelp"):
+                    items = collect_reviews(driver, YELP_CARDS_JS)
+                archive_page("yelp", company, driver)
+                items = items[:max_reviews - count]
+                for item in items:
+                    yield item
+                    count += 1
+                if count >= max_reviews:
+                    finished = True
+                    break
+
+                # Bouton suivant (absent sur la dernière page)
                 try:
-                    # Texte de l'avis
-                    text = review.find_element(
-                        By.CSS_SELECTOR, "span.raw__09f24__PkHSg" # raw__09f24__T4Ezm
-                    ).text.strip()
-
-                    # Rating
-                    rating_el = review.find_element(
-                        By.XPATH,
-                        ".//ancestor::div[contains(@class,'arrange-unit')]//div[@role='img']"
-                    )
-                    rating = float(
-                        rating_el.get_attribute("aria-label").split()[0]
-                    )
-
-                    if text:
-                        results.append({
-                            "rating": rating,
-                            "review": text
-                        })
-
-                    if len(results) >= max_reviews:
-                        break
-
-                except Exception:
-                    # Avis incomplet → on ignore
-                    continue
-
-            # Bouton suivant
-            next_btn = wait.until(EC.element_to_be_clickable((By.XPATH, "//a[contains(@class,'navigation-button') and contains(@class,'next-link')]")))
-            driver.execute_script("arguments[0].click();", next_btn)
-
-            # maintenant on attend que l’ancienne page disparaisse
-            wait.until(EC.staleness_of(reviews[0]))
-            page += 1
+                    with span("page_load", "yelp"):
+                        next_btn = wait.until(EC.element_to_be_clickable((By.XPATH, "//a[contains(@class,'navigation-button') and contains(@class,'next-link')]")))
+                except TimeoutException:
+                    finished = True
+                    break
+                with polite_request("yelp", company, driver), span("page_load", "yelp"):
+                    driver.execute_script("arguments[0].click();", next_btn)
+
+                    # maintenant on attend que l’ancienne page disparaisse
+                    wait.until(EC.staleness_of(reviews[0]))
+                page += 1
+                if checkpoint.persistent:
+                    checkpoint.advance(items, url=driver.current_url)
 
-        except TimeoutException:
-            break
+            except TimeoutException:
+                # page sans avis (chargement en échec, blocage) : le point de reprise est conservé
+                break
 
-    driver.quit()
-    return results
+    if finished:
+        checkpoint.clear(count)
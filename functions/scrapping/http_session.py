@@ -0,0 +1,100 @@
+"""Sessions HTTP (requests) pour les extracteurs sans navigateur"""
+import threading
+import time
+
+import requests
+
+from functions.scrapping.proxy_pool import active_proxy_pool
+
+
+# En-têtes d'un navigateur de bureau : certaines plateformes refusent le user-agent par défaut
+HTTP_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "fr-FR,fr;q=0.9,en-US;q=0.8,en;q=0.7",
+}
+
+HTTP_TIMEOUT = 15  # secondes
+
+# Nouvelles tentatives (avec un autre proxy) quand le proxy échoue ou est bloqué
+PROXY_RETRIES = 2
+PROXY_ERRORS = (requests.exceptions.ProxyError, requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+BLOCKED_STATUS = (403, 407, 429)
+
+
+def _assign_proxy(session, proxy_pool):
+    """Associe à la session un proxy du pool (aucun si tous sont indisponibles)"""
+    proxy = proxy_pool.acquire()
+    session.proxy = proxy
+    session.proxy_pool = proxy_pool
+    session.proxies = {"http": proxy.url, "https": proxy.url} if proxy else {}
+
+
+def new_session(proxy_pool=None) -> requests.Session:
+    """
+    Crée une session HTTP avec les en-têtes par défaut
+
+    Si les proxies sont activés (voir proxy_pool.py), la session sort par un
+    proxy du pool ; chaque nouvelle session en reçoit un autre (rotation).
+    """
+    session = requests.Session()
+    session.headers.update(HTTP_HEADERS)
+    session.proxy = None
+    proxy_pool = proxy_pool or active_proxy_pool()
+    if proxy_pool is not None:
+        _assign_proxy(session, proxy_pool)
+    return session
+
+
+_local = threading.local()
+
+
+def thread_session() -> requests.Session:
+    """Session HTTP propre au thread courant (réutilise ses connexions keep-alive)"""
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = _local.session = new_session()
+    return session
+
+
+def fetch_html(session, url, params=None):
+    """
+    Télécharge une page HTML
+
+    Avec un proxy, la latence et le résultat de la requête alimentent son
+    score ; s'il échoue ou est bloqué (403, 429), la session change de proxy
+    et la requête est retentée.
+
+    Raises:
+        requests.HTTPError: si la réponse n'est pas un succès (403, 404, ...)
+    """
+    for attempt in range(PROXY_RETRIES + 1):
+        proxy = getattr(session, "proxy", None)
+        if proxy is None:
+            response = session.get(url, params=params, timeout=HTTP_TIMEOUT)
+            break
+
+        start = time.monotonic()
+        try:
+            response = session.get(url, params=params, timeout=HTTP_TIMEOUT)
+        except PROXY_ERRORS:
+            session.proxy_pool.report_failure(proxy)
+            _assign_proxy(session, session.proxy_pool)
+            if attempt == PROXY_RETRIES:
+                raise
+            continue
+
+        if response.status_code in BLOCKED_STATUS:
+            session.proxy_pool.report_failure(proxy)
+            _assign_proxy(session, session.proxy_pool)
+            if attempt < PROXY_RETRIES:
+                continue
+            break
+        session.proxy_pool.report_success(proxy, time.monotonic() - start)
+        break
+
+    response.raise_for_status()
+    return response.text
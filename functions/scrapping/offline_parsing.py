@@ -0,0 +1,281 @@
+"""
+Relecture hors ligne des pages archivées (voir html_archive.py), sans navigateur
+
+Chaque parseur reprend les sélecteurs du script JS de l'extracteur
+correspondant (TRUSTPILOT_CARDS_JS, YELP_CARDS_JS, ...) en XPath avec lxml.
+Quand un sélecteur casse, il suffit de le corriger ici et dans l'extracteur
+puis de relire l'archive au lieu de tout re-scraper :
+
+    python -m functions.scrapping.offline_parsing --source yelp [--company X] [--workers 8] [--ingest]
+
+lxml est fourni par l'extra "archive" (poetry install --extras archive).
+"""
+import argparse
+import functools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from functions.scrapping.dom_extraction import normalize_reviews, review_key
+from functions.scrapping.functions_trustpilot import (
+    CARD_XPATH as TRUSTPILOT_CARD_XPATH, parse_trustpilot_page_props, parse_trustpilot_reviews,
+)
+from functions.scrapping.functions_yelp import CARD_XPATH as YELP_CARD_XPATH
+from functions.storage.html_archive import get_html_archive, read_blob
+from functions.storage.review_store import get_review_store
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:  # extra "archive", nécessaire uniquement à la relecture
+    lxml = None
+
+# Captures envoyées ensemble à un processus (limite le coût des échanges)
+REPARSE_CHUNKSIZE = 16
+
+
+def _document(html):
+    """Arbre lxml de la page (BeautifulSoup est ~20x plus lent à construire l'arbre)"""
+    if lxml is None:
+        raise RuntimeError("Relecture hors ligne indisponible (module lxml non installé : poetry install --extras archive)")
+    document = lxml.html.fromstring(html)
+    # innerText rend les <br> comme des retours à la ligne
+    for br in document.iter("br"):
+        br.tail = "\n" + (br.tail or "")
+    return document
+
+
+def _has_class(name):
+    """Condition XPath équivalente au sélecteur CSS .name"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+@functools.lru_cache(maxsize=None)
+def _compiled(xpath):
+    """Expression XPath compilée une fois par processus (la compilation coûte plus que l'évaluation)"""
+    return etree.XPath(xpath)
+
+
+def _first(element, xpath):
+    found = _compiled(xpath)(element)
+    return found[0] if found else None
+
+
+def _select(element, xpath):
+    return _compiled(xpath)(element)
+
+
+def _text(element, xpath):
+    found = _first(element, xpath)
+    return found.text_content() if found is not None else ""
+
+
+def _stripped(element, xpath):
+    found = _first(element, xpath)
+    return found.text_content().strip() if found is not None else None
+
+
+def parse_trustpilot_html(html):
+    """Avis d'une page Trustpilot : JSON __NEXT_DATA__ (moteur HTTP) ou cartes du DOM (Selenium)"""
+    try:
+        return parse_trustpilot_reviews(parse_trustpilot_page_props(html))
+    except (ValueError, KeyError):
+        pass
+
+    items = []
+    for card in _select(_document(html), TRUSTPILOT_CARD_XPATH):
+        link = _first(card, './/a[contains(@href, "/reviews/")]/@href')
+        items.append({
+            "rating": _first(card, f".//div[{_has_class('styles_reviewHeader__DzoAZ')}]/@data-service-review-rating"),
+            "review": _text(card, f"(.//div[{_has_class('styles_reviewContent__tuXiN')}])[1]//p"),
+            "review_id": link.split("/reviews/")[1] if link else None,
+            "date": _first(card, ".//time/@datetime"),
+            "author": _stripped(card, ".//*[@data-consumer-name-typography]"),
+        })
+    return normalize_reviews(items)
+
+
+def parse_yelp_html(html):
+    items = []
+    for card in _select(_document(html), YELP_CARD_XPATH):
+        rating = (
+            _first(card, ".//div[contains(@class, 'arrange-unit')]//div[@role='img']/@aria-label")
+            or _first(card, ".//div[@role='img']/@aria-label")
+        )
+        items.append({
+            "rating": rating,
+            "review": _text(card, f".//span[{_has_class('raw__09f24__PkHSg')}]"),
+            "author": _stripped(card, './/a[contains(@href, "/user_details")]'),
+        })
+    return normalize_reviews(items)
+
+
+def parse_amazon_html(html):
+    items = []
+    for card in _select(_document(html), '//li[@data-hook="review"]'):
+        items.append({
+            "rating": _stripped(card, f'.//i[@data-hook="review-star-rating"]//span[{_has_class("a-icon-alt")}]'),
+            "review": _text(card, './/span[@data-hook="review-body"]//span'),
+            "review_id": card.get("id"),
+            "date": _stripped(card, './/span[@data-hook="review-date"]'),
+            "author": _stripped(card, f".//span[{_has_class('a-profile-name')}]"),
+        })
+    return normalize_reviews(items)
+
+
+def parse_play_store_html(html):
+    items = []
+    for card in _select(_document(html), f"//div[{_has_class('RHo1pe')}]"):
+        items.append({
+            "rating": _first(card, ".//div[@role='img']/@aria-label"),
+            "review": _text(card, f".//*[{_has_class('h3YV2d')}]"),
+            "review_id": _first(card, ".//@data-review-id"),
+            "date": _stripped(card, f".//span[{_has_class('bp9Aid')}]"),
+            "author": _stripped(card, f".//div[{_has_class('X5PpBb')}]"),
+        })
+    return normalize_reviews(items, rating_cast=int)
+
+
+def parse_google_html(html):
+    items = []
+    seen = set()
+    for card in _select(_document(html), "//div[@data-review-id]"):
+        # les cartes Google contiennent un div imbriqué avec le même id
+        review_id = card.get("data-review-id")
+        if review_id in seen:
+            continue
+        seen.add(review_id)
+        text = ""
+        el = _first(card, f".//span[{_has_class('wiI7pd')}]")
+        if el is not None:
+            # texte complet : le plus long entre le texte et aria-label
+            for candidate in (el.text_content(), el.get("aria-label")):
+                value = (candidate or "").strip()
+                if len(value) > len(text):
+                    text = value
+        items.append({
+            "rating": _first(card, ".//*[@role='img']/@aria-label"),
+            "review": text,
+            "review_id": review_id,
+            "date": _stripped(card, f".//span[{_has_class('rsqaWe')}]"),
+            "author": _stripped(card, f".//div[{_has_class('d4r55')}]"),
+        })
+    return normalize_reviews(items, rating_cast=int, require_rating=False)
+
+
+# Parseur par source (mêmes noms que les sources de l'API)
+PARSERS = {
+    "trustpilot": parse_trustpilot_html,
+    "yelp": parse_yelp_html,
+    "amazon": parse_amazon_html,
+    "playstore": parse_play_store_html,
+    "google": parse_google_html,
+}
+
+
+def parse_html(source, html):
+    """
+    Avis d'une page archivée
+
+    Raises:
+        ValueError: si la source n'a pas de parseur
+    """
+    parser = PARSERS.get(source)
+    if parser is None:
+        raise ValueError(f"Source inconnue: {source} (attendu: {', '.join(PARSERS)})")
+    return parser(html)
+
+
+def _parse_blob(task):
+    """Exécuté dans un processus du pool : (source, fichier, compression) -> (avis, erreur)"""
+    source, path, compression = task
+    try:
+        return parse_html(source, read_blob(path, compression)), None
+    except Exception as e:
+        return [], f"{type(e).__name__}: {e}"
+
+
+def reparse_archive(source=None, company=None, workers=None, archive=None, chunksize=REPARSE_CHUNKSIZE):
+    """
+    Reconstruit les avis à partir des pages archivées, sans navigateur
+
+    Les pages sont décompressées et analysées dans `workers` processus ; une
+    page capturée plusieurs fois (même empreinte) n'est analysée qu'une fois.
+    Les avis sont dédoublonnés par entreprise, dans l'ordre des captures.
+
+    Args:
+        source: Limite la relecture à une plateforme
+        company: Limite la relecture à une entreprise
+        workers: Nombre de processus (défaut : nombre de CPU ; 1 = dans le processus courant)
+        archive: Archive à relire (défaut : archive partagée)
+        chunksize: Captures envoyées ensemble à un processus
+
+    Returns:
+        Liste de dicts {source, company, pages, errors, reviews}
+    """
+    archive = archive or get_html_archive()
+    snapshots = archive.snapshots(source, company)
+
+    # une seule analyse par couple (source, contenu)
+    tasks = list(dict.fromkeys((s["source"], s["path"], s["compression"]) for s in snapshots))
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(tasks) <= chunksize:
+        parsed = map(_parse_blob, tasks)
+        results = dict(zip(tasks, parsed))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = dict(zip(tasks, executor.map(_parse_blob, tasks, chunksize=chunksize)))
+
+    groups = {}
+    for snapshot in snapshots:
+        key = (snapshot["source"], snapshot["company"])
+        group = groups.setdefault(key, {
+            "source": key[0], "company": key[1], "pages": 0, "errors": [], "reviews": [], "_seen": set(),
+        })
+        items, error = results[(snapshot["source"], snapshot["path"], snapshot["compression"])]
+        group["pages"] += 1
+        if error:
+            group["errors"].append({"url": snapshot["url"], "error": error})
+        for item in items:
+            item_key = review_key(item)
+            if item_key not in group["_seen"]:
+                group["_seen"].add(item_key)
+                group["reviews"].append(item)
+
+    for group in groups.values():
+        del group["_seen"]
+    return list(groups.values())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Relit l'archive HTML et reconstruit les avis")
+    parser.add_argument("--source", choices=sorted(PARSERS))
+    parser.add_argument("--company")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--ingest", action="store_true", help="enregistre les avis dans le stockage local")
+    parser.add_argument("--output", help="fichier JSON des avis reconstruits")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    groups = reparse_archive(args.source, args.company, args.workers)
+    elapsed = time.perf_counter() - start
+
+    for group in groups:
+        line = f"{group['source']:<11} {group['company']:<30} {group['pages']:>6} pages {len(group['reviews']):>7} avis"
+        if args.ingest:
+            inserted, duplicates = get_review_store().ingest(group["source"], group["company"], group["reviews"])
+            line += f" ({inserted} nouveaux, {duplicates} déjà connus)"
+        if group["errors"]:
+            line += f" — {len(group['errors'])} pages illisibles"
+        print(line)
+    pages = sum(group["pages"] for group in groups)
+    print(f"{pages} pages relues en {elapsed:.2f} s")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(groups, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
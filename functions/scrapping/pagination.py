@@ -0,0 +1,149 @@
+"""Récupération concurrente des pages d'avis adressables par URL"""
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from selenium.common.exceptions import WebDriverException
+
+from functions.scrapping.watermarks import cut_at_watermark
+
+
+# Nombre de pages téléchargées simultanément par défaut
+PAGE_CONCURRENCY = 4
+
+
+def page_url(url, param, page):
+    """Retourne `url` avec le paramètre de pagination `param` fixé à `page`"""
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k != param]
+    query.append((param, str(page)))
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def iter_pages_concurrently(fetch_page, first_page=1, last_page=None, concurrency=PAGE_CONCURRENCY):
+    """
+    Télécharge les pages first_page..last_page avec `concurrency` requêtes en vol
+
+    Les pages sont rendues dans l'ordre, même si elles arrivent dans le
+    désordre. L'itération s'arrête à la première page vide (fin des avis) ;
+    si l'appelant arrête d'itérer (max_reviews atteint), les pages encore en
+    file sont annulées.
+
+    Args:
+        fetch_page: Fonction page -> liste d'avis (liste vide = plus d'avis)
+        first_page: Première page à télécharger
+        last_page: Dernière page (None : jusqu'à la première page vide)
+        concurrency: Nombre de pages téléchargées en parallèle
+
+    Yields:
+        (numéro de page, liste d'avis)
+    """
+    executor = ThreadPoolExecutor(max_workers=max(1, concurrency))
+    pending = {}
+    next_page = first_page
+    current = first_page
+    try:
+        while True:
+            # garder `concurrency` pages en vol
+            while len(pending) < concurrency and (last_page is None or next_page <= last_page):
+                # contexte copié : les durées mesurées dans le thread sont rattachées à la requête
+                pending[next_page] = executor.submit(contextvars.copy_context().run, fetch_page, next_page)
+                next_page += 1
+
+            if current not in pending:
+                return
+            items = pending.pop(current).result()
+            if not items:
+                return
+            yield current, items
+            current += 1
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_page_reviews(fetch_page, max_reviews, since=None, checkpoint=None, **kwargs):
+    """
+    Avis des pages (dans l'ordre), un par un, jusqu'à max_reviews
+
+    Args:
+        fetch_page: Fonction page -> liste d'avis
+        max_reviews: Nombre maximum d'avis
+        since: Watermark : arrêt au premier avis déjà connu
+        checkpoint: Point de reprise (voir checkpoints.py) avancé à chaque page rendue
+        **kwargs: first_page, last_page, concurrency (voir iter_pages_concurrently)
+    """
+    if max_reviews <= 0:
+        return
+    count = 0
+    for page, items in iter_pages_concurrently(fetch_page, **kwargs):
+        items, reached = cut_at_watermark(items, since)
+        items = items[:max_reviews - count]
+        for item in items:
+            yield item
+            count += 1
+        # page tronquée à max_reviews : pas d'avance, une extraction plus longue la relira
+        if reached or count >= max_reviews:
+            return
+        if checkpoint is not None:
+            checkpoint.advance(items, page=page + 1)
+
+
+def collect_pages_concurrently(fetch_page, max_reviews, results=None, since=None, **kwargs):
+    """
+    Concatène les avis des pages (dans l'ordre) jusqu'à max_reviews
+
+    Args:
+        fetch_page: Fonction page -> liste d'avis
+        max_reviews: Nombre maximum d'avis
+        results: Avis déjà collectés (complétés en place)
+        since: Watermark : arrêt au premier avis déjà connu
+        **kwargs: first_page, last_page, concurrency (voir iter_pages_concurrently)
+    """
+    results = [] if results is None else results
+    results.extend(iter_page_reviews(fetch_page, max_reviews - len(results), since, **kwargs))
+    return results
+
+
+def fetch_pages_in_tabs(driver, urls, extract_page):
+    """
+    Charge plusieurs pages en parallèle dans des onglets du même navigateur
+
+    Tous les onglets sont ouverts en un seul appel (le navigateur les charge
+    en même temps), puis chaque onglet est extrait dans l'ordre et refermé.
+    La session (cookies) du navigateur est partagée par tous les onglets.
+
+    Args:
+        driver: webdriver Selenium (l'onglet courant est conservé)
+        urls: Pages à charger
+        extract_page: Fonction driver -> liste d'avis de l'onglet courant
+
+    Returns:
+        Liste des avis de chaque page, dans l'ordre de `urls`
+    """
+    main_handle = driver.current_window_handle
+    before = driver.window_handles
+    driver.execute_script(
+        "arguments[0].forEach(u => window.open(u, '_blank'));", list(urls)
+    )
+    new_handles = [h for h in driver.window_handles if h not in before]
+
+    pages = []
+    try:
+        for handle in new_handles:
+            driver.switch_to.window(handle)
+            try:
+                pages.append(extract_page(driver))
+            except WebDriverException:
+                pages.append([])
+    finally:
+        for handle in new_handles:
+            try:
+                driver.switch_to.window(handle)
+                driver.close()
+            except WebDriverException:
+                pass
+        driver.switch_to.window(main_handle)
+
+    # onglets manquants (fenêtre bloquée) : considérés comme pages vides
+    pages.extend([] for _ in range(len(urls) - len(pages)))
+    return pages
@@ -0,0 +1,311 @@
+"""Politesse par domaine : débit (seau à jetons), requêtes simultanées et ralentissement en cas de blocage"""
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+import requests
+from selenium.common.exceptions import WebDriverException
+
+from functions.metrics import span
+
+
+# Configuration par défaut (modifiable via configure_politeness)
+POLITENESS_CONFIG = {
+    "enabled": True,
+    "rate": 1.0,              # requêtes par seconde et par domaine
+    "burst": 3,               # requêtes envoyées d'affilée après une pause
+    "concurrency": 2,         # requêtes simultanées par domaine
+    "max_wait": 300,          # attente max d'un créneau (s)
+    "block_cooldown": 5,      # pause après un blocage (s), multipliée par le ralentissement
+    "max_slowdown": 32,       # débit divisé au plus par ce facteur
+    "recovery": 0.9,          # facteur appliqué au ralentissement à chaque succès
+    "domains": {              # budgets propres à un domaine (remplacent rate / burst / concurrency)
+        "trustpilot.com": {"rate": 2.0, "burst": 4, "concurrency": 4},   # pages HTTP légères
+        "amazon.fr": {"rate": 0.5, "burst": 4, "concurrency": 2},
+        "google.com": {"rate": 0.5, "burst": 2, "concurrency": 2},
+    },
+}
+
+# Domaine interrogé par chaque source (noms des spans et du cache de résolution)
+SOURCE_DOMAINS = {
+    "trustpilot": "trustpilot.com",
+    "yelp": "yelp.fr",
+    "amazon": "amazon.fr",
+    "playstore": "play.google.com",
+    "play_store": "play.google.com",
+    "play_store_first_result": "play.google.com",
+    "google": "google.com",
+}
+
+# Réponses HTTP d'un site qui nous limite
+BLOCKED_STATUS = (403, 429, 503)
+
+# Indices d'une page de blocage / captcha (titre, URL ou début du texte, en minuscules)
+BLOCK_MARKERS = (
+    "captcha", "validatecaptcha", "/sorry/", "unusual traffic", "trafic inhabituel",
+    "robot check", "are you a robot", "êtes-vous un robot", "vérifiez que vous êtes humain",
+    "access denied", "accès refusé", "request blocked", "too many requests",
+)
+
+PAGE_TEXT_JS = """
+const body = document.body ? document.body.innerText.slice(0, 2000) : '';
+return [document.title, location.href, body].join(' ').toLowerCase();
+"""
+
+
+def is_block_page(driver):
+    """True si la page affichée est une page de blocage ou un captcha (un seul appel WebDriver)"""
+    try:
+        text = driver.execute_script(PAGE_TEXT_JS) or ""
+    except WebDriverException:
+        return False
+    return any(marker in text for marker in BLOCK_MARKERS)
+
+
+def _retry_after(response):
+    """Délai Retry-After (s) d'une réponse HTTP, None s'il est absent ou sous forme de date"""
+    value = (response.headers.get("Retry-After") or "").strip() if response is not None else ""
+    return float(value) if value.isdigit() else None
+
+
+class DomainBudget:
+    """
+    Budget d'un domaine : seau à jetons (débit), créneaux (requêtes simultanées)
+    et file équitable entre entreprises
+
+    Les requêtes en attente sont servies à tour de rôle par entreprise : une
+    entreprise aux centaines de pages ne bloque pas celles qui arrivent après
+    elle. Chaque blocage détecté double le ralentissement (débit divisé,
+    pause du domaine) ; chaque succès le réduit progressivement.
+    """
+
+    def __init__(self, domain, rate=1.0, burst=3, concurrency=2, max_wait=300,
+                 block_cooldown=5, max_slowdown=32, recovery=0.9):
+        if rate <= 0 or burst < 1 or concurrency < 1:
+            raise ValueError("rate doit être > 0, burst et concurrency >= 1")
+        self.domain = domain
+        self.rate = rate
+        self.burst = burst
+        self.concurrency = concurrency
+        self.max_wait = max_wait
+        self.block_cooldown = block_cooldown
+        self.max_slowdown = max_slowdown
+        self.recovery = recovery
+
+        self.slowdown = 1.0
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._in_flight = 0
+        self._waiting = OrderedDict()   # entreprise → tickets en attente (ordre de passage)
+        self._cond = threading.Condition()
+        self._stats = {"requests": 0, "waits": 0, "wait_seconds": 0.0, "blocks": 0, "timeouts": 0}
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate / self.slowdown)
+        self._updated = now
+
+    def _is_next(self, company, ticket):
+        # tour de rôle : la première entreprise de la file, son plus ancien ticket
+        first = next(iter(self._waiting))
+        return first == company and self._waiting[company][0] is ticket
+
+    def _delay(self, cost, now):
+        """Attente avant que le ticket en tête puisse partir (None : attendre une fin de requête)"""
+        if self._in_flight >= self.concurrency:
+            return None
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self._tokens < cost:
+            return (cost - self._tokens) * self.slowdown / self.rate
+        return 0
+
+    def acquire(self, company="", cost=1):
+        """
+        Attend un créneau et `cost` jetons (requêtes envoyées d'un coup)
+
+        Raises:
+            TimeoutError: si le créneau n'est pas obtenu en max_wait secondes
+        """
+        cost = min(cost, self.burst)
+        ticket = object()
+        start = time.monotonic()
+        deadline = start + self.max_wait
+        granted = False
+        with self._cond:
+            self._waiting.setdefault(company, deque()).append(ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    delay = self._delay(cost, now) if self._is_next(company, ticket) else None
+                    if delay == 0:
+                        break
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise TimeoutError(f"Aucun créneau disponible pour {self.domain}")
+                    self._cond.wait(remaining if delay is None else min(delay, remaining))
+                self._tokens -= cost
+                self._in_flight += 1
+                granted = True
+                waited = time.monotonic() - start
+                self._stats["requests"] += 1
+                if waited > 0.001:
+                    self._stats["waits"] += 1
+                    self._stats["wait_seconds"] += waited
+            finally:
+                queue = self._waiting[company]
+                queue.remove(ticket)
+                if not queue:
+                    del self._waiting[company]
+                elif granted:
+                    self._waiting.move_to_end(company)   # servie : passe en fin de tour
+                self._cond.notify_all()
+
+    def release(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def report_success(self):
+        with self._cond:
+            self.slowdown = max(1.0, self.slowdown * self.recovery)
+
+    def report_block(self, retry_after=None):
+        """Page de blocage ou réponse 403/429/503 : ralentit et met le domaine en pause"""
+        with self._cond:
+            self._stats["blocks"] += 1
+            self.slowdown = min(self.max_slowdown, self.slowdown * 2)
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens = 0.0
+            pause = max(self.block_cooldown * self.slowdown, retry_after or 0)
+            self._paused_until = max(self._paused_until, now + pause)
+            self._cond.notify_all()
+        print(f"Blocage détecté sur {self.domain} → ralentissement x{self.slowdown:g}, pause de {pause:g} s")
+
+    def stats(self) -> dict:
+        with self._cond:
+            self._refill(time.monotonic())
+            return {
+                **self._stats,
+                "wait_seconds": round(self._stats["wait_seconds"], 3),
+                "rate": round(self.rate / self.slowdown, 3),
+                "slowdown": round(self.slowdown, 2),
+                "tokens": round(self._tokens, 2),
+                "in_flight": self._in_flight,
+                "waiting": sum(len(q) for q in self._waiting.values()),
+                "waiting_companies": len(self._waiting),
+                "paused_for": round(max(0.0, self._paused_until - time.monotonic()), 1),
+            }
+
+
+class PolitenessScheduler:
+    """Budgets de tous les domaines (créés à la première requête vers chacun)"""
+
+    def __init__(self, rate=1.0, burst=3, concurrency=2, max_wait=300, block_cooldown=5,
+                 max_slowdown=32, recovery=0.9, domains=None):
+        self.defaults = {
+            "rate": rate, "burst": burst, "concurrency": concurrency, "max_wait": max_wait,
+            "block_cooldown": block_cooldown, "max_slowdown": max_slowdown, "recovery": recovery,
+        }
+        self.overrides = dict(domains or {})
+        self._budgets = {}
+        self._lock = threading.Lock()
+
+    def budget(self, domain) -> DomainBudget:
+        with self._lock:
+            budget = self._budgets.get(domain)
+            if budget is None:
+                budget = DomainBudget(domain, **{**self.defaults, **self.overrides.get(domain, {})})
+                self._budgets[domain] = budget
+            return budget
+
+    def stats(self) -> dict:
+        with self._lock:
+            budgets = dict(self._budgets)
+        return {domain: budget.stats() for domain, budget in sorted(budgets.items())}
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def configure_politeness(**kwargs):
+    """Modifie la configuration (à appeler avant la première requête)"""
+    unknown = set(kwargs) - set(POLITENESS_CONFIG)
+    if unknown:
+        raise ValueError(f"Paramètres inconnus: {', '.join(sorted(unknown))}")
+    POLITENESS_CONFIG.update(kwargs)
+
+
+def get_politeness_scheduler() -> PolitenessScheduler:
+    """Ordonnanceur partagé par tous les extracteurs"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = PolitenessScheduler(**{k: v for k, v in POLITENESS_CONFIG.items() if k != "enabled"})
+        return _scheduler
+
+
+def source_domain(source):
+    return SOURCE_DOMAINS.get(source, source)
+
+
+@contextmanager
+def detect_blocks(source, driver):
+    """
+    Sur un délai dépassé dans le bloc, vérifie si la page affichée est une
+    page de blocage (aucun appel WebDriver supplémentaire si tout va bien)
+    """
+    try:
+        yield
+    except WebDriverException:
+        if POLITENESS_CONFIG["enabled"] and is_block_page(driver):
+            get_politeness_scheduler().budget(source_domain(source)).report_block()
+        raise
+
+
+@contextmanager
+def polite_request(source, company="", driver=None, cost=1):
+    """
+    Requête(s) vers la plateforme dans le budget de son domaine
+
+    Attend son tour (file équitable par entreprise), un créneau et `cost`
+    jetons ; le créneau est rendu à la sortie du bloc. Une réponse HTTP
+    403/429/503 ou, avec `driver`, une page de blocage affichée lors d'un
+    délai dépassé ralentit le domaine.
+
+    Args:
+        source: Plateforme ("trustpilot", "yelp", ...)
+        company: Entreprise (ou URL) concernée, pour le tour de rôle
+        driver: webdriver dont la page est vérifiée en cas d'erreur
+        cost: Nombre de pages demandées en même temps (onglets)
+    """
+    if not POLITENESS_CONFIG["enabled"]:
+        yield
+        return
+    budget = get_politeness_scheduler().budget(source_domain(source))
+    with span("politeness_wait", source):
+        budget.acquire(company, cost)
+    try:
+        yield
+    except requests.HTTPError as e:
+        status = e.response.status_code if e.response is not None else None
+        if status in BLOCKED_STATUS:
+            budget.report_block(_retry_after(e.response))
+        raise
+    except WebDriverException:
+        if driver is not None and is_block_page(driver):
+            budget.report_block()
+        raise
+    else:
+        budget.report_success()
+    finally:
+        budget.release()
+
+
+def politeness_stats() -> dict:
+    return get_politeness_scheduler().stats() if POLITENESS_CONFIG["enabled"] else {}
@@ -0,0 +1,228 @@
+"""Pool de proxies (liste_proxy.csv, proxy.xlsx) avec score de santé et rotation"""
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+
+# Configuration par défaut (modifiable via configure_proxy_pool)
+PROXY_CONFIG = {
+    "enabled": False,                                     # les scrapers passent par les proxies
+    "files": (Path("liste_proxy.csv"), Path("proxy.xlsx")),
+    "check_url": "http://www.google.com/generate_204",     # URL légère pour les vérifications
+    "check_timeout": 5,                                   # délai max d'une vérification (s)
+    "check_concurrency": 32,                              # vérifications simultanées
+    "max_failures": 5,                                    # échecs consécutifs avant éviction
+    "base_backoff": 30,                                   # mise à l'écart après un échec (s), doublée à chaque échec
+    "max_backoff": 1800,
+}
+
+
+def load_proxies(paths):
+    """
+    Lit les adresses ip:port des fichiers de proxies (colonne "proxy" ou première colonne)
+
+    Args:
+        paths: Fichiers .csv ou .xlsx (les fichiers absents sont ignorés)
+
+    Returns:
+        Liste d'adresses sans doublon, dans l'ordre des fichiers
+    """
+    import pandas as pd  # import coûteux (~0.2 s) : seulement si des fichiers de proxies sont lus
+
+    addresses = []
+    for path in paths:
+        path = Path(path)
+        if not path.is_file():
+            continue
+        df = pd.read_excel(path) if path.suffix in (".xlsx", ".xls") else pd.read_csv(path)
+        column = df["proxy"] if "proxy" in df.columns else df.iloc[:, 0]
+        for value in column.dropna().astype(str):
+            value = value.strip()
+            if ":" in value and value not in addresses:
+                addresses.append(value)
+    return addresses
+
+
+class Proxy:
+    """Proxy du pool avec ses statistiques de santé"""
+
+    def __init__(self, address):
+        self.address = address
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.latency = None        # moyenne glissante (s)
+        self.unavailable_until = 0.0
+        self.evicted = False
+
+    @property
+    def url(self):
+        return f"http://{self.address}"
+
+    def success_rate(self):
+        # lissage : un proxy jamais testé vaut 0.5
+        return (self.successes + 1) / (self.successes + self.failures + 2)
+
+    def score(self):
+        """Plus le proxy est fiable et rapide, plus le score est élevé"""
+        latency = self.latency if self.latency is not None else 1.0
+        return self.success_rate() / (0.5 + latency)
+
+    def available(self, now=None):
+        return not self.evicted and (now or time.monotonic()) >= self.unavailable_until
+
+    def as_dict(self):
+        return {
+            "address": self.address,
+            "successes": self.successes,
+            "failures": self.failures,
+            "latency": round(self.latency, 3) if self.latency is not None else None,
+            "score": round(self.score(), 3),
+            "available": self.available(),
+            "evicted": self.evicted,
+        }
+
+
+class ProxyPool:
+    """
+    Proxies notés par latence et taux de succès
+
+    Chaque navigateur ou session HTTP reçoit un proxy tiré au sort parmi les
+    proxies disponibles, avec une probabilité proportionnelle à son score
+    (rotation, les meilleurs étant les plus utilisés). Après un échec, un
+    proxy est mis à l'écart pendant une durée qui double à chaque échec
+    consécutif ; après max_failures échecs consécutifs il est évincé.
+    """
+
+    def __init__(self, addresses, check_url=PROXY_CONFIG["check_url"], check_timeout=5,
+                 check_concurrency=32, max_failures=5, base_backoff=30, max_backoff=1800):
+        self.check_url = check_url
+        self.check_timeout = check_timeout
+        self.check_concurrency = check_concurrency
+        self.max_failures = max_failures
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._proxies = {address: Proxy(address) for address in addresses}
+        self._lock = threading.Lock()
+        self._stats = {"acquired": 0, "exhausted": 0, "evictions": 0, "checks": 0}
+
+    # ---------- Vérifications ----------
+
+    def _check(self, proxy):
+        start = time.monotonic()
+        try:
+            response = requests.get(
+                self.check_url,
+                proxies={"http": proxy.url, "https": proxy.url},
+                timeout=self.check_timeout,
+            )
+            ok = response.status_code < 400
+        except requests.RequestException:
+            ok = False
+        if ok:
+            self.report_success(proxy, time.monotonic() - start)
+        else:
+            self.report_failure(proxy)
+        with self._lock:
+            self._stats["checks"] += 1
+        return ok
+
+    def health_check(self, background=False):
+        """
+        Vérifie tous les proxies non évincés (check_concurrency à la fois)
+
+        Returns:
+            Nombre de proxies fonctionnels (None si lancé en tâche de fond)
+        """
+        def _run():
+            with self._lock:
+                proxies = [p for p in self._proxies.values() if not p.evicted]
+            with ThreadPoolExecutor(max_workers=self.check_concurrency) as executor:
+                return sum(executor.map(self._check, proxies))
+
+        if background:
+            threading.Thread(target=_run, name="proxy-health-check", daemon=True).start()
+            return None
+        return _run()
+
+    # ---------- Rotation ----------
+
+    def acquire(self):
+        """Proxy disponible tiré au sort selon son score (None si aucun)"""
+        now = time.monotonic()
+        with self._lock:
+            candidates = [p for p in self._proxies.values() if p.available(now)]
+            if not candidates:
+                self._stats["exhausted"] += 1
+                return None
+            self._stats["acquired"] += 1
+            return random.choices(candidates, weights=[p.score() ** 2 for p in candidates])[0]
+
+    def is_available(self, proxy):
+        with self._lock:
+            return proxy.available()
+
+    def report_success(self, proxy, latency=None):
+        with self._lock:
+            proxy.successes += 1
+            proxy.consecutive_failures = 0
+            proxy.unavailable_until = 0.0
+            if latency is not None:
+                proxy.latency = latency if proxy.latency is None else 0.7 * proxy.latency + 0.3 * latency
+
+    def report_failure(self, proxy):
+        with self._lock:
+            proxy.failures += 1
+            proxy.consecutive_failures += 1
+            backoff = min(self.max_backoff, self.base_backoff * 2 ** (proxy.consecutive_failures - 1))
+            proxy.unavailable_until = time.monotonic() + backoff
+            if proxy.consecutive_failures >= self.max_failures and not proxy.evicted:
+                proxy.evicted = True
+                self._stats["evictions"] += 1
+
+    def stats(self, top=10) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            proxies = list(self._proxies.values())
+            stats = dict(self._stats)
+            best = sorted((p for p in proxies if p.available(now)), key=Proxy.score, reverse=True)[:top]
+            stats.update({
+                "total": len(proxies),
+                "available": sum(p.available(now) for p in proxies),
+                "backing_off": sum(not p.evicted and not p.available(now) for p in proxies),
+                "evicted": sum(p.evicted for p in proxies),
+                "best": [p.as_dict() for p in best],
+            })
+        return stats
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def configure_proxy_pool(**kwargs):
+    """Modifie la configuration (à appeler avant la première utilisation du pool)"""
+    unknown = set(kwargs) - set(PROXY_CONFIG)
+    if unknown:
+        raise ValueError(f"Paramètres inconnus: {', '.join(sorted(unknown))}")
+    PROXY_CONFIG.update(kwargs)
+
+
+def get_proxy_pool() -> ProxyPool:
+    """Pool partagé (chargé et vérifié en tâche de fond au premier appel)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            options = {k: v for k, v in PROXY_CONFIG.items() if k not in ("enabled", "files")}
+            _pool = ProxyPool(load_proxies(PROXY_CONFIG["files"]), **options)
+            _pool.health_check(background=True)
+        return _pool
+
+
+def active_proxy_pool():
+    """Pool partagé si les proxies sont activés, None sinon"""
+    return get_proxy_pool() if PROXY_CONFIG["enabled"] else None
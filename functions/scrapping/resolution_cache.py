@@ -0,0 +1,178 @@
+"""Cache persistant entreprise → URL de la page d'avis (résultats des search_company_from_*)"""
+import threading
+import time
+import unicodedata
+
+from functions.metrics import span
+from functions.scrapping.politeness import polite_request
+from functions.storage.sqlite import DATA_DIR, SQLiteStore
+
+
+DEFAULT_PATH = DATA_DIR / "resolution_cache.sqlite3"
+DEFAULT_TTL = 30 * 24 * 3600       # une URL trouvée reste valable 30 jours
+DEFAULT_NEGATIVE_TTL = 6 * 3600    # une recherche sans résultat est retentée après 6 h
+
+# Configuration du cache partagé (modifiable via configure_resolution_cache)
+RESOLUTION_CACHE_CONFIG = {
+    "path": DEFAULT_PATH,
+    "ttl": DEFAULT_TTL,
+    "negative_ttl": DEFAULT_NEGATIVE_TTL,
+}
+
+
+class CompanyNotFoundError(LookupError):
+    """Aucune page d'avis trouvée pour cette entreprise sur cette plateforme"""
+
+    def __init__(self, source, company):
+        super().__init__(f"Aucun résultat correspondant à '{company}' trouvé sur {source}")
+        self.source = source
+        self.company = company
+
+
+def normalize_company(company):
+    """Clé de recherche : minuscules, sans accents ni espaces superflus"""
+    text = unicodedata.normalize("NFD", company or "")
+    text = "".join(c for c in text if unicodedata.category(c) != "Mn")
+    return " ".join(text.lower().split())
+
+
+class ResolutionCache(SQLiteStore):
+    """
+    Cache SQLite (source, entreprise) → URL avec durée de vie
+
+    Les recherches infructueuses sont aussi mémorisées (cache négatif, durée
+    de vie plus courte) pour ne pas relancer une recherche vouée à l'échec.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS resolutions (
+        source TEXT NOT NULL,
+        company TEXT NOT NULL,
+        url TEXT,                 -- NULL : entreprise introuvable
+        resolved_at REAL NOT NULL,
+        PRIMARY KEY (source, company)
+    );
+    """
+
+    def __init__(self, path=DEFAULT_PATH, ttl=DEFAULT_TTL, negative_ttl=DEFAULT_NEGATIVE_TTL):
+        super().__init__(path)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._stats_lock = threading.Lock()
+        self._stats = {"hits": 0, "negative_hits": 0, "misses": 0, "stores": 0, "invalidations": 0}
+
+    def _count(self, name, n=1):
+        with self._stats_lock:
+            self._stats[name] += n
+
+    def lookup(self, source, company):
+        """
+        Returns:
+            (True, url) si l'URL est en cache, (True, None) si l'entreprise est
+            connue comme introuvable, (False, None) sinon
+        """
+        rows = self.query(
+            "SELECT url, resolved_at FROM resolutions WHERE source = ? AND company = ?",
+            (source, normalize_company(company)),
+        )
+        if rows:
+            url, resolved_at = rows[0]["url"], rows[0]["resolved_at"]
+            ttl = self.ttl if url else self.negative_ttl
+            if time.time() - resolved_at < ttl:
+                self._count("hits" if url else "negative_hits")
+                return True, url
+        self._count("misses")
+        return False, None
+
+    def store(self, source, company, url):
+        """Mémorise l'URL trouvée (url=None : entreprise introuvable)"""
+        self.execute(
+            "INSERT OR REPLACE INTO resolutions (source, company, url, resolved_at) VALUES (?, ?, ?, ?)",
+            (source, normalize_company(company), url, time.time()),
+        )
+        self._count("stores")
+
+    def store_not_found(self, source, company):
+        self.store(source, company, None)
+
+    def invalidate(self, source=None, company=None):
+        """Supprime les entrées (toutes, d'une source, ou d'une entreprise) ; retourne leur nombre"""
+        clauses, params = [], []
+        if source is not None:
+            clauses.append("source = ?")
+            params.append(source)
+        if company is not None:
+            clauses.append("company = ?")
+            params.append(normalize_company(company))
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        deleted = self.execute(f"DELETE FROM resolutions{where}", params).rowcount
+        self._count("invalidations", deleted)
+        return deleted
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["negative_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits"] + stats["negative_hits"]) / lookups, 3) if lookups else None
+        stats["entries"] = self.query("SELECT COUNT(*) AS n FROM resolutions")[0]["n"]
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def configure_resolution_cache(**kwargs):
+    """Modifie la configuration (à appeler avant la première utilisation du cache)"""
+    unknown = set(kwargs) - set(RESOLUTION_CACHE_CONFIG)
+    if unknown:
+        raise ValueError(f"Paramètres inconnus: {', '.join(sorted(unknown))}")
+    RESOLUTION_CACHE_CONFIG.update(kwargs)
+
+
+def get_resolution_cache() -> ResolutionCache:
+    """Cache partagé (créé au premier appel)"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResolutionCache(**RESOLUTION_CACHE_CONFIG)
+        return _cache
+
+
+def resolve_cached(source, company, search, open_url=None, cache_not_found=True):
+    """
+    Résout l'URL de la page d'avis d'une entreprise en passant par le cache
+
+    Sur un succès du cache, `open_url(url)` est appelé directement (le
+    navigateur va à l'URL mémorisée) ; sinon `search(company)` effectue la
+    recherche sur le site et retourne l'URL trouvée (None si aucun
+    résultat), qui est mémorisée.
+
+    Args:
+        source: Plateforme ("trustpilot", "yelp", ...)
+        company: Entreprise recherchée
+        search: Fonction company -> URL ou None
+        open_url: Fonction url -> None appelée en cas de succès du cache
+        cache_not_found: Mémorise aussi une recherche sans résultat (False si la
+            recherche peut échouer à tort, ex. page rendue sans JavaScript)
+
+    Raises:
+        CompanyNotFoundError: si l'entreprise est (ou a récemment été) introuvable
+    """
+    cache = get_resolution_cache()
+    hit, url = cache.lookup(source, company)
+    if hit:
+        if url is None:
+            raise CompanyNotFoundError(source, company)
+        if open_url is not None:
+            with polite_request(source, company), span("page_load", source):
+                open_url(url)
+        return url
+
+    with polite_request(source, company), span("search", source):
+        url = search(company)
+    if url is not None or cache_not_found:
+        cache.store(source, company, url)
+    if url is None:
+        raise CompanyNotFoundError(source, company)
+    return url
@@ -0,0 +1,128 @@
+"""Attentes événementielles : chargement de nouvelles cartes au lieu de time.sleep fixes"""
+import time
+
+from selenium.common.exceptions import WebDriverException
+
+
+# Nombre de scrolls consécutifs sans nouvelle carte avant de considérer la liste épuisée
+MAX_IDLE_SCROLLS = 2
+
+# Observe le DOM (MutationObserver) et rend la main dès que :
+#   - le nombre de cartes dépasse `previous` (nouveau contenu), ou
+#   - le DOM n'a plus bougé depuis `settleMs` (après au moins `minWaitMs`), ou
+#   - `timeoutMs` est écoulé.
+WAIT_FOR_CARDS_JS = """
+const [selector, previous, timeoutMs, minWaitMs, settleMs, container] = arguments;
+const done = arguments[arguments.length - 1];
+const root = container || document.body;
+const count = () => document.querySelectorAll(selector).length;
+const start = Date.now();
+let lastMutation = start;
+let finished = false;
+
+const finish = (grew) => {
+    if (finished) return;
+    finished = true;
+    observer.disconnect();
+    clearInterval(timer);
+    done({count: count(), grew: grew});
+};
+const check = () => {
+    const n = count();
+    if (previous >= 0 && n > previous) return finish(true);
+    const now = Date.now();
+    if (now - start >= timeoutMs) return finish(false);
+    const quiet = now - lastMutation >= settleMs && now - start >= minWaitMs;
+    if (quiet && (previous >= 0 || n > 0)) finish(false);
+};
+const observer = new MutationObserver(() => { lastMutation = Date.now(); check(); });
+observer.observe(root, {childList: true, subtree: true, characterData: true});
+const timer = setInterval(check, 50);
+check();
+"""
+
+
+def _count_cards(driver, selector):
+    return driver.execute_script(
+        "return document.querySelectorAll(arguments[0]).length;", selector
+    )
+
+
+def _poll_for_cards(driver, selector, previous_count, timeout, min_wait, settle):
+    """Repli sans MutationObserver : sondage avec intervalle croissant"""
+    start = time.monotonic()
+    delay = 0.1
+    last_count = _count_cards(driver, selector)
+    last_change = start
+    while True:
+        if previous_count >= 0 and last_count > previous_count:
+            return last_count
+        now = time.monotonic()
+        if now - start >= timeout:
+            return last_count
+        if now - last_change >= settle and now - start >= min_wait and (previous_count >= 0 or last_count > 0):
+            return last_count
+        time.sleep(delay)
+        delay = min(delay * 2, 1.0)
+        count = _count_cards(driver, selector)
+        if count != last_count:
+            last_count = count
+            last_change = time.monotonic()
+            delay = 0.1
+
+
+def wait_for_cards(driver, selector, previous_count=-1, container=None,
+                   timeout=10, min_wait=1.0, settle=0.5):
+    """
+    Attend que de nouvelles cartes apparaissent ou que la page se stabilise
+
+    Args:
+        driver: webdriver Selenium
+        selector: Sélecteur CSS des cartes d'avis
+        previous_count: Nombre de cartes déjà vues (-1 : attendre seulement
+                        que la page soit stable avec au moins une carte)
+        container: Élément dont les mutations sont observées (document si None)
+        timeout: Attente maximale (s)
+        min_wait: Délai minimal avant de conclure qu'aucun contenu n'arrive (s)
+        settle: Durée sans modification du DOM pour considérer la page stable (s)
+
+    Returns:
+        Nombre de cartes présentes au retour
+    """
+    try:
+        result = driver.execute_async_script(
+            WAIT_FOR_CARDS_JS, selector, previous_count,
+            int(timeout * 1000), int(min_wait * 1000), int(settle * 1000), container,
+        )
+        return result["count"]
+    except WebDriverException:
+        return _poll_for_cards(driver, selector, previous_count, timeout, min_wait, settle)
+
+
+def scroll_and_wait_for_cards(driver, container, selector, previous_count, **kwargs):
+    """Fait défiler le conteneur jusqu'en bas puis attend de nouvelles cartes"""
+    driver.execute_script("arguments[0].scrollTop = arguments[0].scrollHeight", container)
+    return wait_for_cards(driver, selector, previous_count, container=container, **kwargs)
+
+
+def scroll_until_card_count(driver, container, selector, card_count, target, pace=None, **kwargs):
+    """
+    Fait défiler le conteneur jusqu'à ce que `target` cartes soient chargées
+    (reprise d'une extraction : les cartes déjà lues ne sont pas extraites)
+
+    Args:
+        pace: Fonction () -> context manager entourant chaque scroll (politesse)
+
+    Returns:
+        Nombre de cartes chargées (moins que target si la liste est épuisée)
+    """
+    idle = 0
+    while card_count < target and idle < MAX_IDLE_SCROLLS:
+        if pace is None:
+            new_count = scroll_and_wait_for_cards(driver, container, selector, card_count, **kwargs)
+        else:
+            with pace():
+                new_count = scroll_and_wait_for_cards(driver, container, selector, card_count, **kwargs)
+        idle = 0 if new_count > card_count else idle + 1
+        card_count = max(card_count, new_count)
+    return card_count
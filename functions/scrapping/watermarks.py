@@ -0,0 +1,177 @@
+"""Marqueurs de reprise (watermarks) : dernier avis connu par (source, entreprise)"""
+import threading
+import time
+from datetime import datetime
+
+from functions.scrapping.dom_extraction import review_key
+from functions.scrapping.resolution_cache import normalize_company
+from functions.storage.sqlite import DATA_DIR, SQLiteStore
+
+
+DEFAULT_PATH = DATA_DIR / "watermarks.sqlite3"
+
+
+def _parse_iso_date(value):
+    """Date ISO 8601 (Trustpilot) → datetime ; None pour les dates libres ("il y a 2 jours", ...)"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+class Watermark(dict):
+    """
+    Watermark ({key, date}) passé aux extracteurs, qui y notent pourquoi ils se sont arrêtés
+
+    - reached : un avis déjà connu a été atteint (voir cut_at_watermark)
+    - exhausted : la liste des avis s'est terminée avant max_reviews
+
+    Sans l'un des deux, l'extraction s'est arrêtée à max_reviews (ou sur une
+    erreur) avant de rejoindre les avis connus : des avis restent à lire entre
+    les deux, et le watermark ne doit pas avancer.
+    """
+
+    reached = False
+    exhausted = False
+
+
+def mark_exhausted(watermark):
+    """L'extracteur a lu la liste jusqu'au bout (dernière page) : plus aucun avis à lire"""
+    if isinstance(watermark, Watermark):
+        watermark.exhausted = True
+
+
+def make_watermark(item):
+    """Watermark correspondant à un avis (le plus récent d'une extraction)"""
+    return {"key": review_key(item), "date": item.get("date")}
+
+
+def is_known(item, watermark):
+    """
+    Indique si l'avis a déjà été vu lors d'une extraction précédente
+
+    L'avis est connu s'il s'agit de l'avis du watermark (même identifiant)
+    ou, lorsque les deux dates sont au format ISO, s'il est plus ancien.
+    """
+    if not watermark:
+        return False
+    if review_key(item) == watermark.get("key"):
+        return True
+    item_date = _parse_iso_date(item.get("date"))
+    mark_date = _parse_iso_date(watermark.get("date"))
+    if item_date is None or mark_date is None:
+        return False
+    try:
+        return item_date < mark_date
+    except TypeError:
+        # l'une des dates a un fuseau, l'autre non
+        return False
+
+
+def cut_at_watermark(items, watermark):
+    """
+    Garde les avis précédant le premier avis connu (avis triés du plus récent au plus ancien)
+
+    Returns:
+        (nouveaux avis, True si le watermark a été atteint)
+    """
+    if not watermark:
+        return items, False
+    for i, item in enumerate(items):
+        if is_known(item, watermark):
+            if isinstance(watermark, Watermark):
+                watermark.reached = True
+            return items[:i], True
+    return items, False
+
+
+class WatermarkStore(SQLiteStore):
+    """Watermarks persistants par (source, entreprise)"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS watermarks (
+        source TEXT NOT NULL,
+        company TEXT NOT NULL,
+        review_key TEXT NOT NULL,
+        review_date TEXT,
+        updated_at REAL NOT NULL,
+        PRIMARY KEY (source, company)
+    );
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        super().__init__(path)
+
+    def get(self, source, company):
+        """Watermark enregistré (None si l'entreprise n'a jamais été extraite)"""
+        rows = self.query(
+            "SELECT review_key, review_date FROM watermarks WHERE source = ? AND company = ?",
+            (source, normalize_company(company)),
+        )
+        if not rows:
+            return None
+        return {"key": rows[0]["review_key"], "date": rows[0]["review_date"]}
+
+    def save(self, source, company, watermark):
+        self.execute(
+            "INSERT OR REPLACE INTO watermarks (source, company, review_key, review_date, updated_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (source, normalize_company(company), watermark["key"], watermark.get("date"), time.time()),
+        )
+
+    def reset(self, source=None, company=None):
+        """Supprime les watermarks (prochaine extraction complète) ; retourne leur nombre"""
+        clauses, params = [], []
+        if source is not None:
+            clauses.append("source = ?")
+            params.append(source)
+        if company is not None:
+            clauses.append("company = ?")
+            params.append(normalize_company(company))
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self.execute(f"DELETE FROM watermarks{where}", params).rowcount
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_watermark_store() -> WatermarkStore:
+    """Stockage partagé (créé au premier appel)"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = WatermarkStore()
+        return _store
+
+
+def extract_new_reviews(source, company, extract):
+    """
+    Extraction incrémentale : seulement les avis plus récents que la dernière extraction
+
+    Args:
+        source: Plateforme
+        company: Entreprise
+        extract: Fonction since -> liste d'avis (du plus récent au plus ancien),
+            arrêtant l'extraction au premier avis connu du watermark `since`
+
+    Returns:
+        Liste des nouveaux avis. Le watermark avance jusqu'au plus récent
+        seulement si l'extraction a rejoint l'ancien watermark ou lu tous les
+        avis ; sinon (plus de max_reviews nouveaux avis, extraction
+        interrompue) il est conservé, pour que la prochaine extraction relise
+        les avis non lus entre les deux.
+    """
+    store = get_watermark_store()
+    saved = store.get(source, company)
+    since = Watermark(saved) if saved else None
+    reviews = extract(since)
+    if not reviews:
+        return reviews
+    if since is None or since.reached or since.exhausted:
+        store.save(source, company, make_watermark(reviews[0]))
+    else:
+        print(f"Watermark {source} '{company}' conservé : avis connus non atteints")
+    return reviews
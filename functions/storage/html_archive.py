@@ -0,0 +1,219 @@
+"""Archive compressée du HTML brut des pages scrapées (relecture hors ligne, voir offline_parsing.py)"""
+import gzip
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from functions.scrapping.resolution_cache import normalize_company
+from functions.storage.sqlite import DATA_DIR, SQLiteStore
+
+try:
+    import zstandard
+except ImportError:  # extra "archive" (poetry install --extras archive) : compression gzip à défaut
+    zstandard = None
+
+
+DEFAULT_DIR = DATA_DIR / "html_archive"
+
+# Configuration par défaut (modifiable via configure_html_archive)
+ARCHIVE_CONFIG = {
+    "enabled": False,          # désactivée par défaut : chaque page lue est écrite sur disque
+    "dir": DEFAULT_DIR,
+    "compression": "zstd" if zstandard is not None else "gzip",
+    "level": None,             # niveau de compression (None : valeur par défaut de l'algorithme)
+}
+
+EXTENSIONS = {"zstd": ".html.zst", "gzip": ".html.gz"}
+
+
+def compress(data: bytes, compression, level=None) -> bytes:
+    if compression == "zstd":
+        if zstandard is None:
+            raise ValueError("Compression zstd indisponible (module zstandard non installé)")
+        return zstandard.ZstdCompressor(level=level or 3).compress(data)
+    if compression == "gzip":
+        return gzip.compress(data, compresslevel=level or 6)
+    raise ValueError(f"Compression inconnue: {compression} (attendu: {', '.join(EXTENSIONS)})")
+
+
+def decompress(data: bytes, compression) -> bytes:
+    if compression == "zstd":
+        if zstandard is None:
+            raise ValueError("Archive zstd illisible (module zstandard non installé)")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if compression == "gzip":
+        return gzip.decompress(data)
+    raise ValueError(f"Compression inconnue: {compression}")
+
+
+class HtmlArchive(SQLiteStore):
+    """
+    Pages HTML adressées par leur contenu (sha256), compressées sur disque
+
+    Les fichiers sont rangés sous blobs/<2 premiers caractères>/<empreinte> :
+    une page identique capturée plusieurs fois n'est écrite qu'une fois.
+    L'index SQLite garde chaque capture (source, entreprise, URL, date) pour
+    pouvoir relire les pages dans l'ordre où elles ont été extraites.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS snapshots (
+        id INTEGER PRIMARY KEY,
+        source TEXT NOT NULL,
+        company TEXT NOT NULL,
+        url TEXT,
+        content_hash TEXT NOT NULL,
+        compression TEXT NOT NULL,
+        size INTEGER NOT NULL,          -- taille du HTML non compressé
+        captured_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_snapshots_source_company ON snapshots (source, company, id);
+    """
+
+    def __init__(self, directory=DEFAULT_DIR, compression="gzip", level=None):
+        self.directory = Path(directory)
+        self.compression = compression
+        self.level = level
+        super().__init__(self.directory / "index.sqlite3")
+
+    def blob_path(self, content_hash, compression):
+        return self.directory / "blobs" / content_hash[:2] / f"{content_hash}{EXTENSIONS[compression]}"
+
+    def _write_blob(self, path, data):
+        """Écriture atomique (fichier temporaire puis renommage) : pas de fichier tronqué"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def add(self, source, company, html, url=None) -> str:
+        """
+        Archive une page
+
+        Args:
+            source: Plateforme ("trustpilot", "yelp", ...) : choisit le parseur à la relecture
+            company: Entreprise (ou URL du lieu)
+            html: Code source de la page
+            url: Adresse de la page
+
+        Returns:
+            Empreinte sha256 du HTML
+        """
+        data = html.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.blob_path(digest, self.compression)
+        if not path.exists():
+            self._write_blob(path, compress(data, self.compression, self.level))
+        self.execute(
+            "INSERT INTO snapshots (source, company, url, content_hash, compression, size, captured_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (source, normalize_company(company), url, digest, self.compression, len(data), time.time()),
+        )
+        return digest
+
+    def snapshots(self, source=None, company=None):
+        """Captures (dicts avec le chemin du fichier), dans l'ordre d'archivage"""
+        clauses, params = [], []
+        if source is not None:
+            clauses.append("source = ?")
+            params.append(source)
+        if company is not None:
+            clauses.append("company = ?")
+            params.append(normalize_company(company))
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self.query(
+            "SELECT id, source, company, url, content_hash, compression, size, captured_at "
+            f"FROM snapshots{where} ORDER BY id",
+            params,
+        )
+        return [
+            {**dict(row), "path": str(self.blob_path(row["content_hash"], row["compression"]))}
+            for row in rows
+        ]
+
+    def read(self, snapshot) -> str:
+        """HTML d'une capture (dict retourné par snapshots())"""
+        return read_blob(snapshot["path"], snapshot["compression"])
+
+    def stats(self) -> dict:
+        row = self.query(
+            "SELECT COUNT(*) AS snapshots, COUNT(DISTINCT content_hash) AS pages, "
+            "COALESCE(SUM(size), 0) AS html_bytes FROM snapshots"
+        )[0]
+        blobs = self.directory / "blobs"
+        stored = sum(p.stat().st_size for p in blobs.rglob("*.html.*")) if blobs.exists() else 0
+        return {
+            **dict(row),
+            "stored_bytes": stored,
+            "compression": self.compression,
+            "by_source": {
+                r["source"]: r["n"]
+                for r in self.query("SELECT source, COUNT(*) AS n FROM snapshots GROUP BY source")
+            },
+        }
+
+
+def read_blob(path, compression) -> str:
+    """Lit et décompresse un fichier de l'archive (utilisable dans un autre processus)"""
+    with open(path, "rb") as file:
+        return decompress(file.read(), compression).decode("utf-8")
+
+
+_archive = None
+_archive_lock = threading.Lock()
+
+
+def configure_html_archive(**kwargs):
+    """Modifie la configuration (à appeler avant la première page archivée)"""
+    unknown = set(kwargs) - set(ARCHIVE_CONFIG)
+    if unknown:
+        raise ValueError(f"Paramètres inconnus: {', '.join(sorted(unknown))}")
+    if kwargs.get("compression", "gzip") not in EXTENSIONS:
+        raise ValueError(f"Compression inconnue: {kwargs['compression']} (attendu: {', '.join(EXTENSIONS)})")
+    if kwargs.get("compression") == "zstd" and zstandard is None:
+        raise ValueError("Compression zstd indisponible (module zstandard non installé)")
+    ARCHIVE_CONFIG.update(kwargs)
+
+
+def get_html_archive() -> HtmlArchive:
+    """Archive partagée (créée au premier appel)"""
+    global _archive
+    with _archive_lock:
+        if _archive is None:
+            _archive = HtmlArchive(
+                ARCHIVE_CONFIG["dir"], ARCHIVE_CONFIG["compression"], ARCHIVE_CONFIG["level"],
+            )
+        return _archive
+
+
+def archive_page(source, company, driver=None, html=None, url=None):
+    """
+    Archive la page courante du navigateur (ou le HTML fourni) si l'archive est activée
+
+    Une erreur d'archivage n'interrompt jamais l'extraction.
+
+    Args:
+        source: Plateforme
+        company: Entreprise (ou URL du lieu)
+        driver: webdriver Selenium (page_source et current_url lus si html est absent)
+        html: Code source déjà téléchargé (moteur HTTP)
+        url: Adresse de la page
+    """
+    if not ARCHIVE_CONFIG["enabled"]:
+        return None
+    try:
+        if html is None:
+            html = driver.page_source
+            url = url or driver.current_url
+        return get_html_archive().add(source, company, html, url)
+    except Exception as e:
+        print(f"Erreur archivage de la page ({source}): {e}")
+        return None
@@ -0,0 +1,189 @@
+"""Stockage local des avis scrapés (SQLite), dédoublonnés par empreinte du contenu"""
+import hashlib
+import threading
+import time
+
+from functions.scrapping.resolution_cache import normalize_company
+from functions.storage.sqlite import DATA_DIR, SQLiteStore
+
+
+DEFAULT_PATH = DATA_DIR / "reviews.sqlite3"
+INGEST_BATCH_SIZE = 200
+MAX_PAGE_SIZE = 500
+
+
+def content_hash(item):
+    """Empreinte d'un avis : note + texte (espaces normalisés)"""
+    text = " ".join((item.get("review") or "").split())
+    return hashlib.sha1(f"{item.get('rating')}|{text}".encode("utf-8")).hexdigest()
+
+
+class ReviewStore(SQLiteStore):
+    """
+    Avis de toutes les sources, indexés par (source, entreprise, date) et par note
+
+    Un avis déjà présent (même source, entreprise et empreinte) n'est pas
+    réinséré : les extractions successives d'une entreprise s'accumulent
+    sans doublons.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS reviews (
+        id INTEGER PRIMARY KEY,
+        source TEXT NOT NULL,
+        company TEXT NOT NULL,
+        review_id TEXT,
+        content_hash TEXT NOT NULL,
+        rating REAL,
+        review TEXT NOT NULL,
+        date TEXT,
+        author TEXT,
+        scraped_at REAL NOT NULL,
+        UNIQUE (source, company, content_hash)
+    );
+    CREATE INDEX IF NOT EXISTS idx_reviews_source_company_date ON reviews (source, company, date);
+    CREATE INDEX IF NOT EXISTS idx_reviews_rating ON reviews (rating);
+    """
+
+    COLUMNS = ("id", "source", "company", "review_id", "content_hash", "rating", "review", "date", "author", "scraped_at")
+
+    def __init__(self, path=DEFAULT_PATH, wal=True):
+        super().__init__(path, wal=wal)
+
+    def _insert_batch(self, rows):
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO reviews "
+                "(source, company, review_id, content_hash, rating, review, date, author, scraped_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            return self._conn.total_changes - before
+
+    @staticmethod
+    def _row(source, company, item, scraped_at):
+        return (
+            source,
+            company,
+            item.get("review_id"),
+            content_hash(item),
+            item.get("rating"),
+            item.get("review") or "",
+            item.get("date"),
+            item.get("author"),
+            scraped_at,
+        )
+
+    def ingest(self, source, company, reviews, batch_size=INGEST_BATCH_SIZE):
+        """
+        Enregistre les avis (par lots d'une transaction chacun)
+
+        Args:
+            source: Plateforme
+            company: Entreprise recherchée
+            reviews: Itérable de dicts {rating, review, review_id, date, author}
+            batch_size: Avis par transaction
+
+        Returns:
+            (avis insérés, doublons ignorés)
+        """
+        company = normalize_company(company)
+        scraped_at = time.time()
+        inserted = total = 0
+        batch = []
+        for item in reviews:
+            batch.append(self._row(source, company, item, scraped_at))
+            if len(batch) >= batch_size:
+                inserted += self._insert_batch(batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            inserted += self._insert_batch(batch)
+            total += len(batch)
+        return inserted, total - inserted
+
+    def ingest_stream(self, source, company, reviews, batch_size=50):
+        """
+        Rend les avis du générateur tout en les enregistrant par lots
+
+        Le dernier lot est enregistré à la fin de l'itération, y compris si
+        l'appelant s'arrête avant (fermeture du générateur). Le générateur
+        source est alors fermé aussitôt : l'extracteur libère son navigateur
+        sans attendre le ramasse-miettes.
+        """
+        company_key = normalize_company(company)
+        scraped_at = time.time()
+        batch = []
+        close = getattr(reviews, "close", None)
+        try:
+            for item in reviews:
+                batch.append(self._row(source, company_key, item, scraped_at))
+                if len(batch) >= batch_size:
+                    self._insert_batch(batch)
+                    batch = []
+                yield item
+        finally:
+            try:
+                if batch:
+                    self._insert_batch(batch)
+            finally:
+                if close is not None:
+                    close()
+
+    def search(self, source=None, company=None, min_rating=None, max_rating=None,
+               limit=50, cursor=None):
+        """
+        Lit les avis enregistrés, du plus récemment enregistré au plus ancien
+
+        Pagination par curseur : passer le `next_cursor` de la page précédente
+        pour obtenir la suivante (stable même si de nouveaux avis arrivent).
+
+        Returns:
+            (liste d'avis, next_cursor ou None s'il n'y a plus d'avis)
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        clauses, params = [], []
+        if source is not None:
+            clauses.append("source = ?")
+            params.append(source)
+        if company is not None:
+            clauses.append("company = ?")
+            params.append(normalize_company(company))
+        if min_rating is not None:
+            clauses.append("rating >= ?")
+            params.append(min_rating)
+        if max_rating is not None:
+            clauses.append("rating <= ?")
+            params.append(max_rating)
+        if cursor is not None:
+            clauses.append("id < ?")
+            params.append(int(cursor))
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self.query(
+            f"SELECT {', '.join(self.COLUMNS)} FROM reviews{where} ORDER BY id DESC LIMIT ?",
+            (*params, limit + 1),
+        )
+        items = [dict(row) for row in rows[:limit]]
+        next_cursor = str(items[-1]["id"]) if len(rows) > limit else None
+        return items, next_cursor
+
+    def stats(self) -> dict:
+        rows = self.query(
+            "SELECT source, COUNT(*) AS reviews, COUNT(DISTINCT company) AS companies "
+            "FROM reviews GROUP BY source"
+        )
+        return {row["source"]: {"reviews": row["reviews"], "companies": row["companies"]} for row in rows}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_review_store() -> ReviewStore:
+    """Stockage partagé (créé au premier appel)"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ReviewStore()
+        return _store
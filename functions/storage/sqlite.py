@@ -0,0 +1,58 @@
+"""Connexions SQLite partagées par les caches et stockages locaux"""
+import sqlite3
+import threading
+from pathlib import Path
+
+
+# Répertoire des fichiers de données locaux (relatif au répertoire de lancement,
+# comme cookies.pkl)
+DATA_DIR = Path("data")
+
+
+def connect(path, wal=True) -> sqlite3.Connection:
+    """
+    Ouvre (et crée si besoin) une base SQLite utilisable depuis plusieurs threads
+
+    Args:
+        path: Chemin du fichier (":memory:" pour une base en mémoire)
+        wal: Active le journal WAL (lectures concurrentes pendant les écritures)
+    """
+    if str(path) != ":memory:":
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    if wal and str(path) != ":memory:":
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class SQLiteStore:
+    """Base des stockages SQLite : une connexion protégée par un verrou"""
+
+    SCHEMA = ""
+
+    def __init__(self, path, wal=True):
+        self.path = path
+        self._conn = connect(path, wal=wal)
+        self._lock = threading.RLock()
+        with self._lock, self._conn:
+            self._conn.executescript(self.SCHEMA)
+
+    def execute(self, sql, params=()):
+        """Exécute une requête d'écriture dans une transaction"""
+        with self._lock, self._conn:
+            return self._conn.execute(sql, params)
+
+    def executemany(self, sql, rows):
+        with self._lock, self._conn:
+            return self._conn.executemany(sql, rows)
+
+    def query(self, sql, params=()):
+        """Exécute une requête de lecture et retourne toutes les lignes"""
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
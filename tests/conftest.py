@@ -0,0 +1,25 @@
+"""Fixtures partagées : serveur de pages locales et stockages isolés dans un répertoire temporaire"""
+import pytest
+
+from benchmarks.fixture_server import serve_fixtures
+from benchmarks.make_fixtures import main as make_fixtures
+from functions.scrapping import checkpoints, politeness, resolution_cache, watermarks
+
+
+@pytest.fixture(scope="session")
+def fixture_site():
+    """URL de base du serveur de fixtures (pages régénérées une fois par session)"""
+    make_fixtures()
+    with serve_fixtures() as base_url:
+        yield base_url
+
+
+@pytest.fixture(autouse=True)
+def isolated_stores(tmp_path, monkeypatch):
+    """Points de reprise, caches et watermarks dans tmp_path, politesse désactivée (pas d'attente)"""
+    monkeypatch.setitem(checkpoints.CHECKPOINT_CONFIG, "path", tmp_path / "checkpoints.sqlite3")
+    monkeypatch.setattr(checkpoints, "_store", None)
+    monkeypatch.setitem(resolution_cache.RESOLUTION_CACHE_CONFIG, "path", tmp_path / "resolution_cache.sqlite3")
+    monkeypatch.setattr(resolution_cache, "_cache", None)
+    monkeypatch.setattr(watermarks, "_store", watermarks.WatermarkStore(tmp_path / "watermarks.sqlite3"))
+    monkeypatch.setitem(politeness.POLITENESS_CONFIG, "enabled", False)
@@ -0,0 +1,23 @@
+"""Validation des paramètres des endpoints (sans scraping)"""
+import pytest
+from fastapi.testclient import TestClient
+
+from functions.API.main import app
+
+client = TestClient(app)
+
+
+@pytest.mark.parametrize("path", [
+    "/reviews?source=trustpilot&search=example",
+    "/reviews/stream?source=trustpilot&search=example",
+    "/reviews/all?search=example",
+    "/reviews-with-responses?source=trustpilot&url=example",
+])
+def test_max_reviews_must_be_positive(path):
+    response = client.get(f"{path}&max_reviews=0")
+    assert response.status_code == 422
+
+
+def test_only_new_is_rejected_for_yelp():
+    response = client.get("/reviews?source=yelp&search=example&only_new=true")
+    assert response.status_code == 400
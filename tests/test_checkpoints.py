@@ -0,0 +1,96 @@
+"""Points de reprise : avis mémorisés et suppression en fin d'extraction"""
+import contextlib
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import requests
+
+from functions.scrapping import checkpoints, functions_amazon, functions_trustpilot
+from functions.scrapping.checkpoints import get_checkpoint_store, open_checkpoint
+from functions.scrapping.functions_amazon import extract_reviews_and_ratings_from_amazon
+from functions.scrapping.functions_trustpilot import extract_reviews_from_trustpilot_http
+from tests.test_trustpilot_http import expected
+
+
+def test_short_extraction_keeps_only_the_position():
+    checkpoint = open_checkpoint("trustpilot_http", "example", 10)
+    assert not checkpoint.persistent
+    checkpoint.advance([{"review": "a"}, {"review": "b"}], page=2)
+    assert checkpoint.cursor == {"page": 2}
+    assert checkpoint.results == []
+
+
+def test_shorter_request_does_not_clear_a_longer_checkpoint():
+    store = get_checkpoint_store()
+    longer = open_checkpoint("amazon", "example", 300)
+    longer.advance([{"review": str(i)} for i in range(150)], page=2)
+
+    shorter = open_checkpoint("amazon", "example", 100)
+    assert shorter.resumed and shorter.requested == 300
+    shorter.clear(100)
+    assert len(store.entries()) == 1
+
+    # fin de la liste avant la limite : le point de reprise est supprimé
+    shorter.clear(80)
+    assert store.entries() == []
+
+
+def test_shorter_request_leaves_progress_to_the_interrupted_one(fixture_site, monkeypatch):
+    monkeypatch.setitem(checkpoints.CHECKPOINT_CONFIG, "min_reviews", 10)
+    fetch_html = functions_trustpilot.fetch_html
+
+    def blocked_on_page_3(session, url, params=None):
+        if (params or {}).get("page") == 3:
+            response = requests.Response()
+            response.status_code = 429
+            raise requests.HTTPError("429 Too Many Requests", response=response)
+        return fetch_html(session, url, params)
+
+    monkeypatch.setattr(functions_trustpilot, "fetch_html", blocked_on_page_3)
+    with pytest.raises(requests.HTTPError):
+        extract_reviews_from_trustpilot_http("example", 50, base_url=fixture_site)
+
+    # servie depuis le point de reprise, la requête plus courte ne le supprime pas
+    assert extract_reviews_from_trustpilot_http("example", 30, base_url=fixture_site) == expected(30)
+    assert len(get_checkpoint_store().entries()) == 1
+
+    monkeypatch.setattr(functions_trustpilot, "fetch_html", fetch_html)
+    assert extract_reviews_from_trustpilot_http("example", 50, base_url=fixture_site) == expected(50)
+    assert get_checkpoint_store().entries() == []
+
+
+def amazon_page(number):
+    return [{"review": f"avis {i}", "rating": 4.0, "review_id": f"r{i}"} for i in range((number - 1) * 10, number * 10)]
+
+
+def test_amazon_page_timeout_keeps_checkpoint(monkeypatch):
+    monkeypatch.setitem(checkpoints.CHECKPOINT_CONFIG, "min_reviews", 10)
+
+    class Sessions:
+        def checkout(self):
+            return contextlib.nullcontext(object())
+
+    timed_out = {4}
+
+    def fetch_pages_in_tabs(driver, urls, extract_page):
+        numbers = [int(parse_qs(urlparse(url).query)["pageNumber"][0]) for url in urls]
+        # délai dépassé : _extract_amazon_page rend une page vide
+        return [[] if n in timed_out else amazon_page(n) for n in numbers]
+
+    monkeypatch.setattr(functions_amazon, "get_amazon_sessions", Sessions)
+    monkeypatch.setattr(functions_amazon, "fetch_pages_in_tabs", fetch_pages_in_tabs)
+
+    # extraction déjà avancée jusqu'à la page 2
+    open_checkpoint("amazon", "example", 50).advance(
+        amazon_page(1), url="https://amazon.test/product-reviews", page=2,
+    )
+    reviews = extract_reviews_and_ratings_from_amazon("example", 50, concurrency=2)
+    assert reviews == amazon_page(1) + amazon_page(2) + amazon_page(3)
+    (entry,) = get_checkpoint_store().entries()
+    assert entry["reviews"] == 30 and '"page": 4' in entry["cursor"]
+
+    # la page 4 répond de nouveau : reprise à cette page, puis point de reprise supprimé
+    timed_out.clear()
+    reviews = extract_reviews_and_ratings_from_amazon("example", 50, concurrency=2)
+    assert reviews == [item for n in range(1, 6) for item in amazon_page(n)]
+    assert get_checkpoint_store().entries() == []
@@ -0,0 +1,46 @@
+"""File de travaux : limites de travaux simultanés par source"""
+import threading
+
+from functions.API.jobs import JobManager
+
+
+def blocking_job(started, release):
+    def run(job):
+        started.set()
+        release.wait(5)
+        return job.source
+    return run
+
+
+def test_multi_source_job_waits_for_each_source_limit():
+    manager = JobManager(workers=4, source_limits={"amazon": 1})
+    amazon_started, release_amazon = threading.Event(), threading.Event()
+    amazon = manager.submit("reviews", "amazon", {}, blocking_job(amazon_started, release_amazon))
+    assert amazon_started.wait(5)
+
+    fanout_started, release_fanout = threading.Event(), threading.Event()
+    fanout = manager.submit(
+        "reviews_all", "all", {}, blocking_job(fanout_started, release_fanout), sources=["trustpilot", "amazon"],
+    )
+    # la place Amazon est prise : le travail multi-sources attend sans occuper trustpilot
+    assert not fanout_started.wait(0.3)
+    assert fanout.status == "queued"
+    assert manager.stats()["running_by_source"] == {"amazon": 1}
+
+    release_amazon.set()
+    assert amazon.future.result(5) == "amazon"
+    assert fanout_started.wait(5)
+    stats = manager.stats()
+    assert stats["running_by_source"] == {"trustpilot": 1, "amazon": 1}
+    # un travail multi-sources compte une seule fois
+    assert stats["running"] == 1
+    release_fanout.set()
+    assert fanout.future.result(5) == "all"
+    manager.shutdown()
+
+
+def test_single_source_jobs_are_not_limited_by_other_sources():
+    manager = JobManager(workers=2, source_limits={"amazon": 1})
+    results = [manager.submit("reviews", source, {}, lambda job: job.source) for source in ("amazon", "yelp")]
+    assert [job.future.result(5) for job in results] == ["amazon", "yelp"]
+    manager.shutdown()
@@ -0,0 +1,50 @@
+"""Cache des résultats de l'API : quelles requêtes une entrée peut servir"""
+from functions.API import result_cache
+from functions.API.jobs import JobManager
+from functions.API.result_cache import ResultCache
+
+
+def fetcher(available):
+    calls = []
+
+    def fetch(max_reviews):
+        calls.append(max_reviews)
+        return [{"review": f"avis {i}", "rating": 5.0} for i in range(min(max_reviews, available))]
+
+    return fetch, calls
+
+
+def test_serves_smaller_requests_from_cache():
+    cache = ResultCache()
+    fetch, calls = fetcher(available=100)
+    assert cache.get_or_fetch("trustpilot", "example", 50, fetch)[1] == "miss"
+    reviews, status = cache.get_or_fetch("trustpilot", "example", 20, fetch)
+    assert status == "hit" and len(reviews) == 20
+    assert calls == [50]
+
+
+def test_short_result_does_not_answer_larger_requests():
+    # 30 avis pour 50 demandés : peut-être une extraction interrompue, pas la fin des avis
+    cache = ResultCache()
+    fetch, calls = fetcher(available=30)
+    cache.get_or_fetch("trustpilot", "example", 50, fetch)
+    assert cache.get_or_fetch("trustpilot", "example", 50, fetch)[1] == "hit"
+    assert cache.get_or_fetch("trustpilot", "example", 200, fetch)[1] == "miss"
+    assert calls == [50, 200]
+
+
+def test_stale_refresh_goes_through_the_job_queue(monkeypatch):
+    manager = JobManager(workers=2, source_limits={"amazon": 1})
+    monkeypatch.setattr(result_cache, "get_job_manager", lambda: manager)
+
+    # ttl nul : l'entrée est aussitôt périmée, servie pendant le rafraîchissement
+    cache = ResultCache(ttls={"amazon": 0})
+    fetch, calls = fetcher(available=100)
+    cache.get_or_fetch("amazon", "example", 50, fetch)
+    assert cache.get_or_fetch("amazon", "example", 20, fetch)[1] == "stale"
+
+    (job,) = manager._jobs.values()
+    assert job.kind == "cache_refresh" and job.sources == ["amazon"]
+    job.future.result(5)
+    assert calls == [50, 50]
+    manager.shutdown()
@@ -0,0 +1,24 @@
+"""Enregistrement des avis rendus en flux"""
+from functions.storage.review_store import ReviewStore
+
+
+def test_closing_the_stream_closes_the_scraper_and_saves_the_batch(tmp_path):
+    closed = []
+
+    def scraper():
+        try:
+            for i in range(10):
+                yield {"review": f"avis {i}", "rating": 4.0}
+        finally:
+            closed.append(True)
+
+    store = ReviewStore(tmp_path / "reviews.sqlite3")
+    reviews = scraper()
+    stream = store.ingest_stream("trustpilot", "example", reviews, batch_size=50)
+    assert [next(stream) for _ in range(3)] == [{"review": f"avis {i}", "rating": 4.0} for i in range(3)]
+
+    # client déconnecté : le générateur de l'extracteur est fermé, sans attendre le ramasse-miettes
+    stream.close()
+    assert closed == [True]
+    items, _ = store.search(source="trustpilot")
+    assert len(items) == 3
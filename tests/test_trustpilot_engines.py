@@ -0,0 +1,74 @@
+"""Choix du moteur Trustpilot (HTTP, puis Selenium en mode auto) et cache de résolution partagé"""
+import pytest
+
+from benchmarks.make_fixtures import trustpilot_search_page
+from functions.scrapping import functions_trustpilot
+from functions.scrapping.functions_trustpilot import (
+    extract_reviews_and_ratings_from_trustpilot, search_company_url_from_trustpilot,
+)
+from functions.scrapping.resolution_cache import CompanyNotFoundError, get_resolution_cache
+
+SELENIUM_REVIEWS = [{"rating": 5.0, "review": "Avis lu par Selenium", "review_id": "s1", "date": None, "author": None}]
+
+
+@pytest.fixture
+def selenium_engine(monkeypatch):
+    """Remplace le moteur Selenium ; retourne la liste de ses appels"""
+    calls = []
+
+    def fake_selenium(company, max_reviews, since=None):
+        calls.append(company)
+        yield from SELENIUM_REVIEWS
+
+    monkeypatch.setattr(functions_trustpilot, "iter_reviews_from_trustpilot_selenium", fake_selenium)
+    return calls
+
+
+def http_engine(monkeypatch, behaviour):
+    def fake_http(company, max_reviews, since=None):
+        return behaviour(company)
+
+    monkeypatch.setattr(functions_trustpilot, "iter_reviews_from_trustpilot_http", fake_http)
+
+
+def test_http_search_miss_is_not_cached(monkeypatch):
+    monkeypatch.setattr(functions_trustpilot, "fetch_html", lambda session, url, params=None: trustpilot_search_page(False))
+    with pytest.raises(CompanyNotFoundError):
+        search_company_url_from_trustpilot("example", session=None)
+    # le moteur Selenium refera sa propre recherche
+    assert get_resolution_cache().lookup("trustpilot", "example") == (False, None)
+
+
+def test_http_search_hit_is_shared(monkeypatch):
+    monkeypatch.setattr(functions_trustpilot, "fetch_html", lambda session, url, params=None: trustpilot_search_page())
+    url = search_company_url_from_trustpilot("example", session=None)
+    assert url == "https://www.trustpilot.com/review/example.com"
+    assert get_resolution_cache().lookup("trustpilot", "example") == (True, url)
+
+
+def test_auto_falls_back_to_selenium_when_http_search_misses(monkeypatch, selenium_engine):
+    def not_found(company):
+        raise CompanyNotFoundError("trustpilot", company)
+        yield
+
+    http_engine(monkeypatch, not_found)
+    assert extract_reviews_and_ratings_from_trustpilot("example", 10) == SELENIUM_REVIEWS
+    assert selenium_engine == ["example"]
+
+
+def test_http_engine_does_not_fall_back(monkeypatch, selenium_engine):
+    def not_found(company):
+        raise CompanyNotFoundError("trustpilot", company)
+        yield
+
+    http_engine(monkeypatch, not_found)
+    with pytest.raises(CompanyNotFoundError):
+        extract_reviews_and_ratings_from_trustpilot("example", 10, engine="http")
+    assert selenium_engine == []
+
+
+def test_auto_keeps_empty_http_result(monkeypatch, selenium_engine):
+    # aucun nouvel avis depuis le watermark : une page HTTP suffit, pas de navigateur
+    http_engine(monkeypatch, lambda company: iter(()))
+    assert extract_reviews_and_ratings_from_trustpilot("example", 10) == []
+    assert selenium_engine == []
@@ -0,0 +1,61 @@
+"""Moteur HTTP Trustpilot contre les pages de benchmarks/fixtures servies en local"""
+import pytest
+import requests
+
+from benchmarks.make_fixtures import CARDS_PER_PAGE, TRUSTPILOT_PAGES, review
+from functions.scrapping import functions_trustpilot
+from functions.scrapping.functions_trustpilot import extract_reviews_from_trustpilot_http
+from functions.scrapping.resolution_cache import CompanyNotFoundError
+
+TOTAL_REVIEWS = CARDS_PER_PAGE * TRUSTPILOT_PAGES
+
+
+def expected(count):
+    return [
+        {"rating": float(r["rating"]), "review": r["text"], "review_id": r["id"], "date": r["date"],
+         "author": r["author"]}
+        for r in map(review, range(count))
+    ]
+
+
+def test_reads_every_page_in_order(fixture_site):
+    reviews = extract_reviews_from_trustpilot_http("example", 1000, base_url=fixture_site)
+    assert reviews == expected(TOTAL_REVIEWS)
+
+
+def test_stops_at_max_reviews(fixture_site):
+    reviews = extract_reviews_from_trustpilot_http("example", 25, base_url=fixture_site)
+    assert reviews == expected(25)
+
+
+def test_stops_at_404_after_last_page(fixture_site, monkeypatch):
+    # sans nombre de pages annoncé, seule la page 404 qui suit la dernière page arrête la lecture
+    monkeypatch.setattr(functions_trustpilot, "trustpilot_total_pages", lambda page_props: None)
+    reviews = extract_reviews_from_trustpilot_http("example", 1000, base_url=fixture_site, concurrency=2)
+    assert reviews == expected(TOTAL_REVIEWS)
+
+
+def test_unknown_company(fixture_site):
+    with pytest.raises(CompanyNotFoundError):
+        extract_reviews_from_trustpilot_http("entreprise inconnue", 10, base_url=fixture_site)
+
+
+def test_block_status_interrupts_and_keeps_checkpoint(fixture_site, monkeypatch):
+    # page 3 refusée (429) : l'erreur remonte au lieu d'être prise pour la fin des avis
+    fetch_html = functions_trustpilot.fetch_html
+
+    def blocked_on_page_3(session, url, params=None):
+        if (params or {}).get("page") == 3:
+            response = requests.Response()
+            response.status_code = 429
+            raise requests.HTTPError("429 Too Many Requests", response=response)
+        return fetch_html(session, url, params)
+
+    monkeypatch.setattr(functions_trustpilot, "fetch_html", blocked_on_page_3)
+    with pytest.raises(requests.HTTPError):
+        extract_reviews_from_trustpilot_http("example", 200, base_url=fixture_site)
+
+    # la reprise repart de la page 3 avec les 40 avis déjà lus
+    monkeypatch.setattr(functions_trustpilot, "fetch_html", fetch_html)
+    reviews = extract_reviews_from_trustpilot_http("example", 200, base_url=fixture_site)
+    assert reviews == expected(TOTAL_REVIEWS)
@@ -0,0 +1,45 @@
+"""Extraction incrémentale : le watermark n'avance que si aucun avis n'a été sauté"""
+from benchmarks.make_fixtures import review
+from functions.scrapping.functions_trustpilot import extract_reviews_from_trustpilot_http
+from functions.scrapping.watermarks import extract_new_reviews, get_watermark_store, make_watermark
+
+
+def fixture_review(index):
+    r = review(index)
+    return {"rating": float(r["rating"]), "review": r["text"], "review_id": r["id"], "date": r["date"]}
+
+
+def run(fixture_site, max_reviews):
+    return extract_new_reviews(
+        "trustpilot", "example",
+        lambda since: extract_reviews_from_trustpilot_http("example", max_reviews, base_url=fixture_site, since=since),
+    )
+
+
+def saved_key():
+    return get_watermark_store().get("trustpilot", "example")["key"]
+
+
+def test_first_run_sets_watermark_to_newest(fixture_site):
+    reviews = run(fixture_site, 10)
+    assert len(reviews) == 10
+    assert saved_key() == review(0)["id"]
+
+
+def test_watermark_kept_when_max_reviews_stops_before_known_reviews(fixture_site):
+    # 45 avis plus récents que le watermark, 20 demandés : les avis 20 à 44 restent à lire
+    get_watermark_store().save("trustpilot", "example", make_watermark(fixture_review(45)))
+    assert len(run(fixture_site, 20)) == 20
+    assert saved_key() == review(45)["id"]
+
+    # extraction suivante assez grande : le watermark est atteint puis avance
+    reviews = run(fixture_site, 100)
+    assert [r["review_id"] for r in reviews] == [review(i)["id"] for i in range(45)]
+    assert saved_key() == review(0)["id"]
+
+
+def test_watermark_advances_when_listing_is_exhausted(fixture_site):
+    # avis du watermark absent (supprimé) : toute la liste est lue, plus rien n'a été sauté
+    get_watermark_store().save("trustpilot", "example", {"key": "supprime", "date": None})
+    assert len(run(fixture_site, 1000)) == 60
+    assert saved_key() == review(0)["id"]